@@ -1,22 +1,59 @@
 """
 Cache intelligent pour les appels Gemini IA.
 Économise les coûts API et améliore la réactivité.
+
+Backends (variable AI_CACHE_BACKEND) :
+    memory  dictionnaire en mémoire du process (perdu au redémarrage)
+    sqlite  fichier SQLite partagé (AI_CACHE_PATH) : commun à tous les workers
+            d'un même hôte, un hit ne dépend plus du worker qui reçoit la requête
+    tiered  mémoire devant SQLite (défaut) : les entrées chaudes lues sur disque
+            remontent en mémoire, le disque survit aux déploiements / redémarrages
+
+Le fichier disque n'a pas d'emplacement par défaut (jamais relatif au répertoire courant) :
+sans AI_CACHE_PATH, les backends sqlite / tiered se replient sur le cache mémoire.
+Le tier disque compresse les valeurs (zlib), respecte les TTL et se compacte en LRU
+au-delà de AI_CACHE_MAX_ENTRIES entrées ou AI_CACHE_MAX_MB mégaoctets.
+
+Appelants asynchrones : aget() / aset(). Les lectures et écritures SQLite y passent par un
+thread (asyncio.to_thread) : un disque lent ou un verrou WAL ne bloque pas la boucle d'événements.
 """
+import asyncio
 import json
 import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Optional, Tuple
 from functools import wraps
 import logging
 
+from dotenv import load_dotenv
+
+from app.core.metrics import registry
+
+load_dotenv()
+
 logger = logging.getLogger(__name__)
 
+AI_CACHE_LOOKUPS = registry.counter(
+    "ai_cache_lookups_total", "Lectures du cache IA à deux niveaux par tier servi (memory / disk / miss).")
+
+AI_CACHE_BACKEND = os.getenv("AI_CACHE_BACKEND", "tiered").lower()
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH")
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 50000))
+AI_CACHE_MAX_MB = float(os.getenv("AI_CACHE_MAX_MB", 256))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", 1000))
+
 class IntelligentCache:
     """Cache mémoire avec expiration et invalidation intelligente."""
     
-    def __init__(self, default_ttl_hours: int = 24):
+    def __init__(self, default_ttl_hours: int = 24, max_entries: Optional[int] = None):
         self._cache = {}
         self.default_ttl = default_ttl_hours
+        self.max_entries = max_entries
     
     def _generate_key(self, *args, **kwargs) -> str:
         """Génère une clé unique à partir des paramètres."""
@@ -32,6 +69,9 @@ class IntelligentCache:
             entry = self._cache[key]
             if datetime.now() < entry['expires_at']:
                 logger.debug(f"📦 Cache hit: {key}")
+                if self.max_entries:
+                    # Ordre d'insertion = ordre LRU : l'entrée lue repasse en fin
+                    self._cache[key] = self._cache.pop(key)
                 return entry['data']
             else:
                 del self._cache[key]
@@ -41,12 +81,22 @@ class IntelligentCache:
     def set(self, key: str, data: Any, ttl_hours: Optional[int] = None):
         """Stocke un élément dans le cache."""
         ttl = ttl_hours if ttl_hours is not None else self.default_ttl
+        self._cache.pop(key, None)
         self._cache[key] = {
             'data': data,
             'expires_at': datetime.now() + timedelta(hours=ttl),
             'created_at': datetime.now()
         }
+        if self.max_entries and len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
         logger.debug(f"💾 Cache stored: {key} (TTL: {ttl}h)")
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() pour un appelant asynchrone (mémoire : pas d'I/O, appel direct)."""
+        return self.get(key)
+
+    async def aset(self, key: str, data: Any, ttl_hours: Optional[int] = None):
+        self.set(key, data, ttl_hours)
     
     def clear_old_entries(self):
         """Nettoie les entrées expirées."""
@@ -60,8 +110,206 @@ class IntelligentCache:
         if expired_keys:
             logger.info(f"🧹 Cache cleanup: {len(expired_keys)} entrées expirées")
 
+class SQLiteCache(IntelligentCache):
+    """
+    Cache persistant sur disque (fichier SQLite, mode WAL), partagé entre process.
+    Même interface que IntelligentCache. Valeurs JSON compressées (zlib), TTL,
+    compaction LRU (last_access) au-delà des limites d'entrées / de taille.
+    Les connexions sont ouvertes paresseusement et par process : sûr après un fork.
+    """
+
+    SCHEMA_VERSION = 2
+    # Compaction déclenchée toutes les N écritures
+    COMPACT_EVERY = 200
+    # Précision de last_access : évite une écriture disque à chaque lecture
+    TOUCH_INTERVAL = 60
+
+    def __init__(
+        self,
+        path: str,
+        default_ttl_hours: int = 24,
+        max_entries: Optional[int] = AI_CACHE_MAX_ENTRIES,
+        max_bytes: Optional[int] = int(AI_CACHE_MAX_MB * 1024 * 1024),
+    ):
+        super().__init__(default_ttl_hours)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # Connexion héritée d'un fork : jamais réutilisée dans l'enfant
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+                # C'est un cache : une ancienne version du format est simplement jetée
+                conn.execute("DROP TABLE IF EXISTS ai_cache")
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_last_access ON ai_cache (last_access)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_with_expiry(self, key: str) -> Tuple[Optional[Any], float]:
+        """Valeur et date d'expiration (timestamp) ; (None, 0) si absente ou expirée."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT data, expires_at, last_access FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, 0
+            data, expires_at, last_access = row
+            if now >= expires_at:
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                logger.debug(f"🧹 Cache expired: {key}")
+                return None, 0
+            if now - last_access > self.TOUCH_INTERVAL:
+                conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+        logger.debug(f"📦 Cache hit (disque): {key}")
+        return json.loads(zlib.decompress(data)), expires_at
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_with_expiry(key)[0]
+
+    def set(self, key: str, data: Any, ttl_hours: Optional[int] = None):
+        ttl = ttl_hours if ttl_hours is not None else self.default_ttl
+        blob = zlib.compress(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO ai_cache (key, data, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl * 3600, now),
+            )
+            self._writes += 1
+            compact = self._writes % self.COMPACT_EVERY == 0
+        logger.debug(f"💾 Cache stored: {key} (TTL: {ttl}h, {len(blob)}o)")
+        if compact:
+            self.compact()
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, data: Any, ttl_hours: Optional[int] = None):
+        await asyncio.to_thread(self.set, key, data, ttl_hours)
+
+    def compact(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment lues au-delà des limites."""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            if self.max_entries:
+                deleted += conn.execute(
+                    "DELETE FROM ai_cache WHERE key IN ("
+                    "SELECT key FROM ai_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            if self.max_bytes:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+                if total > self.max_bytes:
+                    # On redescend à 90% de la limite pour ne pas compacter à chaque écriture
+                    excess = total - int(self.max_bytes * 0.9)
+                    victims, freed = [], 0
+                    for key, size in conn.execute("SELECT key, size FROM ai_cache ORDER BY last_access ASC"):
+                        if freed >= excess:
+                            break
+                        victims.append((key,))
+                        freed += size
+                    conn.executemany("DELETE FROM ai_cache WHERE key = ?", victims)
+                    deleted += len(victims)
+        if deleted:
+            logger.info(f"🧹 Cache disque compacté : {deleted} entrées supprimées")
+        return deleted
+
+    def clear_old_entries(self):
+        self.compact()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_cache"
+            ).fetchone()
+        return {"entries": count, "bytes": size}
+
+class TieredCache(IntelligentCache):
+    """
+    Cache à deux niveaux : mémoire (rapide, par process) devant le disque (persistant, partagé).
+    Lecture : mémoire, puis disque ; un hit disque est promu en mémoire pour son TTL restant.
+    Écriture : dans les deux niveaux.
+    """
+
+    def __init__(self, memory: IntelligentCache, disk: SQLiteCache):
+        super().__init__(memory.default_ttl)
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self.memory.get(key)
+        if data is not None:
+            AI_CACHE_LOOKUPS.inc(tier="memory")
+            return data
+        return self._promote(key, *self.disk.get_with_expiry(key))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Hit mémoire sans changement de thread ; la lecture disque passe par un thread."""
+        data = self.memory.get(key)
+        if data is not None:
+            AI_CACHE_LOOKUPS.inc(tier="memory")
+            return data
+        return self._promote(key, *await asyncio.to_thread(self.disk.get_with_expiry, key))
+
+    def _promote(self, key: str, data: Optional[Any], expires_at: float) -> Optional[Any]:
+        if data is None:
+            AI_CACHE_LOOKUPS.inc(tier="miss")
+            return None
+        AI_CACHE_LOOKUPS.inc(tier="disk")
+        remaining_hours = (expires_at - time.time()) / 3600
+        if remaining_hours > 0:
+            self.memory.set(key, data, remaining_hours)
+        return data
+
+    def set(self, key: str, data: Any, ttl_hours: Optional[int] = None):
+        ttl = ttl_hours if ttl_hours is not None else self.default_ttl
+        self.memory.set(key, data, ttl)
+        self.disk.set(key, data, ttl)
+
+    async def aset(self, key: str, data: Any, ttl_hours: Optional[int] = None):
+        ttl = ttl_hours if ttl_hours is not None else self.default_ttl
+        self.memory.set(key, data, ttl)
+        await self.disk.aset(key, data, ttl)
+
+    def clear_old_entries(self):
+        self.memory.clear_old_entries()
+        self.disk.clear_old_entries()
+
+def build_ai_cache(default_ttl_hours: int = 6) -> IntelligentCache:
+    """Instancie le backend de cache choisi par AI_CACHE_BACKEND."""
+    if AI_CACHE_BACKEND in ("sqlite", "tiered") and not AI_CACHE_PATH:
+        logger.warning(f"⚠️ AI_CACHE_PATH absente : cache IA '{AI_CACHE_BACKEND}' remplacé par le cache mémoire.")
+        return IntelligentCache(default_ttl_hours=default_ttl_hours, max_entries=AI_CACHE_MEMORY_ENTRIES)
+    if AI_CACHE_BACKEND == "sqlite":
+        logger.info(f"🗄️ Cache IA partagé (SQLite) : {AI_CACHE_PATH}")
+        return SQLiteCache(AI_CACHE_PATH, default_ttl_hours=default_ttl_hours)
+    if AI_CACHE_BACKEND == "tiered":
+        logger.info(f"🗄️ Cache IA mémoire + disque : {AI_CACHE_PATH}")
+        return TieredCache(
+            IntelligentCache(default_ttl_hours=default_ttl_hours, max_entries=AI_CACHE_MEMORY_ENTRIES),
+            SQLiteCache(AI_CACHE_PATH, default_ttl_hours=default_ttl_hours),
+        )
+    return IntelligentCache(default_ttl_hours=default_ttl_hours)
+
 # Instance globale
-ai_cache = IntelligentCache(default_ttl_hours=6)  # 6h pour les plans IA
+ai_cache = build_ai_cache(default_ttl_hours=6)  # 6h pour les plans IA
 
 def cached_response(ttl_hours: int = 6):
     """Décorateur pour mettre en cache les réponses IA."""
@@ -72,7 +320,7 @@ def cached_response(ttl_hours: int = 6):
             cache_key = f"{func.__name__}:{ai_cache._generate_key(*args, **kwargs)}"
             
             # Vérifier le cache
-            cached = ai_cache.get(cache_key)
+            cached = await ai_cache.aget(cache_key)
             if cached is not None:
                 return cached
             
@@ -81,7 +329,7 @@ def cached_response(ttl_hours: int = 6):
             
             # Mettre en cache
             if result is not None:
-                ai_cache.set(cache_key, result, ttl_hours)
+                await ai_cache.aset(cache_key, result, ttl_hours)
             
             return result
         return wrapper
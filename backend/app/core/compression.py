@@ -0,0 +1,234 @@
+"""
+Compression des réponses HTTP (plans, audits, historiques : gros JSON répétitifs envoyés en 4G).
+
+    CompressionMiddleware   négociation Accept-Encoding (br si le module brotli est installé, sinon gzip),
+                            au-delà d'un seuil de taille, pour les types texte/JSON seulement.
+                            Réponses streamées compressées au fil de l'eau (flush par chunk) ;
+                            le SSE (text/event-stream) et les réponses déjà encodées passent tels quels.
+    precompressed_response  corps immuables (plans stockés, adressés par digest d'artefact) gardés
+                            pré-compressés en mémoire, au niveau maximal : GET /coach/strategy ou /week
+                            ne revalident, ne resérialisent ni ne recompressent rien tant que le plan ne change pas.
+
+Variables d'environnement :
+    COMPRESSION_MIN_BYTES       taille minimale compressée (défaut 1024 octets)
+    COMPRESSION_GZIP_LEVEL      niveau gzip des réponses dynamiques (défaut 6)
+    COMPRESSION_BROTLI_QUALITY  qualité brotli des réponses dynamiques (défaut 4)
+    PRECOMPRESSED_CACHE_MB      mémoire max des corps pré-compressés par worker (défaut 32)
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seul
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+PRECOMPRESSED_CACHE_MB = float(os.getenv("PRECOMPRESSED_CACHE_MB", 32))
+
+# Préférence serveur à q égal
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+COMPRESSION_BYTES = registry.counter(
+    "http_compression_bytes_total", "Octets des réponses compressées, avant (raw) / après (sent) compression.")
+PRECOMPRESSED_LOOKUPS = registry.counter(
+    "precompressed_cache_lookups_total", "Lectures du cache de corps pré-compressés (hit / miss).")
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Encodage retenu pour l'en-tête Accept-Encoding (q-values respectées), None = identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class _Encoder:
+    """Compresseur incrémental : chaque chunk est flushé (décodable dès réception)."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+        else:
+            self._gz = zlib.compressobj(COMPRESSION_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + (self._br.flush() if flush else b"")
+        return self._gz.compress(data) + (self._gz.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    encoder = _Encoder(encoding, level)
+    return encoder.compress(data, flush=False) + encoder.finish()
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith("text/event-stream")
+    )
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+class CompressionMiddleware:
+    """Middleware ASGI pur : la décision se prend au premier chunk du corps (taille, type, en-têtes)."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            encoder = state["encoder"]
+            if encoder is None:
+                start = state["start"]
+                headers = MutableHeaders(raw=start["headers"])
+                if not _compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                _add_vary(headers)
+                if not more_body:
+                    packed = compress(body, encoding)
+                    headers["Content-Length"] = str(len(packed))
+                    COMPRESSION_BYTES.inc(len(body), encoding=encoding, stage="raw")
+                    COMPRESSION_BYTES.inc(len(packed), encoding=encoding, stage="sent")
+                    await send(start)
+                    await send({"type": "http.response.body", "body": packed})
+                    return
+                del headers["Content-Length"]
+                encoder = state["encoder"] = _Encoder(encoding)
+                await send(start)
+
+            packed = encoder.compress(body) if body else b""
+            if not more_body:
+                packed += encoder.finish()
+            COMPRESSION_BYTES.inc(len(body), encoding=encoding, stage="raw")
+            COMPRESSION_BYTES.inc(len(packed), encoding=encoding, stage="sent")
+            await send({"type": "http.response.body", "body": packed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class PrecompressedCache:
+    """LRU borné en octets : {clé immuable: {encodage: corps}} ('identity' = corps brut)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Dict[str, bytes]) -> None:
+        size = sum(len(body) for body in entry.values())
+        with self._lock:
+            if key in self._entries or size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(len(body) for body in evicted.values())
+
+precompressed_cache = PrecompressedCache(int(PRECOMPRESSED_CACHE_MB * 1024 * 1024))
+
+def _precompress(body: bytes) -> Dict[str, bytes]:
+    """Toutes les variantes d'un corps immuable, au niveau maximal (calculées une seule fois)."""
+    entry = {"identity": body}
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        levels = {"br": 11, "gzip": 9}
+        for encoding in ENCODINGS:
+            packed = compress(body, encoding, levels[encoding])
+            if len(packed) < len(body):
+                entry[encoding] = packed
+    return entry
+
+def precompressed_response(
+    request: Request, key: str, build_body: Callable[[], bytes], headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Réponse JSON d'un contenu immuable identifié par `key` (ex. digest d'artefact + schéma).
+    `build_body` (validation + sérialisation) n'est appelé qu'au premier accès de chaque worker.
+    `headers` : en-têtes ajoutés à la réponse (ETag, Cache-Control...).
+    """
+    entry = precompressed_cache.get(key)
+    PRECOMPRESSED_LOOKUPS.inc(result="hit" if entry is not None else "miss")
+    if entry is None:
+        entry = _precompress(build_body())
+        precompressed_cache.put(key, entry)
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding in entry:
+        headers["Content-Encoding"] = encoding
+        body = entry[encoding]
+    else:
+        body = entry["identity"]
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -37,4 +37,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def release_connection(db) -> None:
+    """
+    Fin de la phase lecture d'une route : termine la transaction et rend la connexion au pool
+    avant un appel long (LLM). Les objets déjà chargés restent lisibles (détachés) ;
+    la session reste utilisable et reprend une connexion à la requête suivante (phase écriture).
+    """
+    db.close()
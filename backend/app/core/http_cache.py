@@ -0,0 +1,62 @@
+"""
+Cache HTTP conditionnel des contenus stockés (plans du coach) : ETag / Last-Modified -> 304.
+
+L'ETag est le digest de l'artefact (sha256 du texte stocké, calculé à l'écriture) : le revalider ne
+demande ni de relire, ni de décompresser, ni de resérialiser le plan. Il est faible (W/) car le même
+contenu est servi brut, gzip ou br selon Accept-Encoding.
+
+Cache-Control « private, no-cache » : réponses propres à l'utilisateur authentifié, toujours
+revalidées (un plan peut être régénéré à tout moment) mais sans renvoyer le corps s'il n'a pas changé.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+CACHE_CONTROL = "private, no-cache"
+
+def etag_for(digest: str) -> str:
+    return f'W/"{digest}"'
+
+def cache_headers(digest: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag_for(digest), "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    return headers
+
+def _utc(value: datetime) -> datetime:
+    # SQLite renvoie des dates naïves (écrites en UTC par func.now())
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Vrai si la copie du client est à jour. If-None-Match prime sur If-Modified-Since (RFC 9110) ;
+    comparaison faible des ETags.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = _opaque(headers["ETag"])
+        return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        modified = parsedate_to_datetime(headers["Last-Modified"])
+        return modified <= _utc(since)
+    return False
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
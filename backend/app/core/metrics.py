@@ -0,0 +1,299 @@
+"""
+Instrumentation des requêtes : latence par route, requêtes SQL (nombre + temps),
+temps passé dans les appels LLM et taille des réponses.
+Exposition au format texte Prometheus via /metrics.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import query_budget
+
+logger = logging.getLogger(__name__)
+
+# Budget au-delà duquel une requête est loggée comme lente (ms)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 1000))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Histogramme Prometheus minimal (buckets cumulatifs, labels libres)."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # [compteurs par bucket..., +Inf, somme]
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            sep = "," if base else ""
+            for i, bound in enumerate(self.buckets):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound:g}"}} {series[i]}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[len(self.buckets)]}")
+        return lines
+
+class Counter:
+    """Compteur Prometheus monotone (labels libres)."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            lines.append(f"{self.name}{{{base}}} {value:g}")
+        return lines
+
+class Gauge:
+    """Jauge Prometheus (valeur lue à la demande via une fonction)."""
+
+    def __init__(self, name: str, help_text: str, read):
+        self.name = name
+        self.help = help_text
+        self._read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._read():
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+            lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float]) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str, read) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, help_text, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP par route.", LATENCY_BUCKETS)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "Nombre de requêtes SQL par requête HTTP.", QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = registry.histogram(
+    "http_request_db_seconds", "Temps SQL cumulé par requête HTTP.", LATENCY_BUCKETS)
+REQUEST_LLM_TIME = registry.histogram(
+    "http_request_llm_seconds", "Temps LLM cumulé par requête HTTP.", LATENCY_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes", "Taille des réponses HTTP (corps).", SIZE_BUCKETS)
+LLM_CALL_LATENCY = registry.histogram(
+    "llm_call_duration_seconds", "Durée des appels LLM par backend / type / issue.", LATENCY_BUCKETS)
+LLM_CACHE_REQUESTS = registry.counter(
+    "llm_cache_requests_total", "Consultations du cache de résultats LLM (hit / miss / out_of_tolerance / stale).")
+QUERY_BUDGET_VIOLATIONS = registry.counter(
+    "http_request_query_budget_violations_total", "Dépassements de budget SQL / N+1 détectés par route.")
+
+# --- CONTEXTE PAR REQUÊTE ---
+
+@dataclass
+class RequestStats:
+    """Mesures accumulées pendant une requête HTTP."""
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    # empreinte SQL -> [nombre, temps cumulé]
+    statements: Dict[str, List[float]] = field(default_factory=dict)
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.db_queries += 1
+        self.db_seconds += seconds
+        entry = self.statements.setdefault(fingerprint(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Empreintes exécutées plus de `threshold` fois (suspicion de N+1)."""
+        return sorted(
+            ((stmt, int(n)) for stmt, (n, _) in self.statements.items() if n > threshold),
+            key=lambda kv: kv[1], reverse=True,
+        )
+
+    def breakdown(self, top: int = 5) -> str:
+        ranked = sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        return " | ".join(f"{n}x {t * 1000:.1f}ms {_short_statement(stmt)}" for stmt, (n, t) in ranked)
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries() -> Iterator[RequestStats]:
+    """Compte les requêtes SQL hors requête HTTP (jobs, scripts, tests)."""
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+
+def fingerprint(statement: str) -> str:
+    """Empreinte d'une requête : littéraux et listes IN (...) remplacés par des '?'."""
+    text = re.sub(r"\s+", " ", statement).strip()
+    text = re.sub(r"%\(\w+\)s|%s|:\w+|\$\d+", "?", text)
+    text = _LITERALS.sub("?", text)
+    text = _POSTCOMPILE.sub("(?)", text)
+    return _IN_LISTS.sub("(?)", text)
+
+def _short_statement(statement: str, limit: int = 120) -> str:
+    return statement[:limit]
+
+# --- HOOKS SQLALCHEMY ---
+
+def install_sqlalchemy_hooks(engine: Engine) -> None:
+    """Chronomètre chaque requête SQL et l'impute à la requête HTTP en cours."""
+    if getattr(engine, "_titan_metrics_installed", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record_query(statement, elapsed)
+
+    engine._titan_metrics_installed = True
+
+# --- APPELS LLM ---
+
+def record_llm_call(backend: str, kind: str, seconds: float, outcome: str) -> None:
+    LLM_CALL_LATENCY.observe(seconds, backend=backend, kind=kind, outcome=outcome)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.llm_seconds += seconds
+
+# --- MIDDLEWARE ASGI ---
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI pur (compatible StreamingResponse) :
+    mesure latence, taille du corps, SQL et LLM, puis alimente les histogrammes.
+    """
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status = {"code": 500}
+        size = {"bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                size["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_stats.reset(token)
+            self._observe(scope, status["code"], size["bytes"], elapsed, stats)
+
+    def _observe(self, scope, status_code: int, size: int, elapsed: float, stats: RequestStats) -> None:
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        labels = {"method": scope.get("method", ""), "route": route}
+
+        REQUEST_LATENCY.observe(elapsed, status=str(status_code), **labels)
+        REQUEST_DB_QUERIES.observe(stats.db_queries, **labels)
+        REQUEST_DB_TIME.observe(stats.db_seconds, **labels)
+        REQUEST_LLM_TIME.observe(stats.llm_seconds, **labels)
+        RESPONSE_SIZE.observe(size, **labels)
+
+        violations = query_budget.check(scope.get("endpoint"), stats)
+        for violation in violations:
+            QUERY_BUDGET_VIOLATIONS.inc(kind=violation.kind, **labels)
+
+        if elapsed * 1000 > self.slow_request_ms:
+            logger.warning(
+                f"🐢 Requête lente : {labels['method']} {route} {status_code} "
+                f"{elapsed * 1000:.0f}ms (budget {self.slow_request_ms:.0f}ms) — "
+                f"SQL {stats.db_queries}q/{stats.db_seconds * 1000:.0f}ms, "
+                f"LLM {stats.llm_calls}x/{stats.llm_seconds * 1000:.0f}ms, {size}o — "
+                f"{stats.breakdown()}"
+            )
+
+        if violations:
+            query_budget.report(f"{labels['method']} {route}", violations)
@@ -0,0 +1,64 @@
+"""
+Projection des réponses (écrans mobiles de liste) : ?fields=... et ?include=...
+
+    GET /workouts/?fields=id,date,rpe                 colonnes demandées seulement (SELECT réduit)
+    GET /workouts/?fields=id,date&include=sets        + séries (une requête, colonnes des séries seulement)
+    GET /workouts/?include=ai_analysis                tous les champs + analyse IA complète (artefacts en une requête)
+    GET /api/v1/profiles/me?fields=basic_info,goals   sections JSON demandées seulement (load_only)
+
+Sans paramètre, la réponse historique complète est inchangée.
+`fields` restreint les champs scalaires (l'identifiant est toujours renvoyé) ; `include` ajoute
+les relations et champs lourds, absents par défaut d'une réponse projetée.
+Une réponse de liste projetée est construite directement depuis les lignes SQL (tuples de colonnes) :
+ni objets ORM, ni modèle Pydantic complet à instancier et valider.
+"""
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from fastapi import HTTPException
+
+class Projection:
+    def __init__(self, fields: List[str], include: Set[str]):
+        self.fields = fields
+        self.include = include
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+def parse_projection(
+    fields: Optional[str],
+    include: Optional[str],
+    allowed_fields: Sequence[str],
+    allowed_includes: Sequence[str] = (),
+    required: Sequence[str] = ("id",),
+) -> Optional[Projection]:
+    """Projection demandée, ou None (réponse complète). Champ inconnu -> 400 avec la liste des champs valides."""
+    if fields is None and include is None:
+        return None
+    wanted = _split(fields) if fields is not None else list(allowed_fields)
+    included = set(_split(include)) if include is not None else set()
+
+    unknown = [f for f in wanted if f not in allowed_fields] + sorted(i for i in included if i not in allowed_includes)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Champs inconnus : {', '.join(unknown)}. "
+                   f"fields : {', '.join(allowed_fields)}"
+                   + (f" ; include : {', '.join(allowed_includes)}" if allowed_includes else ""),
+        )
+    # Ordre des colonnes du schéma, doublons ignorés, champs requis en tête
+    ordered = [f for f in required if f in allowed_fields]
+    ordered += [f for f in allowed_fields if f in wanted and f not in ordered]
+    return Projection(ordered, included)
+
+def json_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def project(row: Sequence[Any], names: Iterable[str]) -> Dict[str, Any]:
+    """Dictionnaire JSON d'une ligne SQL dont les colonnes sont sélectionnées dans l'ordre de `names`."""
+    return {name: json_value(value) for name, value in zip(names, row)}
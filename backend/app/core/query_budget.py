@@ -0,0 +1,63 @@
+"""
+Budgets de requêtes SQL par route et détection des N+1.
+
+Chaque route déclare son budget avec @query_budget(n). Le middleware de métriques
+compare, en fin de requête, le nombre de requêtes SQL exécutées et les empreintes
+répétées (même requête au littéral près) au-delà de N_PLUS_ONE_THRESHOLD.
+
+Mode (variable QUERY_BUDGET_MODE) :
+    off     aucune vérification
+    warn    log + compteur Prometheus (défaut)
+    strict  lève QueryBudgetExceeded (tests / staging : le TestClient fait échouer le test)
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn").lower()
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+class QueryBudgetExceeded(AssertionError):
+    """Route au-delà de son budget SQL (mode strict)."""
+
+@dataclass
+class Violation:
+    kind: str  # "budget" | "n_plus_one"
+    message: str
+
+def query_budget(max_queries: int) -> Callable:
+    """Déclare le nombre maximal de requêtes SQL d'une route (auth comprise)."""
+    def decorator(func: Callable) -> Callable:
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
+
+def get_budget(endpoint) -> Optional[int]:
+    return getattr(endpoint, "__query_budget__", None)
+
+def check(endpoint, stats, mode: Optional[str] = None) -> List[Violation]:
+    """Retourne les violations (budget dépassé, requêtes répétées) d'une requête terminée."""
+    mode = mode or QUERY_BUDGET_MODE
+    if mode == "off" or stats is None:
+        return []
+
+    violations = []
+    budget = get_budget(endpoint)
+    if budget is not None and stats.db_queries > budget:
+        violations.append(Violation(
+            "budget", f"{stats.db_queries} requêtes SQL pour un budget de {budget}"
+        ))
+    for statement, count in stats.repeated(N_PLUS_ONE_THRESHOLD):
+        violations.append(Violation("n_plus_one", f"{count}x {statement[:160]}"))
+    return violations
+
+def report(label: str, violations: List[Violation], mode: Optional[str] = None) -> None:
+    """Log des violations ; en mode strict, fait échouer la requête / le test."""
+    mode = mode or QUERY_BUDGET_MODE
+    details = " | ".join(f"[{v.kind}] {v.message}" for v in violations)
+    logger.warning(f"🔁 Budget SQL : {label} — {details}")
+    if mode == "strict":
+        raise QueryBudgetExceeded(f"{label} — {details}")
@@ -0,0 +1,63 @@
+"""
+Encodage JSON rapide des réponses.
+
+    FastJSONResponse   classe de réponse par défaut de l'app (main.py) : orjson si installé,
+                       sinon json standard compact — même sortie, UTF-8 non échappé.
+    model_response     modèle(s) Pydantic validés puis sérialisés directement en octets
+                       (TypeAdapter.dump_json, cœur Rust de Pydantic) : ni arbre de dict
+                       intermédiaire (jsonable_encoder / model_dump), ni json.dumps.
+
+Les routes chaudes (listes de séances, feed, profil) renvoient model_response(...) ; leur
+response_model reste déclaré pour la documentation OpenAPI. FastAPI ne re-sérialise pas
+une Response renvoyée par la route.
+Benchmark : python -m benchmarks.bench_json_encoding (depuis backend/).
+"""
+import json
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur json standard
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type non sérialisable en JSON : {type(value).__name__}")
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return _default(value)
+
+def dumps(content: Any) -> bytes:
+    """JSON compact en octets (dates ISO 8601, modèles Pydantic acceptés)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+def model_response(tp: Any, value: Any, status_code: int = 200, include: Optional[set] = None) -> Response:
+    """
+    Valide `value` (objets ORM, dicts ou modèles) contre le type `tp` — ex. schemas.X ou List[schemas.X] —
+    et renvoie directement les octets JSON.
+    """
+    adapter = _adapter(tp)
+    content = adapter.dump_json(adapter.validate_python(value, from_attributes=True), include=include)
+    return Response(content=content, status_code=status_code, media_type="application/json")
@@ -0,0 +1,76 @@
+"""
+Profil de démarrage : temps d'import par module (python -X importtime).
+L'import de l'app est rejoué dans un process neuf pour mesurer un vrai démarrage à froid.
+
+Usage (depuis backend/) :
+    python -m app.core.startup_profile
+    python -m app.core.startup_profile --module app.main --top 30
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# (module, self µs, cumulé µs, profondeur)
+ImportRecord = Tuple[str, int, int, int]
+
+def profile_imports(module: str = "app.main") -> Tuple[List[ImportRecord], float]:
+    """Importe `module` dans un sous-process et retourne les temps d'import + la durée totale (s)."""
+    env = dict(os.environ)
+    # Base jetable : l'import ne doit toucher aucune donnée réelle
+    env.setdefault("DATABASE_URL", "sqlite://")
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"Import de {module} en échec : {tail[0]}")
+
+    records = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records, wall
+
+def by_package(records: List[ImportRecord]) -> Dict[str, int]:
+    """Temps propre (µs) cumulé par paquet de premier niveau (google, pandas, app...)."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in records:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage (par module / par paquet)")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    records, wall = profile_imports(args.module)
+    root = next((r for r in records if r[0] == args.module), None)
+
+    print(f"\n⏱️  Import de {args.module} : {root[2] / 1000 if root else 0:.0f} ms "
+          f"(process complet {wall * 1000:.0f} ms, {len(records)} modules)")
+
+    print(f"\n📦 Top {args.top} modules (temps cumulé)")
+    for name, self_us, cumulative_us, depth in sorted(records, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>9.1f} ms {self_us / 1000:>8.1f} ms  {'  ' * min(depth, 6)}{name}")
+
+    print(f"\n🧱 Top {args.top} paquets (temps propre)")
+    for package, self_us in sorted(by_package(records).items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} ms  {package}")
+
+if __name__ == "__main__":
+    main()
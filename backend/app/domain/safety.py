@@ -1,4 +1,3 @@
-import pandas as pd
 from datetime import date, timedelta
 import re
 
@@ -30,6 +29,9 @@ def calculate_acwr(history_logs: list) -> dict:
     if not history_logs:
         return default_res
 
+    # Import différé : pandas n'est chargé qu'au premier calcul d'ACWR (démarrage rapide)
+    import pandas as pd
+
     try:
         # 1. Création DataFrame
         df = pd.DataFrame(history_logs)
@@ -0,0 +1,153 @@
+"""
+Validation physiologique des séances et de leurs séries (POST /workouts/, POST /workouts/batch).
+
+Les limites sont une table de règles par metric_type (SET_RULES), compilée une fois en matrices de bornes
+[metric_type x champ]. Une validation traite toutes les séries reçues — une séance ou un lot entier — en une
+seule passe vectorisée (numpy) et renvoie toutes les violations, pas seulement la première.
+
+    LOAD_REPS       weight = charge (kg)      reps = répétitions
+    POWER_TIME      weight = puissance (W)    reps = durée (s)
+    PACE_DISTANCE   weight = allure / vitesse reps = distance (m)
+    ISOMETRIC_TIME  weight = lest (kg)        reps = durée (s)
+
+Un metric_type inconnu n'est soumis qu'aux règles communes (COMMON_SET_RULES).
+"""
+from itertools import repeat
+from operator import attrgetter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+class Rule(NamedTuple):
+    field: str
+    low: Optional[float]   # None : pas de borne
+    high: Optional[float]
+    message: str           # {value} : valeur reçue
+
+class Violation(NamedTuple):
+    session: int           # index de la séance dans le lot
+    set: Optional[int]     # index de la série dans la séance (None : règle de séance)
+    field: str
+    value: float
+    message: str
+
+SESSION_RULES: Tuple[Rule, ...] = (
+    Rule("duration", 10, 240, "Durée invalide ({value} min). Doit être entre 10 et 240 minutes."),
+    Rule("rpe", 1, 10, "RPE invalide ({value}). Doit être entre 1 et 10."),
+    Rule("energy_level", 1, 10, "Niveau d'énergie invalide ({value}). Doit être entre 1 et 10."),
+)
+
+COMMON_SET_RULES: Tuple[Rule, ...] = (
+    Rule("rpe", 1, 10, "RPE série invalide ({value}). Doit être entre 1 et 10."),
+)
+
+SET_RULES: Dict[str, Tuple[Rule, ...]] = {
+    # Record du monde ~500 kg
+    "LOAD_REPS": (Rule("weight", None, 500, "Charge impossible ({value}kg). Record du monde ~500kg."),),
+    # Record du monde ~2500 W (sprint) : 2000 W laisse de la marge aux capteurs bruités
+    "POWER_TIME": (Rule("weight", None, 2000, "Puissance impossible ({value}W). Record du monde ~2500W."),),
+    # 100 km max par série
+    "PACE_DISTANCE": (Rule("reps", None, 100000, "Distance suspecte : {value} mètres."),),
+}
+
+# Champs soumis à au moins une règle (les seuls extraits des séries)
+SET_FIELDS = tuple(dict.fromkeys(rule.field for rules in (COMMON_SET_RULES, *SET_RULES.values()) for rule in rules))
+# Champs de série dont 0 / None signifie « non renseigné » (jamais en violation)
+OPTIONAL_SET_FIELDS = ("rpe",)
+
+class _Table(NamedTuple):
+    fields: Tuple[str, ...]
+    codes: Dict[str, int]           # metric_type -> ligne (dernière ligne : metric_type inconnu)
+    low: Any                        # ndarray [lignes x champs]
+    high: Any
+    messages: List[List[Optional[str]]]
+    optional: Any                   # ndarray [champs] de booléens
+
+def _compile(fields: Sequence[str], rows: Sequence[Tuple[Rule, ...]], optional: Sequence[str] = ()) -> _Table:
+    import numpy as np
+
+    index = {name: i for i, name in enumerate(fields)}
+    low = np.full((len(rows), len(fields)), -np.inf)
+    high = np.full((len(rows), len(fields)), np.inf)
+    messages: List[List[Optional[str]]] = [[None] * len(fields) for _ in rows]
+    for r, rules in enumerate(rows):
+        for rule in rules:
+            f = index[rule.field]
+            if rule.low is not None:
+                low[r, f] = rule.low
+            if rule.high is not None:
+                high[r, f] = rule.high
+            messages[r][f] = rule.message
+    return _Table(tuple(fields), {}, low, high, messages, np.array([name in optional for name in fields]))
+
+_TABLES: Dict[str, _Table] = {}
+
+def _tables() -> Tuple[_Table, _Table]:
+    """Tables compilées au premier appel (import différé de numpy : démarrage rapide)."""
+    if not _TABLES:
+        metric_types = list(SET_RULES)
+        sets = _compile(SET_FIELDS, [COMMON_SET_RULES + SET_RULES[m] for m in metric_types] + [COMMON_SET_RULES],
+                        OPTIONAL_SET_FIELDS)
+        _TABLES["sets"] = sets._replace(codes={m: i for i, m in enumerate(metric_types)})
+        _TABLES["sessions"] = _compile([rule.field for rule in SESSION_RULES], [SESSION_RULES])
+    return _TABLES["sessions"], _TABLES["sets"]
+
+def _column(items: Sequence[Any], field: str):
+    """Colonne float d'un attribut (None -> 0) : extraction via map/attrgetter, sans liste intermédiaire."""
+    import numpy as np
+
+    try:
+        return np.fromiter(map(attrgetter(field), items), float, len(items))
+    except TypeError:  # valeurs manquantes (rpe non renseigné...)
+        return np.fromiter((value or 0.0 for value in map(attrgetter(field), items)), float, len(items))
+
+def _matrix(items: Sequence[Any], fields: Sequence[str]):
+    import numpy as np
+
+    return np.column_stack([_column(items, field) for field in fields])
+
+def _check(table: _Table, values, rows):
+    """(lignes, champs) en violation : une comparaison vectorisée sur toute la matrice de valeurs."""
+    import numpy as np
+
+    bad = (values < table.low[rows]) | (values > table.high[rows])
+    bad &= ~(table.optional & (values == 0))
+    return np.nonzero(bad)
+
+def validate_sessions(sessions: Sequence[Any]) -> List[Violation]:
+    """
+    Toutes les violations d'un lot de séances (objets avec duration, rpe, energy_level, sets),
+    triées par séance puis série. Liste vide : lot valide.
+    """
+    import numpy as np
+
+    if not sessions:
+        return []
+    session_table, set_table = _tables()
+    violations: List[Violation] = []
+
+    values = _matrix(sessions, session_table.fields)
+    for i, f in zip(*_check(session_table, values, np.zeros(len(sessions), dtype=np.intp))):
+        value = values[i, f].item()
+        violations.append(Violation(int(i), None, session_table.fields[f],
+                                    value, session_table.messages[0][f].format(value=value)))
+
+    # Toutes les séries du lot à plat : une passe pour l'ensemble
+    flat = [workout_set for session in sessions for workout_set in session.sets]
+    if flat:
+        counts = np.fromiter((len(session.sets) for session in sessions), np.intp, len(sessions))
+        owners = np.repeat(np.arange(len(sessions)), counts)
+        positions = np.arange(len(flat)) - np.repeat(np.cumsum(counts) - counts, counts)
+        unknown = len(set_table.codes)
+        codes = np.fromiter(
+            map(set_table.codes.get, map(attrgetter("metric_type"), flat), repeat(unknown)), np.intp, len(flat)
+        )
+        values = _matrix(flat, set_table.fields)
+        for i, f in zip(*_check(set_table, values, codes)):
+            value = values[i, f].item()
+            violations.append(Violation(int(owners[i]), int(positions[i]), set_table.fields[f],
+                                        value, set_table.messages[codes[i]][f].format(value=value)))
+
+    violations.sort(key=lambda v: (v.session, -1 if v.set is None else v.set))
+    return violations
+
+def validate_session(session: Any) -> List[Violation]:
+    return validate_sessions([session])
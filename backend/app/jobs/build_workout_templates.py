@@ -0,0 +1,124 @@
+"""
+Build hors ligne de la bibliothèque de séances (app/services/workout_templates/library.py).
+
+Pré-génère N variantes d'AIWorkoutPlan pour :
+    - une grille de combinaisons courantes (--seed-grid),
+    - les clés absentes les plus demandées (journal WORKOUT_TEMPLATE_MISSES_PATH).
+Les clés déjà présentes sont conservées (sauf --rebuild) ; l'index est réécrit atomiquement.
+
+Usage (depuis backend/) :
+    python -m app.jobs.build_workout_templates --top 50 --variants 3
+    python -m app.jobs.build_workout_templates --seed-grid --min-count 1 --reset-misses
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from itertools import product
+from typing import Any, Dict, List, Tuple
+
+from app.models.schemas import AIWorkoutPlan
+from app.routers.coach import clean_ai_json, get_workout_generation_prompt, normalize_workout_plan
+from app.services.llm.backend import get_llm_backend
+from app.services.workout_templates.library import (
+    WORKOUT_TEMPLATE_MISSES_PATH, WORKOUT_TEMPLATES_PATH,
+    WorkoutTemplateLibrary, encode_key, load_misses, template_key, write_index,
+)
+
+logger = logging.getLogger(__name__)
+
+# Combinaisons courantes pré-générées même sans historique de demandes
+SEED_GRID = {
+    "sport": ["Musculation"],
+    "level": ["Débutant", "Intermédiaire", "Avancé"],
+    "focus": ["Full Body", "Haut du corps", "Bas du corps"],
+    "duration": [45, 60],
+    "energy": [5, 7],
+    "equipment": ["Standard"],
+}
+
+# (profil, contexte) représentatif d'une clé
+Request = Tuple[Dict[str, Any], Dict[str, Any]]
+
+def seed_requests() -> Dict[str, Request]:
+    requests = {}
+    for sport, level, focus, duration, energy, equipment in product(*SEED_GRID.values()):
+        profile = {"sport": sport, "level": level}
+        context = {"duration": duration, "energy": energy, "focus": focus, "equipment": equipment}
+        requests[encode_key(template_key(profile, context))] = (profile, context)
+    return requests
+
+def popular_misses(misses: List[Dict[str, Any]], top: int, min_count: int) -> Dict[str, Request]:
+    """Clés absentes les plus demandées (au moins `min_count` fois ; une ligne du journal agrège `count` demandes)."""
+    counts = Counter()
+    for m in misses:
+        if "key" in m:
+            counts[m["key"]] += m.get("count", 1)
+    latest = {m["key"]: m for m in misses if "key" in m}
+    requests = {}
+    for key, count in counts.most_common(top):
+        if count < min_count:
+            break
+        miss = latest[key]
+        requests[key] = ({"sport": miss["sport"], "level": miss["level"]}, miss["context"])
+    return requests
+
+async def generate_variants(llm, key: str, request: Request, variants: int, semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+    profile, context = request
+    prompt = get_workout_generation_prompt(profile, context)
+    plans = []
+    for index in range(variants):
+        async with semaphore:
+            try:
+                # Clé de cache propre à la variante : sinon le cache LLM renverrait N fois la même séance
+                text = await llm.generate(prompt, "workout", cache_key=f"template:{key}:{index}")
+                plan = normalize_workout_plan(json.loads(clean_ai_json(text)))
+                plans.append(AIWorkoutPlan.model_validate(plan).model_dump(mode="json"))
+            except Exception as e:
+                logger.warning(f"⚠️ Variante {index} de {key} rejetée : {e}")
+    return plans
+
+async def build(args) -> Dict[str, int]:
+    llm = get_llm_backend()
+    if not llm.is_configured():
+        raise SystemExit("❌ Backend LLM non configuré (GEMINI_API_KEY).")
+
+    library = WorkoutTemplateLibrary(args.output, misses_path=None)
+    existing = {} if args.rebuild else {key: library.variants(key) for key in library.templates}
+    wanted = seed_requests() if args.seed_grid else {}
+    wanted.update(popular_misses(load_misses(args.misses), args.top, args.min_count))
+    todo = {key: request for key, request in wanted.items() if key not in existing}
+    logger.info(f"🏗️ {len(todo)} clés à générer ({len(existing)} déjà présentes), {args.variants} variantes chacune")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = await asyncio.gather(*(
+        generate_variants(llm, key, request, args.variants, semaphore) for key, request in todo.items()
+    ))
+    built = {key: plans for key, plans in zip(todo, results) if plans}
+
+    write_index({**existing, **built}, args.output)
+    if args.reset_misses and args.misses and os.path.exists(args.misses):
+        os.remove(args.misses)
+    return {"generated_keys": len(built), "failed_keys": len(todo) - len(built), "total_keys": len(existing) + len(built)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build de la bibliothèque de séances pré-générées")
+    parser.add_argument("--output", default=WORKOUT_TEMPLATES_PATH)
+    parser.add_argument("--misses", default=WORKOUT_TEMPLATE_MISSES_PATH, help="journal des clés absentes")
+    parser.add_argument("--top", type=int, default=50, help="nombre max de clés absentes à générer")
+    parser.add_argument("--min-count", type=int, default=3, help="demandes minimales pour qu'une clé absente soit générée")
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed-grid", action="store_true", help="inclut la grille de combinaisons courantes")
+    parser.add_argument("--rebuild", action="store_true", help="ignore l'index existant")
+    parser.add_argument("--reset-misses", action="store_true", help="vide le journal une fois l'index écrit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(build(args))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -4,95 +4,104 @@ Exécuté automatiquement à 02:00 chaque jour
 """
 import logging
 import asyncio
+import json
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, engine
+from app.core.metrics import install_sqlalchemy_hooks, track_queries
 from app.models import sql_models
-from app.services.coach_memory.service import CoachMemoryService
+from app.services.coach_memory.service import CoachMemoryService, load_section
+from app.services.artifacts.store import prune_orphans
+from app.services.sync import changes as sync_changes  # noqa: F401 — journal de synchronisation (hooks de session)
 
 logger = logging.getLogger(__name__)
 
+# Comptage des requêtes SQL du job (rapport + détection de N+1)
+install_sqlalchemy_hooks(engine)
+
 async def daily_coach_memory_update():
     """
     Met à jour toutes les mémoires du coach quotidiennement
     """
     logger.info("🚀 Démarrage du job quotidien de mise à jour des mémoires du coach")
     
-    db = SessionLocal()
-    try:
-        # Récupérer toutes les mémoires actives
-        coach_memories = db.query(sql_models.CoachMemory).all()
-        
-        logger.info(f"📊 {len(coach_memories)} mémoires à mettre à jour")
-        
-        updated_count = 0
-        error_count = 0
-        
-        for memory in coach_memories:
-            try:
-                # Récupérer le profil associé
-                athlete_profile = db.query(sql_models.AthleteProfile).filter(
-                    sql_models.AthleteProfile.id == memory.athlete_profile_id
-                ).first()
-                
-                if not athlete_profile:
-                    logger.warning(f"Profil non trouvé pour la mémoire {memory.id}")
-                    continue
+    # expire_on_commit=False : update_daily_context commite à chaque mémoire,
+    # sans quoi chaque objet serait rechargé (une requête par mémoire)
+    db = SessionLocal(expire_on_commit=False)
+    with track_queries() as stats:
+        try:
+            # Récupérer toutes les mémoires actives avec leur profil (jointure, pas de N+1)
+            rows = db.query(sql_models.CoachMemory, sql_models.AthleteProfile)\
+                .outerjoin(sql_models.AthleteProfile, sql_models.AthleteProfile.id == sql_models.CoachMemory.athlete_profile_id)\
+                .all()
+            coach_memories = [memory for memory, _ in rows]
+        
+            logger.info(f"📊 {len(coach_memories)} mémoires à mettre à jour")
+        
+            updated_count = 0
+            error_count = 0
+        
+            for memory, athlete_profile in rows:
+                try:
+                    if not athlete_profile:
+                        logger.warning(f"Profil non trouvé pour la mémoire {memory.id}")
+                        continue
                 
-                # Mettre à jour le contexte avec des valeurs par défaut
-                default_checkin = {
-                    "sleep_quality": 7,
-                    "sleep_duration": 7.5,
-                    "perceived_stress": 5,
-                    "muscle_soreness": 3,
-                    "energy_level": 7
-                }
+                    # Mettre à jour le contexte avec des valeurs par défaut
+                    default_checkin = {
+                        "sleep_quality": 7,
+                        "sleep_duration": 7.5,
+                        "perceived_stress": 5,
+                        "muscle_soreness": 3,
+                        "energy_level": 7
+                    }
                 
-                # Mettre à jour le contexte
-                CoachMemoryService.update_daily_context(memory, default_checkin, db)
+                    # Mettre à jour le contexte
+                    CoachMemoryService.update_daily_context(memory, default_checkin, db)
                 
-                # Mettre à jour les métadonnées
-                metadata = json.loads(memory.metadata) if memory.metadata else {}
-                metadata['last_daily_update'] = datetime.utcnow().isoformat()
-                metadata['total_updates'] = metadata.get('total_updates', 0) + 1
-                memory.metadata = json.dumps(metadata)
+                    # Mettre à jour les métadonnées
+                    metadata = dict(memory.metadata_info or {})
+                    metadata['last_daily_update'] = datetime.utcnow().isoformat()
+                    metadata['total_updates'] = metadata.get('total_updates', 0) + 1
+                    memory.metadata_info = metadata
                 
-                updated_count += 1
+                    updated_count += 1
                 
-                # Log tous les 10 profils
-                if updated_count % 10 == 0:
-                    logger.info(f"✅ {updated_count} mémoires mises à jour")
+                    # Log tous les 10 profils
+                    if updated_count % 10 == 0:
+                        logger.info(f"✅ {updated_count} mémoires mises à jour")
                 
-            except Exception as e:
-                error_count += 1
-                logger.error(f"❌ Erreur mise à jour mémoire {memory.id}: {str(e)}")
-                continue
+                except Exception as e:
+                    error_count += 1
+                    logger.error(f"❌ Erreur mise à jour mémoire {memory.id}: {str(e)}")
+                    continue
         
-        db.commit()
+            db.commit()
         
-        logger.info(f"🎉 Job terminé: {updated_count} mises à jour, {error_count} erreurs")
+            logger.info(f"🎉 Job terminé: {updated_count} mises à jour, {error_count} erreurs")
         
-        # Générer un rapport
-        report = {
-            "timestamp": datetime.now().isoformat(),
-            "total_memories": len(coach_memories),
-            "updated": updated_count,
-            "errors": error_count,
-            "success_rate": (updated_count / len(coach_memories) * 100) if coach_memories else 100
-        }
+            # Générer un rapport
+            report = {
+                "timestamp": datetime.now().isoformat(),
+                "total_memories": len(coach_memories),
+                "updated": updated_count,
+                "errors": error_count,
+                "success_rate": (updated_count / len(coach_memories) * 100) if coach_memories else 100,
+                "sql_queries": stats.db_queries
+            }
         
-        logger.info(f"📈 Rapport: {report}")
+            logger.info(f"📈 Rapport: {report}")
         
-        return report
+            return report
         
-    except Exception as e:
-        logger.error(f"💥 Erreur critique dans le job quotidien: {str(e)}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+        except Exception as e:
+            logger.error(f"💥 Erreur critique dans le job quotidien: {str(e)}")
+            db.rollback()
+            raise
+        finally:
+            db.close()
 
 async def update_memory_flags_batch():
     """
@@ -111,17 +120,17 @@ async def update_memory_flags_batch():
         
         for memory in coach_memories:
             try:
-                context = json.loads(memory.current_context) if memory.current_context else {}
+                context = load_section(memory.current_context)
                 readiness = context.get('readiness_score', 70)
                 
-                memory_flags = json.loads(memory.memory_flags) if memory.memory_flags else {}
+                memory_flags = load_section(memory.memory_flags)
                 
                 # Mettre à jour les flags basés sur le contexte
                 memory_flags['needs_deload'] = readiness < 40
                 memory_flags['adaptation_window_open'] = readiness > 70
                 memory_flags['pr_potential'] = readiness > 80 and context.get('fatigue_state') == 'fresh'
                 
-                memory.memory_flags = json.dumps(memory_flags)
+                memory.memory_flags = memory_flags
                 
             except Exception as e:
                 logger.error(f"❌ Erreur mise à jour flags mémoire {memory.id}: {str(e)}")
@@ -144,6 +153,11 @@ async def cleanup_old_data():
     
     db = SessionLocal()
     try:
+        # Artefacts IA plus référencés (plans régénérés, analyses remplacées)
+        pruned = prune_orphans(db)
+        db.commit()
+        logger.info(f"🗑️  {pruned} artefacts IA orphelins supprimés")
+
         # Supprimer les profils incomplets de plus de 30 jours
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
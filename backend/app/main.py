@@ -1,13 +1,23 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from sqlalchemy import text, inspect, create_engine
 from datetime import datetime
 
-from app.core.database import engine, Base
+from app.core.database import engine, Base, SessionLocal
+from app.core.metrics import MetricsMiddleware, install_sqlalchemy_hooks, registry
+from app.core.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware
 # Import des modèles
 from app.models import sql_models 
+from app.services.sync import changes as sync_changes  # noqa: F401 — journal de synchronisation (hooks de session)
+from app.services.exercises.catalog import seed_catalog
+from app.services.rollups import training as rollups  # noqa: F401 — agrégats d'entraînement (hooks de session)
+from app.services.squads.batch import expire_stale_jobs
 
 # --- IMPORTS DES ROUTEURS ---
 from .routers import (
@@ -19,7 +29,12 @@ from .routers import (
     user, 
     feed,
     athlete_profiles,
-    coach_memories  # ✅ NOUVEL IMPORT CRITIQUE (DEV-CARD #01)
+    coach_memories,  # ✅ NOUVEL IMPORT CRITIQUE (DEV-CARD #01)
+    squads,
+    sync,
+    exercises,
+    exports,
+    aggregates
 )
 
 # Configuration des logs
@@ -27,18 +42,40 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- DATABASE INIT ---
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("✅ Tables SQL vérifiées.")
-except Exception as e:
-    logger.error(f"ERREUR INIT DB : {e}")
+# Création du schéma au démarrage du serveur (lifespan) et non plus à l'import :
+# l'import reste rapide (tests, scripts). SKIP_DB_INIT=1 en production (schéma géré par migration).
+SKIP_DB_INIT = os.getenv("SKIP_DB_INIT", "false").lower() in ("1", "true", "yes")
+
+def init_db():
+    try:
+        Base.metadata.create_all(bind=engine)
+        logger.info("✅ Tables SQL vérifiées.")
+        with engine.begin() as conn:
+            seed_catalog(conn)
+        logger.info("✅ Catalogue d'exercices initialisé.")
+        # Jobs de squad laissés actifs par un worker arrêté (battement trop ancien)
+        with SessionLocal() as db:
+            expire_stale_jobs(db)
+            db.commit()
+    except Exception as e:
+        logger.error(f"ERREUR INIT DB : {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SKIP_DB_INIT:
+        logger.info("⏭️ Init DB ignorée (SKIP_DB_INIT).")
+    else:
+        init_db()
+    yield
 
 app = FastAPI(
     title="TitanFlow API",
     description="API Backend pour l'application TitanFlow",
     version="2.5.0", # Bump version pour marquer le changement
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse, # orjson si installé (app/core/responses.py)
+    lifespan=lifespan
 )
 
 # --- CONFIGURATION CORS ---
@@ -52,6 +89,14 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+# --- COMPRESSION (gzip / brotli négociés, au-delà de COMPRESSION_MIN_BYTES) ---
+app.add_middleware(CompressionMiddleware)
+
+# --- INSTRUMENTATION (latence, SQL, LLM, taille des réponses) ---
+# Ajoutée après la compression : elle l'enveloppe et mesure les octets réellement envoyés
+install_sqlalchemy_hooks(engine)
+app.add_middleware(MetricsMiddleware)
+
 # --- GLOBAL EXCEPTION HANDLER ---
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -83,6 +128,11 @@ app.include_router(performance.router)
 app.include_router(safety.router)
 app.include_router(coach.router)
 app.include_router(feed.router)
+app.include_router(squads.router)
+app.include_router(sync.router)
+app.include_router(exercises.router)
+app.include_router(exports.router)
+app.include_router(aggregates.router)
 
 # --- ROUTES SYSTÈME ---
 
@@ -115,6 +165,12 @@ async def database_status():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+async def metrics():
+    """Métriques au format texte Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
+    # Dev uniquement (reload, 1 worker). Production : python -m app.server (workers pré-forkés)
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -17,6 +17,34 @@ class MemoryStatus(str, Enum):
     ARCHIVED = "ARCHIVED"
     FORGOTTEN = "FORGOTTEN"
 
+class BatchJobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+class AthleteJobStatus(str, Enum):
+    PENDING = "PENDING"
+    GENERATING = "GENERATING"
+    DONE = "DONE"
+    SKIPPED = "SKIPPED"   # entrées de planification incomplètes
+    FAILED = "FAILED"
+
+class PlanKind(str, Enum):
+    STRATEGY = "STRATEGY"
+    WEEK = "WEEK"
+    DRAFT_WORKOUT = "DRAFT_WORKOUT"
+    AUDIT_REPORT = "AUDIT_REPORT"
+
+class SyncEntity(str, Enum):
+    """Entités couvertes par la synchronisation incrémentale (clés de la réponse GET /sync)."""
+    WORKOUT = "workouts"
+    SET = "sets"
+    FEED_ITEM = "feed_items"
+    ENGRAM = "engrams"
+    PROFILE_SECTION = "profile"
+    PLAN = "plans"
+
 class FeedItemType(str, Enum):
     INFO = "INFO"
     ANALYSIS = "ANALYSIS"
@@ -356,17 +356,86 @@ class WorkoutSessionCreate(BaseModel):
     notes: Optional[str] = None
     ai_analysis: Optional[str] = None
     sets: List[WorkoutSetCreate] = []
+    # Clé générée par le client : un renvoi de la même séance (retry après timeout) ne la duplique pas
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+class WorkoutUpload(WorkoutSessionCreate):
+    """Séance enregistrée hors ligne : la clé d'idempotence est obligatoire."""
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+
+class WorkoutBatchCreate(BaseModel):
+    sessions: List[WorkoutUpload] = Field(..., min_length=1, max_length=100)
+
+class WorkoutBatchItem(BaseModel):
+    idempotency_key: str
+    id: int
+    status: str  # "created" | "duplicate" (déjà reçue lors d'un envoi précédent)
+
+class WorkoutBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    items: List[WorkoutBatchItem]
+    latest_id: Optional[int] = None  # séance analysée en tâche de fond (carte du feed à venir)
 
 class WorkoutSetResponse(WorkoutSetBase):
     id: int
     weight: float
     reps: float
+    exercise_id: Optional[int] = None  # exercice du catalogue (GET /exercises/)
     class Config:
         from_attributes = True
 
 class WorkoutSessionResponse(WorkoutSessionCreate):
     id: int
     ai_analysis: Optional[str] = None
+    ai_summary: Optional[str] = None
+    ai_analysis_ref: Optional[str] = None
+    sets: List[WorkoutSetResponse] = []
+    class Config:
+        from_attributes = True
+
+class ExerciseResponse(BaseModel):
+    id: int
+    name: str
+    metric_type: str
+    class Config:
+        from_attributes = True
+
+class ExerciseSummary(BaseModel):
+    """Agrégats d'un exercice sur l'historique de l'athlète."""
+    exercise_id: int
+    name: str
+    sessions: int = 0
+    sets: int = 0
+    total_reps: float = 0.0
+    total_volume: float = 0.0   # somme poids x reps (LOAD_REPS)
+    best_weight: Optional[float] = None
+    first_date: Optional[date] = None
+    last_date: Optional[date] = None
+
+class TrainingAggregate(BaseModel):
+    """Agrégat précalculé d'une période (jour, ou semaine commençant le lundi)."""
+    period_start: date
+    metric_type: Optional[str] = None   # None : tous metric_types confondus
+    exercise_id: Optional[int] = None   # None : tous exercices confondus
+    exercise: Optional[str] = None
+    sessions: int = 0
+    sets: int = 0
+    reps: float = 0.0                   # répétitions, secondes ou mètres selon metric_type (0 dans les totaux)
+    volume: float = 0.0                 # tonnage : poids x reps (LOAD_REPS)
+    duration: float = 0.0               # minutes de séance (au prorata des séries par metric_type / exercice)
+    rpe_load: float = 0.0               # durée x RPE de séance (même répartition)
+
+class WorkoutSessionSummary(BaseModel):
+    """Séance en liste : l'analyse IA complète est remplacée par son résumé et son pointeur (détail : GET /workouts/{id})."""
+    id: int
+    date: date
+    duration: float
+    rpe: float
+    energy_level: int = 5
+    notes: Optional[str] = None
+    ai_summary: Optional[str] = None
+    ai_analysis_ref: Optional[str] = None
     sets: List[WorkoutSetResponse] = []
     class Config:
         from_attributes = True
@@ -471,6 +540,8 @@ class ProfileAuditRequest(BaseModel):
 class ProfileAuditResponse(BaseModel):
     markdown_report: str
     generated_engrams: List[CoachEngramResponse] = [] # ✅ Ajout Critique : Liste des souvenirs créés
+class AuditReportResponse(BaseModel):
+    markdown_report: str
 class StrategyResponse(BaseModel):
     periodization_title: str
     phases: List[Any]
@@ -478,6 +549,15 @@ class WeeklyPlanResponse(BaseModel):
     schedule: List[Any]
     reasoning: str
 
+class SyncResponse(BaseModel):
+    """Delta de synchronisation (GET /sync) : `cursor` est le jeton `since` du prochain appel."""
+    since: int
+    cursor: int
+    has_more: bool = False
+    reset: bool = False  # jeton inconnu : le client repart de zéro
+    upserts: Dict[str, Any]
+    deletes: Dict[str, List[Any]]
+
 class ProfileUpdate(BaseModel):
     profile_data: Dict[str, Any]
     
@@ -501,4 +581,45 @@ class GoalProgressUpdate(BaseModel):
     achieved: bool = False
 
 class AthleteProfileUpdate(AthleteProfileBase):
-    pass
\ No newline at end of file
+    pass
+# --- SQUADS ---
+
+class SquadCreate(BaseModel):
+    name: str
+
+class SquadJoin(BaseModel):
+    invite_code: str
+
+class SquadMemberResponse(BaseModel):
+    user_id: int
+    username: str
+    joined_at: Optional[datetime] = None
+
+class SquadResponse(BaseModel):
+    id: int
+    name: str
+    coach_id: int
+    invite_code: Optional[str] = None  # visible du coach uniquement
+    members: List[SquadMemberResponse] = []
+
+class AthleteJobProgress(BaseModel):
+    status: str
+    group: Optional[int] = None
+    detail: Optional[str] = None
+
+class SquadPlanJobResponse(BaseModel):
+    id: str
+    squad_id: int
+    kind: str
+    status: str
+    groups: int = 0
+    athletes: Dict[str, AthleteJobProgress] = {}
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator('status', mode='before')
+    def enum_value(cls, v):
+        return getattr(v, "value", v)
+    model_config = ConfigDict(from_attributes=True)
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text, Boolean, JSON, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text, Boolean, JSON, LargeBinary, UniqueConstraint, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.core.database import Base
-from app.models.enums import MemoryType, ImpactLevel, MemoryStatus
+from app.models.enums import MemoryType, ImpactLevel, MemoryStatus, BatchJobStatus, PlanKind, SyncEntity
 
 class User(Base):
     __tablename__ = "users"
@@ -11,17 +11,71 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True, nullable=True)
     hashed_password = Column(String)
+
+    # Verrou optimiste : chaque UPDATE ORM vérifie puis incrémente la version
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Legacy fields
     profile_data = Column(JSON, default={}) 
-    strategy_data = Column(Text, nullable=True)
-    weekly_plan_data = Column(Text, nullable=True)
-    draft_workout_data = Column(Text, nullable=True)
+    # Plans migrés vers user_plans (migrate_db.py, étape 5) : plus lus ni écrits, jamais chargés avec l'utilisateur
+    strategy_data = deferred(Column(Text, nullable=True))
+    weekly_plan_data = deferred(Column(Text, nullable=True))
+    draft_workout_data = deferred(Column(Text, nullable=True))
 
     workouts = relationship("WorkoutSession", back_populates="owner")
     feed_items = relationship("FeedItem", back_populates="owner", cascade="all, delete-orphan")
     athlete_profile = relationship("AthleteProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
+    __mapper_args__ = {"version_id_col": version}
+
+class UserPlan(Base):
+    """Plan généré d'un utilisateur (une ligne par nature), versionné pour les écritures compare-and-swap."""
+    __tablename__ = "user_plans"
+    __table_args__ = (UniqueConstraint("user_id", "kind", name="uq_user_plan"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    kind = Column(SQLEnum(PlanKind), nullable=False)
+    digest = Column(String(64), ForeignKey("ai_artifacts.digest"), nullable=True)  # plan courant (artefact JSON)
+    data = Column(Text, nullable=True)  # legacy : JSON non compressé d'avant les artefacts
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserSyncState(Base):
+    """
+    Séquence de synchronisation d'un utilisateur : dernier numéro attribué dans sync_changes.
+    Ligne étroite à part : chaque commit journalisé la verrouille, pas la ligne users.
+    """
+    __tablename__ = "user_sync_state"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
+
+class SyncChange(Base):
+    """
+    Journal de synchronisation compacté : une ligne par entité modifiée (la dernière modification l'emporte),
+    numérotée dans la séquence de l'utilisateur ; `deleted` = tombstone.
+    """
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        UniqueConstraint("user_id", "entity", "entity_id", name="uq_sync_change"),
+        Index("ix_sync_changes_user_seq", "user_id", "seq"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(SQLEnum(SyncEntity), nullable=False)
+    entity_id = Column(String(64), nullable=False)
+    seq = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AIArtifact(Base):
+    """Sortie IA compressée, adressée par son contenu : partagée par toutes les lignes qui la référencent."""
+    __tablename__ = "ai_artifacts"
+    digest = Column(String(64), primary_key=True)  # sha256 du texte
+    codec = Column(String, nullable=False, default="zlib")
+    size = Column(Integer, nullable=False)  # octets avant compression
+    content = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class AthleteProfile(Base):
     __tablename__ = "athlete_profiles"
 
@@ -108,31 +162,89 @@ class CoachEngram(Base):
 
 class WorkoutSession(Base):
     __tablename__ = "workout_sessions"
+    # Clé d'idempotence générée par le client (rejeu d'un envoi hors ligne) : unique par utilisateur
+    __table_args__ = (Index("ix_workout_sessions_idempotency", "user_id", "idempotency_key", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    idempotency_key = Column(String(64), nullable=True)
     date = Column(Date, index=True)
     duration = Column(Float)
     rpe = Column(Float)
     energy_level = Column(Integer, default=5) 
     notes = Column(Text, nullable=True)       
-    ai_analysis = Column(Text, nullable=True)
+    ai_analysis = Column(Text, nullable=True)  # legacy : analyses d'avant les artefacts
+    ai_analysis_ref = Column(String(64), ForeignKey("ai_artifacts.digest"), nullable=True)
+    ai_summary = Column(String, nullable=True)  # résumé court renvoyé par les listes
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     owner = relationship("User", back_populates="workouts")
     sets = relationship("WorkoutSet", back_populates="session", cascade="all, delete-orphan")
 
+class Exercise(Base):
+    """Catalogue des exercices : nom canonique (voir app/services/exercises/catalog.py)."""
+    __tablename__ = "exercises"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(120), unique=True, nullable=False)
+    metric_type = Column(String, nullable=False, default="LOAD_REPS")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    aliases = relationship("ExerciseAlias", back_populates="exercise", cascade="all, delete-orphan")
+
+class ExerciseAlias(Base):
+    """Graphie connue d'un exercice, normalisée (minuscules, sans accents ni ponctuation)."""
+    __tablename__ = "exercise_aliases"
+    id = Column(Integer, primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), index=True, nullable=False)
+    alias = Column(String(120), unique=True, nullable=False)
+    exercise = relationship("Exercise", back_populates="aliases")
+
 class WorkoutSet(Base):
     __tablename__ = "workout_sets"
+    # Agrégats par exercice (records, historique) : parcours d'index entier, séance incluse
+    __table_args__ = (Index("ix_workout_sets_exercise_session", "exercise_id", "session_id"),)
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("workout_sessions.id"))
-    exercise_name = Column(String, index=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=True)
+    exercise_name = Column(String, index=True)  # saisie du client, renvoyée telle quelle
     set_order = Column(Integer)
     weight = Column(Float, default=0.0)
     reps = Column(Float, default=0.0)
     rpe = Column(Float, default=0.0)
     rest_seconds = Column(Integer, default=0)
-    metric_type = Column(String, nullable=False, default="LOAD_REPS") 
+    metric_type = Column(String, nullable=False, default="LOAD_REPS")
     session = relationship("WorkoutSession", back_populates="sets")
 
+class RollupColumns:
+    """
+    Agrégats d'entraînement précalculés (voir app/services/rollups/training.py), une ligne par
+    (utilisateur, période, metric_type, exercice) :
+        metric_type = "" , exercise_id = 0   totaux de la période (séances, durée, charge RPE)
+        metric_type = X  , exercise_id = 0   totaux d'un metric_type
+        metric_type = X  , exercise_id = N   totaux d'un exercice du catalogue
+    """
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    period_start = Column(Date, nullable=False)
+    metric_type = Column(String(32), nullable=False, default="")
+    exercise_id = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+    sets = Column(Integer, nullable=False, default=0)
+    reps = Column(Float, nullable=False, default=0.0)       # répétitions, secondes ou mètres selon metric_type (0 en totaux)
+    volume = Column(Float, nullable=False, default=0.0)     # tonnage : poids x reps (LOAD_REPS)
+    duration = Column(Float, nullable=False, default=0.0)   # minutes de séance (au prorata des séries hors totaux)
+    rpe_load = Column(Float, nullable=False, default=0.0)   # charge interne : durée x RPE de séance (même répartition)
+
+class DailyRollup(RollupColumns, Base):
+    __tablename__ = "training_rollups_daily"
+    __table_args__ = (
+        Index("ix_training_rollups_daily_key", "user_id", "period_start", "metric_type", "exercise_id", unique=True),
+    )
+
+class WeeklyRollup(RollupColumns, Base):
+    """Semaines ISO : period_start = lundi."""
+    __tablename__ = "training_rollups_weekly"
+    __table_args__ = (
+        Index("ix_training_rollups_weekly_key", "user_id", "period_start", "metric_type", "exercise_id", unique=True),
+    )
+
 class FeedItem(Base):
     __tablename__ = "feed_items"
     id = Column(String, primary_key=True, index=True)
@@ -145,4 +257,44 @@ class FeedItem(Base):
     is_completed = Column(Boolean, default=False)
     priority = Column(Integer, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    owner = relationship("User", back_populates="feed_items")
\ No newline at end of file
+    owner = relationship("User", back_populates="feed_items")
+
+# --- SQUADS (génération groupée par un coach) ---
+
+class Squad(Base):
+    """Groupe d'athlètes géré par un coach. Un athlète rejoint le squad lui-même (code d'invitation)."""
+    __tablename__ = "squads"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    coach_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    invite_code = Column(String, unique=True, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    members = relationship("SquadMember", back_populates="squad", cascade="all, delete-orphan")
+
+class SquadMember(Base):
+    __tablename__ = "squad_members"
+    __table_args__ = (UniqueConstraint("squad_id", "user_id", name="uq_squad_member"),)
+    id = Column(Integer, primary_key=True, index=True)
+    squad_id = Column(Integer, ForeignKey("squads.id"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    joined_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    squad = relationship("Squad", back_populates="members")
+    user = relationship("User")
+
+class SquadPlanJob(Base):
+    """Job de génération groupée : avancement par athlète ({user_id: {status, group, detail}})."""
+    __tablename__ = "squad_plan_jobs"
+    id = Column(String, primary_key=True, index=True)
+    squad_id = Column(Integer, ForeignKey("squads.id"), index=True, nullable=False)
+    coach_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    kind = Column(String, nullable=False, default="week")
+    status = Column(SQLEnum(BatchJobStatus), nullable=False, default=BatchJobStatus.PENDING)
+    athletes = Column(JSON, default={})
+    groups = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Battement : rafraîchi à chaque écriture d'avancement ; un job actif sans battement récent est orphelin
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,41 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.query_budget import query_budget
+from app.core.responses import model_response
+from app.dependencies import get_current_user
+from app.models import sql_models, schemas
+from app.services.rollups.training import get_aggregates
+
+router = APIRouter(
+    prefix="/aggregates",
+    tags=["Aggregates"]
+)
+
+@router.get("/{period}", response_model=List[schemas.TrainingAggregate])
+@query_budget(2)
+async def read_aggregates(
+    period: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: str = Query("total", pattern="^(total|metric_type|exercise)$"),
+    metric_type: Optional[str] = None,
+    exercise_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Agrégats d'entraînement précalculés (tableaux de bord, contexte des prompts IA) : quelques lignes par période,
+    sans parcours des séries. period = daily | weekly (semaines commençant le lundi).
+    group_by = total (séances, durée, charge RPE, tonnage) | metric_type | exercise ; filtres ?metric_type= / ?exercise_id=.
+    """
+    if period not in ("daily", "weekly"):
+        raise HTTPException(status_code=404, detail="Période inconnue (daily ou weekly).")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="Période invalide : start doit précéder end.")
+    rows = get_aggregates(db, current_user.id, period, start, end, group_by, metric_type, exercise_id)
+    return model_response(List[schemas.TrainingAggregate], rows)
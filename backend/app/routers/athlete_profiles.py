@@ -7,7 +7,7 @@ import logging
 import re
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func
 
@@ -16,6 +16,9 @@ from app.dependencies import get_current_user
 from app.models import sql_models, schemas
 from app.services.coach_memory.service import initialize_coach_memory
 from app.validators.athlete_profile_validators import validate_athlete_profile
+from app.core.query_budget import query_budget
+from app.core.projection import parse_projection
+from app.core.responses import model_response
 
 # Configuration du Logger pour le debugging
 logger = logging.getLogger(__name__)
@@ -155,8 +158,16 @@ def transform_mobile_performance_data(raw_data: Dict[str, Any]) -> Dict[str, Any
 
 # --- ROUTE CRITIQUE POUR LE MOBILE ---
 
+# Projection de GET /me (?fields=basic_info,goals) : sections JSON chargées à la demande
+PROFILE_FIELDS = (
+    "id", "user_id", "basic_info", "physical_metrics", "sport_context", "training_preferences",
+    "goals", "constraints", "injury_prevention", "performance_baseline", "created_at", "updated_at",
+)
+
 @router.get("/me", response_model=schemas.AthleteProfileResponse)
+@query_budget(6)
 async def get_my_profile(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
@@ -164,10 +175,15 @@ async def get_my_profile(
     Récupère le profil de l'utilisateur connecté.
     Si aucun profil n'existe, crée un profil vide automatiquement.
     Route appelée par le mobile: GET /api/v1/profiles/me
+    ?fields=basic_info,goals : seules ces sections sont lues en base et renvoyées.
     """
-    profile = db.query(sql_models.AthleteProfile).filter(
+    projection = parse_projection(fields, None, PROFILE_FIELDS, required=("id", "user_id"))
+    query = db.query(sql_models.AthleteProfile).filter(
         sql_models.AthleteProfile.user_id == current_user.id
-    ).first()
+    )
+    if projection is not None:
+        query = query.options(load_only(*(getattr(sql_models.AthleteProfile, f) for f in projection.fields)))
+    profile = query.first()
     
     if not profile:
         logger.info(f"📝 Aucun profil trouvé pour user {current_user.id}, création d'un profil vide")
@@ -185,15 +201,22 @@ async def get_my_profile(
             constraints={}
         )
         
+        user_id = current_user.id  # lu avant le commit : pas de rechargement de l'utilisateur expiré
         db.add(profile)
         db.commit()
         db.refresh(profile)
         
-        logger.info(f"✅ Profil vide créé pour user {current_user.id}")
+        logger.info(f"✅ Profil vide créé pour user {user_id}")
+
+    if projection is not None:
+        # Seules les sections demandées sont validées (nettoyage legacy) ; les autres gardent leur défaut
+        data = {f: getattr(profile, f) for f in projection.fields}
+        return model_response(schemas.AthleteProfileResponse, data, include=set(projection.fields))
     
-    return profile
+    return model_response(schemas.AthleteProfileResponse, profile)
 
 @router.put("/me", response_model=schemas.AthleteProfileResponse)
+@query_budget(7)
 async def update_my_profile(
     profile_update: schemas.AthleteProfileUpdate,
     db: Session = Depends(get_db),
@@ -291,6 +314,7 @@ async def update_my_profile(
         )
 
 @router.post("/complete", response_model=schemas.AthleteProfileResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(8)
 async def create_complete_profile(
     profile_data: Dict[str, Any],
     db: Session = Depends(get_db),
@@ -345,14 +369,14 @@ async def create_complete_profile(
     )
     
     try:
+        user_id = current_user.id
         db.add(athlete_profile)
-        db.commit()
-        db.refresh(athlete_profile)
+        db.flush()
         
-        # Initialiser la mémoire du coach
+        # Initialiser la mémoire du coach (même transaction : profil et mémoire commités ensemble)
         initialize_coach_memory(athlete_profile, db)
         
-        logger.info(f"Profil wizard créé avec succès pour user {current_user.id}")
+        logger.info(f"Profil wizard créé avec succès pour user {user_id}")
         return athlete_profile
         
     except IntegrityError as e:
@@ -366,6 +390,7 @@ async def create_complete_profile(
 # --- AUTRES ROUTES (optionnelles, pour compatibilité) ---
 
 @router.get("/{profile_id}", response_model=schemas.AthleteProfileResponse)
+@query_budget(3)
 async def get_profile(
     profile_id: int,
     db: Session = Depends(get_db),
@@ -388,6 +413,7 @@ async def get_profile(
     return profile
 
 @router.put("/{profile_id}", response_model=schemas.AthleteProfileResponse)
+@query_budget(7)
 async def update_profile(
     profile_id: int,
     profile_update: schemas.AthleteProfileUpdate,
@@ -432,6 +458,7 @@ async def update_profile(
     return profile
 
 @router.patch("/{profile_id}/section/{section_name}")
+@query_budget(6)
 async def update_profile_section(
     profile_id: int,
     section_name: str,
@@ -487,6 +514,7 @@ async def update_profile_section(
     }
 
 @router.get("/{profile_id}/completion")
+@query_budget(3)
 async def get_profile_completion(
     profile_id: int,
     db: Session = Depends(get_db),
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models import sql_models, schemas
 from app.core import security
+from app.core.query_budget import query_budget
 
 router = APIRouter(
     prefix="/auth",
@@ -12,6 +13,7 @@ router = APIRouter(
 )
 
 @router.post("/signup", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(3)
 async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """
     Inscription d'un nouvel utilisateur.
@@ -71,6 +73,7 @@ async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/token", response_model=schemas.Token)
+@query_budget(1)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login : Vérifie pseudo/mot de passe et renvoie un Token JWT."""
     user = db.query(sql_models.User).filter(sql_models.User.username == form_data.username).first()
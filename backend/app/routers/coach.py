@@ -1,22 +1,35 @@
 import os
 import json
 import re
-import google.generativeai as genai
 from typing import List, Dict, Any
 from datetime import date, datetime
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, update
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal, release_connection
 from app.dependencies import get_current_user
 from app.models import sql_models, schemas
-from app.models.enums import MemoryType, ImpactLevel, MemoryStatus
+from app.models.enums import MemoryType, ImpactLevel, MemoryStatus, PlanKind
 from app.models.schemas import (
-    ProfileAuditRequest, ProfileAuditResponse, 
+    ProfileAuditRequest, ProfileAuditResponse, AuditReportResponse,
     StrategyResponse, WeeklyPlanResponse,
     GenerateWorkoutRequest, AIWorkoutPlan
 )
+from app.services.llm.context import PromptContextBuilder, get_prompt_context
+from app.services.llm.streaming import (
+    IncrementalJSONParser, sse_event, stream_json_events
+)
+from app.services.llm.backend import get_llm_backend
+from app.services.llm.resilience import LLMUnavailable
+from app.services.llm.cache_keys import semantic_cache_key, clean_workout_context, workout_tolerance
+from app.services.workout_templates.library import get_template_library
+from app.services.plans.store import PlanVersionConflict, clear_plan, plan_version, read_stored_plan, save_plan
+from app.core.query_budget import query_budget
+from app.core.compression import precompressed_response
+from app.core.http_cache import cache_headers, not_modified, not_modified_response
+from app.core.responses import model_response
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,11 +39,22 @@ router = APIRouter(
     tags=["AI Coach"]
 )
 
-# Configuration unique de l'IA
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Configuration unique de l'IA : la passerelle LLM (Gemini en production, fake en benchmark)
+def _require_llm():
+    """Retourne le backend LLM actif ou lève une 500 s'il n'est pas configuré."""
+    llm = get_llm_backend()
+    if not llm.is_configured():
+        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
+    return llm
 
 # --- UTILITAIRES ---
 
+def _unavailable(error: LLMUnavailable) -> HTTPException:
+    """IA protégée par le disjoncteur / la file : 503 + Retry-After plutôt qu'une 500 après timeout."""
+    return HTTPException(
+        status_code=503, detail=str(error), headers={"Retry-After": str(int(error.retry_after))}
+    )
+
 def clean_ai_json(text: str) -> str:
     """
     Nettoie la réponse de l'IA pour extraire uniquement le bloc JSON valide.
@@ -48,12 +72,13 @@ def clean_ai_json(text: str) -> str:
 
 # --- PROMPTS ---
 
-def get_profile_analysis_prompt_v2(profile_data):
+def get_profile_analysis_prompt_v2(profile_data, context_builder: PromptContextBuilder = None):
     """
     Génère le prompt pour l'audit du profil avec EXTRACTION MÉMORIELLE (Engrams).
     Le format de sortie est désormais un JSON strict.
     """
-    profile_str = json.dumps(profile_data, ensure_ascii=False, indent=2)
+    context_builder = context_builder or get_prompt_context("audit")
+    profile_str = context_builder.render(profile_data)
     return f"""
     RÔLE : Tu es le Lead Sport Scientist d'une fédération olympique (TitanFlow).
     TACHE : Auditer le profil d'un athlète et DÉFINIR LA LIGNE DIRECTRICE.
@@ -97,10 +122,11 @@ def get_profile_analysis_prompt_v2(profile_data):
     Impacts autorisés : SEVERE, MODERATE, INFO.
     """
 
-def get_periodization_prompt(profile_data):
+def get_periodization_prompt(profile_data, context_builder: PromptContextBuilder = None):
     """Génère le prompt pour la stratégie de périodisation (JSON)."""
+    context_builder = context_builder or get_prompt_context("periodization")
     today_str = date.today().strftime("%Y-%m-%d")
-    profile_str = json.dumps(profile_data, ensure_ascii=False, indent=2)
+    profile_str = context_builder.render(profile_data)
     cycle_goal = profile_data.get('goal', 'Performance Générale')
     target_date_str = profile_data.get('target_date', '2025-12-31')
 
@@ -138,11 +164,12 @@ def get_periodization_prompt(profile_data):
     }}
     """
 
-def get_weekly_planning_prompt(profile_data):
+def get_weekly_planning_prompt(profile_data, context_builder: PromptContextBuilder = None):
     """Génère le prompt complexe pour la semaine type."""
+    context_builder = context_builder or get_prompt_context("weekly")
     
     user_sport = profile_data.get('sport', 'Musculation')
-    avail = profile_data.get('availability', [])
+    avail = context_builder.project(profile_data).get('availability', [])
     
     slots_context = []
     for slot in avail:
@@ -154,7 +181,8 @@ def get_weekly_planning_prompt(profile_data):
                 "Type_Cible": slot.get('type')
             })
     
-    avail_json = json.dumps(slots_context, ensure_ascii=False, indent=2)
+    # Contrainte dure : un créneau retiré deviendrait un jour de REPOS, on ne coupe que les textes
+    avail_json = context_builder.fit(slots_context, keep_items=True)
 
     return f"""
     RÔLE : Entraîneur Expert en {user_sport}.
@@ -188,12 +216,16 @@ def get_weekly_planning_prompt(profile_data):
     }}
     """
 
-def get_workout_generation_prompt(profile_data, context):
+def get_workout_generation_prompt(profile_data, context, context_builder: PromptContextBuilder = None):
     """
     Génère une séance détaillée avec gestion stricte des MODES D'ENREGISTREMENT.
     """
+    context_builder = context_builder or get_prompt_context("workout")
     sport = profile_data.get('sport', 'Musculation')
     user_level = profile_data.get('level', 'Intermédiaire')
+    injuries = context_builder.project(profile_data).get('injuries') or 'Aucune'
+    if isinstance(injuries, (dict, list)):
+        injuries = context_builder.fit(injuries)
     
     duration = context.get('duration', 60)
     energy = context.get('energy', 5)
@@ -206,7 +238,7 @@ def get_workout_generation_prompt(profile_data, context):
 
     ATHLÈTE :
     - Sport : {sport} ({user_level})
-    - Blessures : {profile_data.get('injuries', 'Aucune')}
+    - Blessures : {injuries}
     
     CONTEXTE DU JOUR :
     - Durée Max : {duration} min
@@ -245,9 +277,205 @@ def get_workout_generation_prompt(profile_data, context):
     }}
     """
 
+# --- PERSISTANCE & STREAMING ---
+
+def _ensure_coach_memory(db: Session, user_id: int) -> int:
+    """Vérifie / crée le profil et la mémoire du coach. Retourne l'ID de la mémoire."""
+    # Une seule requête (profil + mémoire) au lieu de deux lazy loads en cascade
+    row = db.query(sql_models.AthleteProfile.id, sql_models.CoachMemory.id)\
+        .outerjoin(sql_models.CoachMemory, sql_models.CoachMemory.athlete_profile_id == sql_models.AthleteProfile.id)\
+        .filter(sql_models.AthleteProfile.user_id == user_id)\
+        .first()
+    profile_id, memory_id = row if row else (None, None)
+
+    if profile_id is None:
+        # Auto-création si manquant (Filet de sécurité)
+        profile = sql_models.AthleteProfile(user_id=user_id)
+        db.add(profile)
+        db.flush()
+        profile_id = profile.id
+
+    if memory_id is None:
+        memory = sql_models.CoachMemory(athlete_profile_id=profile_id)
+        db.add(memory)
+        db.flush()
+        memory_id = memory.id
+        db.commit()
+
+    return memory_id
+
+def _crystallize_audit(
+    db: Session,
+    user_id: int,
+    version: int,
+    memory_id: int,
+    profile_data: Dict[str, Any],
+    result_json: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Sauvegarde les Engrammes détectés par l'audit et le profil brut (Legacy).
+    `version` : version du dernier rapport d'audit lue avant l'appel IA (compare-and-swap, 409 si un autre audit l'a remplacé).
+    """
+    markdown_report = result_json.get("markdown_report", "Erreur de génération du rapport.")
+    detected_engrams = result_json.get("detected_engrams", [])
+
+    created_engrams_response = []
+
+    # Cristallisation (Sauvegarde des Engrammes)
+    if detected_engrams:
+        print(f"🧠 {len(detected_engrams)} souvenirs détectés. Cristallisation en cours...")
+        
+        for item in detected_engrams:
+            # Validation des Enums (Sécurité)
+            try:
+                m_type = MemoryType(item.get("type", "OTHER"))
+                m_impact = ImpactLevel(item.get("impact", "INFO"))
+            except ValueError:
+                m_type = MemoryType.OTHER
+                m_impact = ImpactLevel.INFO
+
+            # Création BDD
+            new_engram = sql_models.CoachEngram(
+                memory_id=memory_id,
+                author="COACH_AI_AUDIT",
+                type=m_type,
+                impact=m_impact,
+                status=MemoryStatus.ACTIVE,
+                content=item.get("content", "Information détectée"),
+                tags=item.get("tags", []),
+                start_date=datetime.utcnow()
+            )
+            db.add(new_engram)
+            created_engrams_response.append(new_engram)
+
+        # Un seul flush pour tous les engrammes (IDs disponibles sans commit global)
+        db.flush()
+        # Réponse figée avant le commit : évite un rechargement par engramme expiré
+        created_engrams_response = [
+            schemas.CoachEngramResponse.model_validate(engram) for engram in created_engrams_response
+        ]
+
+        # Mise à jour de la date de modification de la mémoire
+        db.query(sql_models.CoachMemory)\
+            .filter(sql_models.CoachMemory.id == memory_id)\
+            .update({"last_updated": datetime.utcnow()}, synchronize_session=False)
+
+    # Sauvegarde persistante des données JSON brutes (Legacy support)
+    _save_user_fields(db, user_id, profile_data=json.dumps(profile_data))
+
+    # Dernier rapport conservé (artefact compressé), relu par GET /coach/audit/report, puis commit
+    _save_plan(db, user_id, PlanKind.AUDIT_REPORT, version, {"markdown_report": markdown_report})
+    
+    return {
+        "markdown_report": markdown_report,
+        "generated_engrams": created_engrams_response
+    }
+
+def normalize_week(result: Any) -> Dict[str, Any]:
+    """Accepte une liste brute de séances et la ramène au format WeeklyPlanResponse."""
+    if "schedule" not in result and isinstance(result, list):
+        result = {"schedule": result, "reasoning": "Généré automatiquement."}
+    return result
+
+def normalize_workout_plan(parsed_response: Any) -> Dict[str, Any]:
+    """Ramène la réponse IA au format AIWorkoutPlan (objet unique, recording_mode par exercice)."""
+    if isinstance(parsed_response, list):
+        if parsed_response:
+            parsed_response = parsed_response[0]
+        else:
+            raise ValueError("L'IA a renvoyé une liste vide.")
+
+    if "exercises" not in parsed_response:
+        parsed_response["exercises"] = []
+
+    for exercise in parsed_response["exercises"]:
+        if "recording_mode" not in exercise:
+            exercise["recording_mode"] = "LOAD_REPS"
+    return parsed_response
+
+def _save_plan(db: Session, user_id: int, kind: PlanKind, version: int, plan: Any) -> None:
+    """Phase écriture d'un plan : compare-and-swap sur la version lue avant la génération, puis commit."""
+    try:
+        save_plan(db, user_id, kind, plan, version)
+    except PlanVersionConflict:
+        raise HTTPException(
+            status_code=409, detail="Plan modifié pendant la génération. Veuillez relancer."
+        )
+    db.commit()
+
+def _plan_response(request: Request, db: Session, user_id: int, kind: PlanKind, schema: Any, missing: str) -> Response:
+    """
+    Plan stocké avec revalidation HTTP (ETag = digest de l'artefact, Last-Modified) : 304 sans lire le contenu
+    si le client est à jour, sinon variantes pré-compressées (br / gzip / brut) :
+    validation + sérialisation + compression une seule fois par contenu.
+    """
+    plan = read_stored_plan(db, user_id, kind)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=missing)
+    headers = cache_headers(plan.digest, plan.updated_at)
+    if not_modified(request, headers):
+        return not_modified_response(headers)
+    return precompressed_response(
+        request, f"{schema.__name__}:{plan.digest}",
+        lambda: model_response(schema, json.loads(plan.text())).body,
+        headers=headers,
+    )
+
+def _save_user_fields(db: Session, user_id: int, **fields: Any) -> None:
+    """
+    Phase écriture du profil après l'audit IA. Le conflit entre audits se joue sur la version du rapport
+    (plans versionnés) : une modification du compte (pseudo, email) ou de la séquence de synchronisation
+    pendant l'appel ne refuse pas l'audit. La version de l'utilisateur est incrémentée pour que les
+    écritures ORM concurrentes (verrou optimiste) voient ce changement.
+    """
+    db.execute(
+        update(sql_models.User)
+        .where(sql_models.User.id == user_id)
+        .values(**fields, version=sql_models.User.version + 1)
+    )
+
+def _stream_to_sse(llm, kind: str, prompt: str, parser: IncrementalJSONParser, finalize, cache_key: str = None) -> StreamingResponse:
+    """
+    Relaie la génération IA en SSE (événements 'delta' / 'item'),
+    puis valide et persiste le JSON complet (événement 'done').
+    La persistance utilise une session dédiée : celle de la requête peut être fermée pendant le flux.
+    """
+    async def event_stream():
+        try:
+            chunks = llm.stream(prompt, kind, cache_key=cache_key)
+            async for event, data in stream_json_events(chunks, parser):
+                yield sse_event(event, data)
+
+            result_json = parser.result()
+            write_db = SessionLocal()
+            try:
+                yield sse_event("done", finalize(write_db, result_json))
+            except Exception:
+                write_db.rollback()
+                raise
+            finally:
+                write_db.close()
+        except LLMUnavailable as e:
+            yield sse_event("error", {"detail": str(e), "retry_after": int(e.retry_after)})
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail, "status": e.status_code})
+        except json.JSONDecodeError as e:
+            print(f"❌ Erreur JSON IA (stream): {e}")
+            yield sse_event("error", {"detail": "L'IA a renvoyé une réponse invalide. Veuillez réessayer."})
+        except Exception as e:
+            print(f"❌ Erreur stream IA: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- ROUTES ---
 
 @router.post("/audit", response_model=ProfileAuditResponse)
+@query_budget(14)
 async def audit_profile(
     payload: ProfileAuditRequest,
     db: Session = Depends(get_db),
@@ -257,211 +485,268 @@ async def audit_profile(
     Audit du profil athlète par l'IA.
     CRISTALLISATION SYNAPTIQUE : L'IA analyse le profil ET crée des souvenirs (Engrams) en BDD.
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
-    
-    # 1. Vérification / Création du Profil et de la Mémoire
-    if not current_user.athlete_profile:
-        # Auto-création si manquant (Filet de sécurité)
-        profile = sql_models.AthleteProfile(user_id=current_user.id)
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-        current_user.athlete_profile = profile
+    llm = _require_llm()
+    user_id = current_user.id
     
-    if not current_user.athlete_profile.coach_memory:
-        memory = sql_models.CoachMemory(athlete_profile_id=current_user.athlete_profile.id)
-        db.add(memory)
-        db.commit()
-        db.refresh(memory)
-
-    memory_id = current_user.athlete_profile.coach_memory.id
+    # 1. Phase lecture : vérification / création du Profil et de la Mémoire
+    memory_id = _ensure_coach_memory(db, user_id)
+    version = plan_version(db, user_id, PlanKind.AUDIT_REPORT)
+    # Connexion rendue au pool pendant l'appel IA (plusieurs secondes)
+    release_connection(db)
 
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"})
-        
         # 2. Appel IA avec le nouveau prompt structuré
-        response = model.generate_content(get_profile_analysis_prompt_v2(payload.profile_data))
+        response_text = await llm.generate(
+            get_profile_analysis_prompt_v2(payload.profile_data), "audit",
+            cache_key=semantic_cache_key("audit", payload.profile_data)
+        )
         
         # 3. Parsing du JSON
-        clean_text = clean_ai_json(response.text)
+        clean_text = clean_ai_json(response_text)
         result_json = json.loads(clean_text)
         
-        markdown_report = result_json.get("markdown_report", "Erreur de génération du rapport.")
-        detected_engrams = result_json.get("detected_engrams", [])
-
-        created_engrams_response = []
-
-        # 4. Cristallisation (Sauvegarde des Engrammes)
-        if detected_engrams:
-            print(f"🧠 {len(detected_engrams)} souvenirs détectés. Cristallisation en cours...")
-            
-            for item in detected_engrams:
-                # Validation des Enums (Sécurité)
-                try:
-                    m_type = MemoryType(item.get("type", "OTHER"))
-                    m_impact = ImpactLevel(item.get("impact", "INFO"))
-                except ValueError:
-                    m_type = MemoryType.OTHER
-                    m_impact = ImpactLevel.INFO
-
-                # Création BDD
-                new_engram = sql_models.CoachEngram(
-                    memory_id=memory_id,
-                    author="COACH_AI_AUDIT",
-                    type=m_type,
-                    impact=m_impact,
-                    status=MemoryStatus.ACTIVE,
-                    content=item.get("content", "Information détectée"),
-                    tags=item.get("tags", []),
-                    start_date=datetime.utcnow()
-                )
-                db.add(new_engram)
-                db.flush() # Pour avoir l'ID tout de suite sans commit global
-                
-                # Ajout à la réponse pour le frontend
-                created_engrams_response.append(new_engram)
-            
-            # Mise à jour de la date de modification de la mémoire
-            current_user.athlete_profile.coach_memory.last_updated = datetime.utcnow()
-
-        # 5. Sauvegarde persistante des données JSON brutes (Legacy support)
-        current_user.profile_data = json.dumps(payload.profile_data)
-        
-        db.commit()
-        
-        # 6. Retour structuré
-        return {
-            "markdown_report": markdown_report,
-            "generated_engrams": created_engrams_response
-        }
+        # 4. Phase écriture : Cristallisation + 5. Sauvegarde + 6. Retour structuré
+        return _crystallize_audit(db, user_id, version, memory_id, payload.profile_data, result_json)
 
     except json.JSONDecodeError as e:
         print(f"❌ Erreur JSON IA: {e}")
         # Fallback : on renvoie le texte brut si le JSON a échoué
-        return {"markdown_report": response.text, "generated_engrams": []}
+        return {"markdown_report": response_text, "generated_engrams": []}
+
+    except LLMUnavailable as e:
+        raise _unavailable(e)
+
+    except HTTPException:
+        raise
         
     except Exception as e:
         print(f"❌ Erreur audit: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/audit/stream")
+@query_budget(12)
+async def stream_audit_profile(
+    payload: ProfileAuditRequest,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Audit en streaming (SSE) : le rapport Markdown arrive au fil de la génération,
+    chaque Engramme est émis dès qu'il est complet, puis tout est cristallisé en fin de flux.
+    """
+    llm = _require_llm()
+
+    user_id = current_user.id
+    memory_id = _ensure_coach_memory(db, user_id)
+    version = plan_version(db, user_id, PlanKind.AUDIT_REPORT)
+    # Pas de connexion retenue pendant le flux : la persistance utilise sa propre session
+    release_connection(db)
+
+    def finalize(write_db: Session, result_json: Dict[str, Any]) -> Dict[str, Any]:
+        result = _crystallize_audit(write_db, user_id, version, memory_id, payload.profile_data, result_json)
+        return ProfileAuditResponse.model_validate(result, from_attributes=True).model_dump(mode="json")
+
+    parser = IncrementalJSONParser(text_fields=["markdown_report"], item_fields=["detected_engrams"])
+    return _stream_to_sse(
+        llm, "audit", get_profile_analysis_prompt_v2(payload.profile_data), parser, finalize,
+        cache_key=semantic_cache_key("audit", payload.profile_data)
+    )
+
+@router.get("/audit/report", response_model=AuditReportResponse)
+@query_budget(2)
+async def get_audit_report(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Récupère le dernier rapport d'audit (Markdown)."""
+    try:
+        return _plan_response(request, db, current_user.id, PlanKind.AUDIT_REPORT, AuditReportResponse, "Aucun audit trouvé.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erreur lecture audit: {e}")
+        raise HTTPException(status_code=500, detail="Erreur lecture audit.")
+
 # --- STRATÉGIE (Lecture & Écriture Persistante) ---
 
 @router.get("/strategy", response_model=StrategyResponse)
+@query_budget(2)
 async def get_strategy(
+    request: Request,
+    db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
     """Récupère la stratégie sauvegardée (si elle existe)."""
-    if not current_user.strategy_data:
-        raise HTTPException(status_code=404, detail="Aucune stratégie trouvée.")
     try:
-        data = json.loads(current_user.strategy_data)
-        return data
+        return _plan_response(request, db, current_user.id, PlanKind.STRATEGY, StrategyResponse, "Aucune stratégie trouvée.")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur lecture stratégie: {e}")
         raise HTTPException(status_code=500, detail="Erreur lecture stratégie.")
 
 @router.post("/strategy", response_model=StrategyResponse)
+@query_budget(6)
 async def generate_strategy(
     payload: ProfileAuditRequest,
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
     """Génère ET sauvegarde la stratégie."""
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
+    llm = _require_llm()
+    user_id = current_user.id
+    version = plan_version(db, user_id, PlanKind.STRATEGY)
+    release_connection(db)
     
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"})
-        response = model.generate_content(get_periodization_prompt(payload.profile_data))
+        response_text = await llm.generate(
+            get_periodization_prompt(payload.profile_data), "strategy",
+            cache_key=semantic_cache_key("strategy", payload.profile_data)
+        )
         
         # Nettoyage et Validation JSON
-        clean_text = clean_ai_json(response.text)
+        clean_text = clean_ai_json(response_text)
         strategy_data = json.loads(clean_text)
         
-        # Sauvegarde en BDD
-        current_user.strategy_data = json.dumps(strategy_data)
-        db.commit()
-        db.refresh(current_user)
+        # Phase écriture : transaction courte, compare-and-swap sur la version du plan
+        _save_plan(db, user_id, PlanKind.STRATEGY, version, strategy_data)
         
         return strategy_data
+    except LLMUnavailable as e:
+        raise _unavailable(e)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur Strategy Gen: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/strategy/stream")
+@query_budget(6)
+async def stream_strategy(
+    payload: ProfileAuditRequest,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Génère la stratégie en streaming (SSE) : chaque phase est émise dès qu'elle est complète."""
+    llm = _require_llm()
+
+    user_id = current_user.id
+    version = plan_version(db, user_id, PlanKind.STRATEGY)
+    release_connection(db)
+
+    def finalize(write_db: Session, strategy_data: Dict[str, Any]) -> Dict[str, Any]:
+        StrategyResponse.model_validate(strategy_data)
+        _save_plan(write_db, user_id, PlanKind.STRATEGY, version, strategy_data)
+        return strategy_data
+
+    parser = IncrementalJSONParser(text_fields=["periodization_logic"], item_fields=["phases"])
+    return _stream_to_sse(
+        llm, "strategy", get_periodization_prompt(payload.profile_data), parser, finalize,
+        cache_key=semantic_cache_key("strategy", payload.profile_data)
+    )
+
 # --- PLANNING SEMAINE (Lecture & Écriture Persistante) ---
 
 @router.get("/week", response_model=WeeklyPlanResponse)
+@query_budget(2)
 async def get_week(
+    request: Request,
+    db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
     """Récupère la semaine type sauvegardée."""
-    if not current_user.weekly_plan_data:
-         raise HTTPException(status_code=404, detail="Aucune semaine trouvée.")
     try:
-        data = json.loads(current_user.weekly_plan_data)
-        return data
+        return _plan_response(request, db, current_user.id, PlanKind.WEEK, WeeklyPlanResponse, "Aucune semaine trouvée.")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur lecture semaine: {e}")
         raise HTTPException(status_code=500, detail="Erreur lecture semaine.")
 
 @router.post("/week", response_model=WeeklyPlanResponse)
+@query_budget(6)
 async def generate_week(
     payload: ProfileAuditRequest,
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
     """Génère ET sauvegarde la semaine type."""
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
+    llm = _require_llm()
+    user_id = current_user.id
+    version = plan_version(db, user_id, PlanKind.WEEK)
+    release_connection(db)
     
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"})
-        
         prompt = get_weekly_planning_prompt(payload.profile_data)
-        response = model.generate_content(prompt)
+        response_text = await llm.generate(prompt, "week", cache_key=semantic_cache_key("week", payload.profile_data))
         
         # Nettoyage et Parsing
-        clean_text = clean_ai_json(response.text)
-        result = json.loads(clean_text)
-        
-        if "schedule" not in result and isinstance(result, list):
-            result = {"schedule": result, "reasoning": "Généré automatiquement."}
+        clean_text = clean_ai_json(response_text)
+        result = normalize_week(json.loads(clean_text))
         
-        # Sauvegarde en BDD
-        current_user.weekly_plan_data = json.dumps(result)
-        db.commit()
-        db.refresh(current_user)
+        # Phase écriture : transaction courte, compare-and-swap sur la version du plan
+        _save_plan(db, user_id, PlanKind.WEEK, version, result)
             
         return result
+    except LLMUnavailable as e:
+        raise _unavailable(e)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur Week Gen: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/week/stream")
+@query_budget(6)
+async def stream_week(
+    payload: ProfileAuditRequest,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Génère la semaine type en streaming (SSE) : chaque créneau est émis dès qu'il est complet."""
+    llm = _require_llm()
+
+    user_id = current_user.id
+    version = plan_version(db, user_id, PlanKind.WEEK)
+    release_connection(db)
+
+    def finalize(write_db: Session, result: Any) -> Dict[str, Any]:
+        result = normalize_week(result)
+        WeeklyPlanResponse.model_validate(result)
+        _save_plan(write_db, user_id, PlanKind.WEEK, version, result)
+        return result
+
+    parser = IncrementalJSONParser(text_fields=["reasoning"], item_fields=["schedule"])
+    return _stream_to_sse(
+        llm, "week", get_weekly_planning_prompt(payload.profile_data), parser, finalize,
+        cache_key=semantic_cache_key("week", payload.profile_data)
+    )
+
 # --- GESTION DES SÉANCES & BROUILLONS ---
 
 @router.get("/workout/draft", response_model=AIWorkoutPlan)
+@query_budget(2)
 async def get_draft_workout(
+    request: Request,
+    db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
     """
     Récupère le brouillon de séance en cours (si existant).
     Utile pour reprendre une session après un crash.
     """
-    if not current_user.draft_workout_data:
-        raise HTTPException(status_code=404, detail="Aucun brouillon trouvé.")
-    
     try:
-        return json.loads(current_user.draft_workout_data)
+        return _plan_response(request, db, current_user.id, PlanKind.DRAFT_WORKOUT, AIWorkoutPlan, "Aucun brouillon trouvé.")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur lecture brouillon: {e}")
         raise HTTPException(status_code=500, detail="Erreur lecture brouillon.")
 
 @router.delete("/workout/draft")
+@query_budget(5)
 async def discard_draft_workout(
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
@@ -470,7 +755,7 @@ async def discard_draft_workout(
     Supprime explicitement le brouillon (Abandon).
     """
     try:
-        current_user.draft_workout_data = None
+        clear_plan(db, current_user.id, PlanKind.DRAFT_WORKOUT)
         db.commit()
         return {"status": "success", "message": "Brouillon supprimé."}
     except Exception as e:
@@ -478,6 +763,7 @@ async def discard_draft_workout(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/workout", response_model=AIWorkoutPlan)
+@query_budget(6)
 async def generate_workout(
     payload: GenerateWorkoutRequest,
     db: Session = Depends(get_db),
@@ -485,41 +771,37 @@ async def generate_workout(
 ):
     """
     Génère une séance détaillée ET la sauvegarde en brouillon.
+    Les combinaisons courantes sont servies par la bibliothèque pré-générée, sans appel IA.
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
+    # Valeurs réelles dans le prompt ; les paliers ne servent qu'à la clé (tolérance vérifiée avant de servir le cache)
+    context = clean_workout_context(payload.context)
+    user_id = current_user.id
+    version = plan_version(db, user_id, PlanKind.DRAFT_WORKOUT)
+
+    library = get_template_library()
+    template = library.lookup(payload.profile_data, context) if library else None
+    if template is not None:
+        _save_plan(db, user_id, PlanKind.DRAFT_WORKOUT, version, template)
+        return template
+
+    llm = _require_llm()
+    release_connection(db)
     
+    clean_text = ""
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"})
-        
-        prompt = get_workout_generation_prompt(payload.profile_data, payload.context)
-        response = model.generate_content(prompt)
+        prompt = get_workout_generation_prompt(payload.profile_data, context)
+        response_text = await llm.generate(
+            prompt, "workout",
+            cache_key=semantic_cache_key("workout", payload.profile_data, context),
+            tolerance=workout_tolerance(context),
+        )
         
         # Nettoyage et Parsing
-        clean_text = clean_ai_json(response.text)
-        parsed_response = json.loads(clean_text)
-        
-        # Validation de la structure
-        if isinstance(parsed_response, list):
-            if parsed_response:
-                parsed_response = parsed_response[0]
-            else:
-                raise ValueError("L'IA a renvoyé une liste vide.")
+        clean_text = clean_ai_json(response_text)
+        parsed_response = normalize_workout_plan(json.loads(clean_text))
         
-        # Validation des exercices
-        if "exercises" not in parsed_response:
-            parsed_response["exercises"] = []
-        
-        # S'assurer que chaque exercice a un recording_mode
-        for exercise in parsed_response["exercises"]:
-            if "recording_mode" not in exercise:
-                exercise["recording_mode"] = "LOAD_REPS"
-        
-        # Sauvegarde automatique du brouillon
-        current_user.draft_workout_data = json.dumps(parsed_response)
-        db.commit()
-        db.refresh(current_user)
+        # Sauvegarde automatique du brouillon (transaction courte, compare-and-swap)
+        _save_plan(db, user_id, PlanKind.DRAFT_WORKOUT, version, parsed_response)
 
         return parsed_response
     except json.JSONDecodeError as e:
@@ -529,6 +811,15 @@ async def generate_workout(
             status_code=500, 
             detail="L'IA a renvoyé une réponse invalide. Veuillez réessayer."
         )
+    except LLMUnavailable as e:
+        # IA indisponible : séance pré-générée la plus proche plutôt qu'une erreur
+        fallback = library.nearest(payload.profile_data, context) if library else None
+        if fallback is None:
+            raise _unavailable(e)
+        _save_plan(db, user_id, PlanKind.DRAFT_WORKOUT, version, fallback)
+        return fallback
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erreur Workout Gen: {e}")
         raise HTTPException(
@@ -9,6 +9,7 @@ from app.core.database import get_db
 from app.dependencies import get_current_user
 from app.models import sql_models, schemas
 from app.models.enums import MemoryStatus
+from app.core.query_budget import query_budget
 
 router = APIRouter(
     prefix="/api/v1/coach-memories",
@@ -19,6 +20,7 @@ router = APIRouter(
 # 🧠 GET MY MEMORY (Route Principale - AVEC AUTO-HEALING)
 # ==============================================================================
 @router.get("/me", response_model=schemas.CoachMemoryResponse)
+@query_budget(6)
 async def get_my_coach_memory(
     current_user: sql_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -62,6 +64,7 @@ async def get_my_coach_memory(
 # 📥 GET ALL MEMORIES (Admin / Debug)
 # ==============================================================================
 @router.get("/", response_model=List[schemas.CoachMemoryOut])
+@query_budget(2)
 async def get_memories(
     db: Session = Depends(get_db),
     limit: int = 50,
@@ -79,6 +82,7 @@ async def get_memories(
 # ➕ ADD ENGRAM (LA ROUTE QUI MANQUAIT)
 # ==============================================================================
 @router.post("/engrams", response_model=schemas.CoachEngramResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(11)
 async def create_engram(
     engram_in: schemas.CoachEngramCreate,
     db: Session = Depends(get_db),
@@ -132,6 +136,7 @@ async def create_engram(
 # 📤 POST NEW MEMORY (Container Principal)
 # ==============================================================================
 @router.post("/", response_model=schemas.CoachMemoryOut, status_code=status.HTTP_201_CREATED)
+@query_budget(4)
 async def create_memory(
     memory_in: schemas.CoachMemoryCreate,
     db: Session = Depends(get_db),
@@ -140,16 +145,18 @@ async def create_memory(
     """
     Crée une nouvelle instance de mémoire Coach (Container).
     """
-    if not current_user.athlete_profile:
-        raise HTTPException(status_code=400, detail="Aucun profil athlète associé.")
+    # Profil et mémoire existante en une requête
+    row = db.query(sql_models.AthleteProfile.id, sql_models.CoachMemory.id)\
+        .outerjoin(sql_models.CoachMemory, sql_models.CoachMemory.athlete_profile_id == sql_models.AthleteProfile.id)\
+        .filter(sql_models.AthleteProfile.user_id == current_user.id)\
+        .first()
 
-    profile_id = current_user.athlete_profile.id
+    if row is None:
+        raise HTTPException(status_code=400, detail="Aucun profil athlète associé.")
 
-    existing_memory = db.query(sql_models.CoachMemory).filter(
-        sql_models.CoachMemory.athlete_profile_id == profile_id
-    ).first()
+    profile_id, existing_memory_id = row
 
-    if existing_memory:
+    if existing_memory_id is not None:
         raise HTTPException(status_code=409, detail="Une mémoire existe déjà.")
     
     new_memory = sql_models.CoachMemory(
@@ -170,6 +177,7 @@ async def create_memory(
 # 🔄 UPDATE ENGRAM (Logique Temporelle & Réactivation)
 # ==============================================================================
 @router.put("/engrams/{engram_id}", response_model=schemas.CoachEngramResponse)
+@query_budget(9)
 async def update_engram(
     engram_id: int,
     engram_update: schemas.CoachEngramCreate,
@@ -221,6 +229,7 @@ async def update_engram(
 # 🗑️ DELETE MEMORY
 # ==============================================================================
 @router.delete("/{memory_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(4)
 async def delete_memory(
     memory_id: int,
     db: Session = Depends(get_db)
@@ -240,6 +249,7 @@ async def delete_memory(
 # 🗑️ DELETE ENGRAM (La route manquante pour corriger l'erreur 405)
 # ==============================================================================
 @router.delete("/engrams/{engram_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(8)
 async def delete_engram(
     engram_id: int,
     db: Session = Depends(get_db),
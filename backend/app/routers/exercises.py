@@ -0,0 +1,73 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.query_budget import query_budget
+from app.core.responses import model_response
+from app.dependencies import get_current_user
+from app.models import sql_models, schemas
+from app.services.exercises.catalog import catalog
+
+router = APIRouter(
+    prefix="/exercises",
+    tags=["Exercises"]
+)
+
+Exercise, WorkoutSet, WorkoutSession = sql_models.Exercise, sql_models.WorkoutSet, sql_models.WorkoutSession
+
+@router.get("/", response_model=List[schemas.ExerciseResponse])
+@query_budget(4)
+async def list_exercises(
+    q: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Catalogue des exercices (saisie assistée du mobile).
+    ?q= : recherche sur les noms et alias (préfixe, sous-chaîne, puis fautes de frappe), par pertinence.
+    """
+    if not q:
+        exercises = db.query(Exercise).order_by(Exercise.name).limit(limit).all()
+        return model_response(List[schemas.ExerciseResponse], exercises)
+
+    ids = catalog.search(db, q, limit)
+    if not ids:
+        return model_response(List[schemas.ExerciseResponse], [])
+    found = {exercise.id: exercise for exercise in db.query(Exercise).filter(Exercise.id.in_(ids))}
+    return model_response(List[schemas.ExerciseResponse], [found[i] for i in ids if i in found])
+
+@router.get("/{exercise_id}/summary", response_model=schemas.ExerciseSummary)
+@query_budget(3)
+async def get_exercise_summary(
+    exercise_id: int,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Agrégats d'un exercice sur l'historique de l'athlète (séances, séries, volume, meilleure charge).
+    Parcours de l'index (exercise_id, session_id) : une seule requête, quelle que soit la graphie saisie.
+    """
+    exercise = db.get(Exercise, exercise_id)
+    if exercise is None:
+        raise HTTPException(status_code=404, detail="Exercice introuvable.")
+
+    row = db.execute(
+        select(
+            func.count(func.distinct(WorkoutSet.session_id)).label("sessions"),
+            func.count(WorkoutSet.id).label("sets"),
+            func.coalesce(func.sum(WorkoutSet.reps), 0.0).label("total_reps"),
+            func.coalesce(func.sum(case(
+                (WorkoutSet.metric_type == "LOAD_REPS", WorkoutSet.weight * WorkoutSet.reps), else_=0.0
+            )), 0.0).label("total_volume"),
+            func.max(WorkoutSet.weight).label("best_weight"),
+            func.min(WorkoutSession.date).label("first_date"),
+            func.max(WorkoutSession.date).label("last_date"),
+        )
+        .join(WorkoutSession, WorkoutSession.id == WorkoutSet.session_id)
+        .where(WorkoutSet.exercise_id == exercise_id, WorkoutSession.user_id == current_user.id)
+    ).one()
+    return model_response(schemas.ExerciseSummary, {"exercise_id": exercise.id, "name": exercise.name, **row._mapping})
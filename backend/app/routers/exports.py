@@ -0,0 +1,48 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.database import engine
+from app.core.query_budget import query_budget
+from app.dependencies import get_current_user
+from app.models import sql_models
+from app.services.exports.training import EXPORT_ADMINS, EXPORT_FORMATS, available, stream_export
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["Exports"]
+)
+
+@router.get("/training")
+@query_budget(2)
+async def export_training(
+    format: str = Query("parquet", pattern="^(parquet|arrow)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: Optional[List[int]] = Query(None),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Historique d'entraînement en colonnaire (une ligne par série, séance et exercice joints), streamé par lots.
+    format=parquet (défaut) ou arrow (flux Arrow IPC) ; filtres ?start= / ?end= (dates de séance) et ?user_id= (répétable).
+    Population entière réservée aux comptes EXPORT_ADMINS ; les autres comptes n'exportent que leur propre historique.
+    """
+    if not available():
+        raise HTTPException(status_code=503, detail="Export colonnaire indisponible : installer pyarrow.")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="Période invalide : start doit précéder end.")
+
+    user_ids = user_id
+    if current_user.username not in EXPORT_ADMINS:
+        if user_ids and set(user_ids) != {current_user.id}:
+            raise HTTPException(status_code=403, detail="Export limité à votre propre historique.")
+        user_ids = [current_user.id]
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(engine, format, start, end, user_ids),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="training_{date.today().isoformat()}.{extension}"'}
+    )
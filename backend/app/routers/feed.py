@@ -4,6 +4,8 @@ from typing import List
 from app.core.database import get_db
 from app.models import sql_models, schemas
 from app.dependencies import get_current_user
+from app.core.query_budget import query_budget
+from app.core.responses import model_response
 
 router = APIRouter(
     prefix="/feed",
@@ -11,6 +13,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.FeedItemResponse])
+@query_budget(3)
 async def get_my_feed(
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
@@ -25,9 +28,10 @@ async def get_my_feed(
         .filter(sql_models.FeedItem.is_completed == False)\
         .order_by(sql_models.FeedItem.priority.desc(), sql_models.FeedItem.created_at.desc())\
         .all()
-    return items
+    return model_response(List[schemas.FeedItemResponse], items)
 
 @router.patch("/{item_id}/read")
+@query_budget(5)
 async def mark_as_read(
     item_id: str,
     db: Session = Depends(get_db),
@@ -43,6 +47,7 @@ async def mark_as_read(
     return {"status": "success"}
 
 @router.patch("/{item_id}/complete")
+@query_budget(5)
 async def mark_as_completed(
     item_id: str,
     db: Session = Depends(get_db),
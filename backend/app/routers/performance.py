@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import OneRepMaxRequest, OneRepMaxResponse
 from app.domain import calculations
+from app.core.query_budget import query_budget
 
 router = APIRouter(
     prefix="/performance",
@@ -8,6 +9,7 @@ router = APIRouter(
 )
 
 @router.post("/1rm", response_model=OneRepMaxResponse)
+@query_budget(0)
 async def compute_one_rep_max(payload: OneRepMaxRequest):
     """
     Calcule le 1RM (One Rep Max) estimé basé sur une performance.
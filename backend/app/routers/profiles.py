@@ -4,6 +4,7 @@ from app.core.database import get_db
 from app.models import sql_models, schemas
 from app.dependencies import get_current_user
 from app.services.coach_logic import CoachLogic
+from app.core.query_budget import query_budget
 
 router = APIRouter(
     prefix="/api/v1",
@@ -11,6 +12,7 @@ router = APIRouter(
 )
 
 @router.get("/profiles/me", response_model=schemas.AthleteProfileResponse)
+@query_budget(4)
 async def get_my_profile(
     current_user: sql_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -24,6 +26,7 @@ async def get_my_profile(
     return current_user.athlete_profile
 
 @router.post("/profiles/complete", response_model=schemas.AthleteProfileResponse)
+@query_budget(6)
 async def complete_profile(
     profile_data: schemas.AthleteProfileCreate,
     current_user: sql_models.User = Depends(get_current_user),
@@ -55,6 +58,7 @@ async def complete_profile(
     return db_profile
 
 @router.get("/coach-memories/me", response_model=schemas.CoachMemoryResponse)
+@query_budget(3)
 async def get_my_coach_memory(
     current_user: sql_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -64,6 +68,7 @@ async def get_my_coach_memory(
     return current_user.athlete_profile.coach_memory
 
 @router.post("/coach-memories/recalculate")
+@query_budget(4)
 async def force_recalculate(
     current_user: sql_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
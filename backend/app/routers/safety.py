@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import ACWRRequest, ACWRResponse
 from app.domain import safety
+from app.core.query_budget import query_budget
 
 router = APIRouter(
     prefix="/safety",
@@ -8,6 +9,7 @@ router = APIRouter(
 )
 
 @router.post("/acwr", response_model=ACWRResponse)
+@query_budget(0)
 async def compute_acwr_metrics(payload: ACWRRequest):
     """
     Calcule le Ratio Aigu/Chronique (ACWR) pour prévenir les blessures.
@@ -0,0 +1,184 @@
+import secrets
+import uuid
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.dependencies import get_current_user
+from app.models import sql_models, schemas
+from app.models.enums import BatchJobStatus
+from app.core.query_budget import query_budget
+from app.services.llm.backend import get_llm_backend
+from app.services.squads.batch import (
+    ACTIVE_STATUSES, expire_stale_jobs, group_athletes, initial_progress, run_week_job
+)
+
+router = APIRouter(
+    prefix="/squads",
+    tags=["Squads"]
+)
+
+# Autorisations :
+# - seul le coach (créateur) voit le squad, son code d'invitation et lance les générations ;
+# - un athlète n'entre dans un squad que de lui-même, avec le code d'invitation (consentement),
+#   et peut en sortir à tout moment ;
+# - un squad inconnu et un squad d'un autre coach répondent tous deux 404.
+
+def _get_owned_squad(db: Session, squad_id: int, coach: sql_models.User) -> sql_models.Squad:
+    squad = db.query(sql_models.Squad)\
+        .filter(sql_models.Squad.id == squad_id, sql_models.Squad.coach_id == coach.id)\
+        .first()
+    if not squad:
+        raise HTTPException(status_code=404, detail="Squad introuvable.")
+    return squad
+
+def _members(db: Session, squad_id: int) -> List[tuple]:
+    """(membre, utilisateur) du squad en une requête."""
+    return db.query(sql_models.SquadMember, sql_models.User)\
+        .join(sql_models.User, sql_models.User.id == sql_models.SquadMember.user_id)\
+        .filter(sql_models.SquadMember.squad_id == squad_id)\
+        .order_by(sql_models.SquadMember.id)\
+        .all()
+
+def _squad_response(squad: sql_models.Squad, rows: List[tuple]) -> schemas.SquadResponse:
+    return schemas.SquadResponse(
+        id=squad.id,
+        name=squad.name,
+        coach_id=squad.coach_id,
+        invite_code=squad.invite_code,
+        members=[
+            schemas.SquadMemberResponse(user_id=user.id, username=user.username, joined_at=member.joined_at)
+            for member, user in rows
+        ],
+    )
+
+@router.post("/", response_model=schemas.SquadResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(3)
+async def create_squad(
+    payload: schemas.SquadCreate,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Crée un squad dont l'utilisateur connecté est le coach."""
+    squad = sql_models.Squad(
+        name=payload.name,
+        coach_id=current_user.id,
+        invite_code=secrets.token_urlsafe(8),
+    )
+    db.add(squad)
+    db.commit()
+    return _squad_response(squad, [])
+
+@router.post("/join", response_model=schemas.SquadResponse)
+@query_budget(5)
+async def join_squad(
+    payload: schemas.SquadJoin,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """L'athlète connecté rejoint un squad avec son code d'invitation."""
+    squad = db.query(sql_models.Squad).filter(sql_models.Squad.invite_code == payload.invite_code).first()
+    if not squad:
+        raise HTTPException(status_code=404, detail="Code d'invitation invalide.")
+
+    already = db.query(sql_models.SquadMember.id)\
+        .filter(sql_models.SquadMember.squad_id == squad.id, sql_models.SquadMember.user_id == current_user.id)\
+        .first()
+    if not already:
+        db.add(sql_models.SquadMember(squad_id=squad.id, user_id=current_user.id))
+        db.commit()
+
+    # Vue athlète : ni code d'invitation ni liste des membres
+    return schemas.SquadResponse(id=squad.id, name=squad.name, coach_id=squad.coach_id)
+
+@router.delete("/{squad_id}/membership")
+@query_budget(3)
+async def leave_squad(
+    squad_id: int,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """L'athlète connecté quitte le squad (le coach ne peut plus générer pour lui)."""
+    deleted = db.query(sql_models.SquadMember)\
+        .filter(sql_models.SquadMember.squad_id == squad_id, sql_models.SquadMember.user_id == current_user.id)\
+        .delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Vous n'êtes pas membre de ce squad.")
+    db.commit()
+    return {"status": "success", "message": "Squad quitté."}
+
+@router.get("/{squad_id}", response_model=schemas.SquadResponse)
+@query_budget(3)
+async def get_squad(
+    squad_id: int,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Détail du squad et de ses membres (coach uniquement)."""
+    squad = _get_owned_squad(db, squad_id, current_user)
+    return _squad_response(squad, _members(db, squad.id))
+
+@router.post("/{squad_id}/week", response_model=schemas.SquadPlanJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@query_budget(7)
+async def generate_squad_weeks(
+    squad_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Génère la semaine type de tous les membres du squad.
+    Les athlètes aux entrées équivalentes partagent une seule génération IA ;
+    l'avancement par athlète se suit sur GET /squads/jobs/{job_id}.
+    """
+    if not get_llm_backend().is_configured():
+        raise HTTPException(status_code=500, detail="Clé API Gemini manquante.")
+
+    squad = _get_owned_squad(db, squad_id, current_user)
+
+    # Un job orphelin (worker arrêté en cours de route) ne bloque pas le squad indéfiniment
+    expire_stale_jobs(db, squad.id)
+    running = db.query(sql_models.SquadPlanJob.id)\
+        .filter(
+            sql_models.SquadPlanJob.squad_id == squad.id,
+            sql_models.SquadPlanJob.status.in_(ACTIVE_STATUSES),
+        )\
+        .first()
+    if running:
+        raise HTTPException(status_code=409, detail=f"Génération déjà en cours (job {running.id}).")
+
+    users = [user for _, user in _members(db, squad.id)]
+    if not users:
+        raise HTTPException(status_code=400, detail="Le squad n'a aucun membre.")
+
+    groups, skipped = group_athletes(users)
+    job = sql_models.SquadPlanJob(
+        id=str(uuid.uuid4()),
+        squad_id=squad.id,
+        coach_id=current_user.id,
+        kind="week",
+        status=BatchJobStatus.PENDING,
+        athletes=initial_progress(groups, skipped),
+        groups=len(groups),
+    )
+    db.add(job)
+    db.commit()
+
+    background_tasks.add_task(run_week_job, job.id, groups)
+    return job
+
+@router.get("/jobs/{job_id}", response_model=schemas.SquadPlanJobResponse)
+@query_budget(2)
+async def get_squad_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Avancement d'une génération groupée, athlète par athlète (coach uniquement)."""
+    job = db.query(sql_models.SquadPlanJob)\
+        .filter(sql_models.SquadPlanJob.id == job_id, sql_models.SquadPlanJob.coach_id == current_user.id)\
+        .first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job introuvable.")
+    return job
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.query_budget import query_budget
+from app.core.responses import model_response
+from app.dependencies import get_current_user
+from app.models import sql_models, schemas
+from app.services.sync.delta import build_delta
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+@router.get("/", response_model=schemas.SyncResponse)
+@query_budget(8)
+async def sync(
+    since: int = 0,
+    limit: int = Query(500, ge=1, le=2000),
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Synchronisation incrémentale (mobile offline-first).
+    Renvoie les séances, séries, cartes du feed, engrammes, sections du profil et plans modifiés
+    depuis le jeton `since`, et les identifiants supprimés (tombstones).
+    Premier appel : since=0 (état complet). Appels suivants : since=<cursor> de la réponse précédente,
+    tant que has_more est vrai. reset=true : jeton inconnu, le client vide son cache local.
+    """
+    return model_response(schemas.SyncResponse, build_delta(db, current_user, since, limit))
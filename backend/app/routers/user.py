@@ -6,6 +6,7 @@ from typing import Dict, Any, Optional
 from app.core.database import get_db
 from app.models import sql_models, schemas
 from app.dependencies import get_current_user
+from app.core.query_budget import query_budget
 
 # 🚨 CORRECTIF ROUTING : On retire le préfixe ici.
 # Il sera injecté depuis le main.py pour plus de contrôle.
@@ -14,6 +15,7 @@ router = APIRouter()
 # --- ENDPOINTS PROFIL (Nouvelle Route: /api/v1/profiles/...) ---
 
 @router.get("/me", response_model=schemas.UserResponse)
+@query_budget(1)
 async def get_my_profile_data(
     current_user: sql_models.User = Depends(get_current_user),
 ):
@@ -30,6 +32,7 @@ async def get_my_profile_data(
     return current_user
 
 @router.post("/complete", response_model=schemas.UserResponse)
+@query_budget(4)
 async def complete_profile(
     profile_update: schemas.ProfileUpdate,
     db: Session = Depends(get_db),
@@ -82,6 +85,7 @@ async def complete_profile(
 # Ces routes seront désormais préfixées par /api/v1/profiles aussi via le main.py
 
 @router.post("/sections/{section}")
+@query_budget(3)
 async def update_profile_section(
     section: str,
     section_data: schemas.ProfileSectionUpdate,
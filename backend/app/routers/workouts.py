@@ -1,21 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer, selectinload
+from typing import Dict, List, Optional
 from app.core.database import get_db
 from app.models import sql_models, schemas
+from app.models.enums import PlanKind
 from app.dependencies import get_current_user
 import json
 
 # Imports du Moteur de Feed
 from app.services.feed.engine import TriggerEngine
 from app.services.feed.triggers.workout_analysis import WorkoutAnalysisTrigger
+from app.core.query_budget import query_budget
+from app.services.plans.store import clear_plan
+from app.services.workouts.upload import import_workouts, insert_sets, known_keys, run_batch_post_processing
+from app.services.artifacts.store import attach_workout_analysis, get_artifact, get_artifacts
+from app.core.projection import parse_projection, project
+from app.domain.set_validation import Violation, validate_session, validate_sessions
+from app.core.responses import FastJSONResponse, model_response
 
 router = APIRouter(
     prefix="/workouts",
     tags=["Workouts"]
 )
 
+# Projection de GET /workouts/ (?fields= / ?include=)
+WORKOUT_FIELDS = ("id", "date", "duration", "rpe", "energy_level", "notes", "ai_summary", "ai_analysis_ref")
+WORKOUT_INCLUDES = ("sets", "ai_analysis")
+SET_FIELDS = ("id", "exercise_id", "exercise_name", "set_order", "weight", "reps", "rpe", "rest_seconds", "metric_type")
+
+def _workout_detail(db: Session, workout: sql_models.WorkoutSession):
+    """Séance complète : l'analyse IA est relue (décompressée) depuis son artefact."""
+    response = schemas.WorkoutSessionResponse.model_validate(workout)
+    if workout.ai_analysis_ref:
+        response.ai_analysis = get_artifact(db, workout.ai_analysis_ref)
+    return model_response(schemas.WorkoutSessionResponse, response)
+
+def _load_workout(db: Session, user_id: int, workout_id: int) -> Optional[sql_models.WorkoutSession]:
+    return db.query(sql_models.WorkoutSession)\
+        .options(selectinload(sql_models.WorkoutSession.sets))\
+        .filter(sql_models.WorkoutSession.id == workout_id, sql_models.WorkoutSession.user_id == user_id)\
+        .first()
+
+# --- VALIDATION PHYSIOLOGIQUE (règles par metric_type : app/domain/set_validation.py) ---
+def _describe(violation: Violation) -> str:
+    if violation.set is None:
+        return violation.message
+    return f"Série {violation.set + 1} : {violation.message}"
+
+def validate_workout(workout: schemas.WorkoutSessionCreate):
+    """Valide les limites physiologiques humaines : HTTP 400 listant toutes les violations."""
+    violations = validate_session(workout)
+    if violations:
+        raise HTTPException(status_code=400, detail=" ; ".join(_describe(v) for v in violations))
+
 @router.post("/", response_model=schemas.WorkoutSessionResponse)
+@query_budget(32)
 async def create_workout(
     workout: schemas.WorkoutSessionCreate, 
     db: Session = Depends(get_db),
@@ -28,76 +69,13 @@ async def create_workout(
     Active le Neural Feed pour l'analyse post-séance.
     """
 
-    # --- VALIDATION PHYSIOLOGIQUE ---
-    def validate_physiological_limits(workout: schemas.WorkoutSessionCreate):
-        """Valide les limites physiologiques humaines."""
-        
-        # Durée réaliste (10min à 4h)
-        if workout.duration < 10 or workout.duration > 240:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Durée invalide ({workout.duration} min). Doit être entre 10 et 240 minutes."
-            )
-        
-        # RPE 1-10
-        if workout.rpe < 1 or workout.rpe > 10:
-            raise HTTPException(
-                status_code=400,
-                detail=f"RPE invalide ({workout.rpe}). Doit être entre 1 et 10."
-            )
-        
-        # Énergie 1-10
-        if workout.energy_level < 1 or workout.energy_level > 10:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Niveau d'énergie invalide ({workout.energy_level}). Doit être entre 1 et 10."
-            )
-        
-        # Validation des sets
-        for s in workout.sets:
-            # Watts max (record du monde ~2500W)
-            if s.metric_type == 'POWER_TIME' and s.weight > 2000:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Puissance impossible ({s.weight}W). Record du monde ~2500W."
-                )
-            
-            # Charge max (record +500kg)
-            if s.metric_type == 'LOAD_REPS' and s.weight > 500:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Charge impossible ({s.weight}kg). Record du monde ~500kg."
-                )
-            
-            # RPE série
-            if s.rpe and (s.rpe < 1 or s.rpe > 10):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"RPE série invalide ({s.rpe}). Doit être entre 1 et 10."
-                )
-        
-        return True
-
-    # Appliquer la validation
-    validate_physiological_limits(workout)
-
-    # 1. Validation de haut niveau avant insertion
-    for s in workout.sets:
-        # Validation RPE
-        if s.rpe is not None and (s.rpe < 0 or s.rpe > 10):
-            # On cap plutôt que de crasher
-            s.rpe = max(0, min(10, s.rpe))
-            
-        # Validation Physiologique selon le mode
-        if s.metric_type == 'POWER_TIME':
-            # Check Watts (weight)
-            if s.weight > 2000:
-                raise HTTPException(status_code=400, detail=f"Valeur impossible : {s.weight} Watts sur l'exercice {s.exercise_name}. Vérifiez la saisie.")
-        
-        elif s.metric_type == 'PACE_DISTANCE':
-            # Standard TitanFlow : Reps = Distance (m), Weight = 0 (ou vitesse m/s)
-            if s.reps > 100000: # 100km max par série pour être sûr
-                 raise HTTPException(status_code=400, detail=f"Distance suspecte : {s.reps} mètres.")
+    if workout.idempotency_key:
+        # Renvoi d'une séance déjà reçue (retry après timeout) : pas de doublon
+        existing = known_keys(db, current_user.id, [workout.idempotency_key])
+        if existing:
+            return _workout_detail(db, _load_workout(db, current_user.id, existing[workout.idempotency_key]))
+
+    validate_workout(workout)
 
     # 2. Création de la Session (INSERT)
     db_workout = sql_models.WorkoutSession(
@@ -106,34 +84,31 @@ async def create_workout(
         rpe=workout.rpe,
         energy_level=workout.energy_level,
         notes=workout.notes,
-        ai_analysis=workout.ai_analysis, # <--- AJOUT CRITIQUE POUR BE-03
-        user_id=current_user.id
+        user_id=current_user.id,
+        idempotency_key=workout.idempotency_key
     )
     db.add(db_workout)
-    db.commit()
-    db.refresh(db_workout)
+    # Analyse fournie par le client (BE-03) : rangée en artefact compressé
+    attach_workout_analysis(db, db_workout, workout.ai_analysis)
+    try:
+        db.flush()  # id de la séance ; séance et séries commitées ensemble (agrégats recalculés une fois)
+    except IntegrityError:
+        # Même clé envoyée en parallèle : la première requête a créé la séance
+        db.rollback()
+        existing = known_keys(db, current_user.id, [workout.idempotency_key])
+        if not existing:
+            raise
+        return _workout_detail(db, _load_workout(db, current_user.id, existing[workout.idempotency_key]))
     
-    # 3. Ajout des Séries (Sets)
+    # 3. Ajout des Séries (Sets) — INSERT groupé (un seul executemany, pas un INSERT par série)
     if workout.sets:
-        for s in workout.sets:
-            # Conversion explicite Pydantic -> SQL Model
-            db_set = sql_models.WorkoutSet(
-                session_id=db_workout.id,
-                exercise_name=s.exercise_name,
-                set_order=s.set_order,
-                weight=s.weight, # Déjà nettoyé par Pydantic (float)
-                reps=s.reps,     # Déjà nettoyé par Pydantic (float, secondes inclues)
-                rpe=s.rpe,
-                rest_seconds=s.rest_seconds, # <--- DEJA SUPPORTE PAR SQL MODEL
-                metric_type=s.metric_type    # <--- DEJA SUPPORTE PAR SQL MODEL
-            )
-            db.add(db_set)
+        insert_sets(db, current_user.id, [(db_workout.id, workout.sets)])
         
         # Nettoyage du brouillon après succès
-        current_user.draft_workout_data = None
+        clear_plan(db, current_user.id, PlanKind.DRAFT_WORKOUT)
         
-        db.commit()
-        db.refresh(db_workout)
+    db.commit()
+    db.refresh(db_workout)
 
     # 4. TRIGGER NEURAL FEED (L'IA s'active ici)
     try:
@@ -151,16 +126,50 @@ async def create_workout(
             "workout": db_workout,
             "profile": profile_data
         })
+        # L'analyse (pointeur d'artefact) est persistée même si la carte Feed est dédupliquée
+        db.commit()
     except Exception as e:
         # On ne bloque pas la réponse si l'IA échoue, c'est du bonus
         print(f"⚠️ Feed Engine Error: {e}")
     
-    return db_workout
+    return _workout_detail(db, db_workout)
 
-@router.get("/", response_model=List[schemas.WorkoutSessionResponse])
+@router.post("/batch", response_model=schemas.WorkoutBatchResponse)
+@query_budget(19)
+async def upload_workouts(
+    batch: schemas.WorkoutBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """
+    Import des séances enregistrées hors ligne (file d'attente du mobile), idempotent par clé client.
+    Tout le lot est validé en une passe avant la moindre écriture (400 listant chaque séance refusée et ses violations),
+    puis importé en une transaction. Les séances déjà reçues sont renvoyées en « duplicate ».
+    L'analyse IA (carte du feed) est lancée une fois pour le lot, en tâche de fond : voir app/services/workouts/upload.py.
+    """
+    violations = validate_sessions(batch.sessions)
+    if violations:
+        errors: Dict[int, dict] = {}
+        for v in violations:
+            error = errors.setdefault(v.session, {
+                "index": v.session, "idempotency_key": batch.sessions[v.session].idempotency_key, "violations": []
+            })
+            error["violations"].append({"set": v.set, "field": v.field, "value": v.value, "message": _describe(v)})
+        raise HTTPException(status_code=400, detail=list(errors.values()))
+
+    result = import_workouts(db, current_user.id, batch.sessions)
+    if result.latest_id is not None:
+        background_tasks.add_task(run_batch_post_processing, current_user.id, result.latest_id)
+    return model_response(schemas.WorkoutBatchResponse, result)
+
+@router.get("/", response_model=List[schemas.WorkoutSessionSummary])
+@query_budget(4)
 async def read_workouts(
     skip: int = 0, 
     limit: int = 100, 
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: sql_models.User = Depends(get_current_user)
 ):
@@ -168,11 +177,65 @@ async def read_workouts(
     Récupère l'historique complet.
     Les champs polymorphes (weight/reps) sont renvoyés tels quels,
     le Frontend utilisera 'metric_type' pour savoir si c'est des kg ou des watts.
+    L'analyse IA n'est pas renvoyée ici (résumé + pointeur) : voir GET /workouts/{id}.
+    Projection (écrans de liste) : ?fields=id,date,rpe&include=sets,ai_analysis (voir app/core/projection.py).
     """
-    workouts = db.query(sql_models.WorkoutSession)\
-        .filter(sql_models.WorkoutSession.user_id == current_user.id)\
-        .order_by(sql_models.WorkoutSession.date.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return workouts
\ No newline at end of file
+    projection = parse_projection(fields, include, WORKOUT_FIELDS, WORKOUT_INCLUDES)
+
+    if projection is None:
+        # Séries chargées en une requête (évite un lazy load par séance à la sérialisation)
+        workouts = db.query(sql_models.WorkoutSession)\
+            .options(selectinload(sql_models.WorkoutSession.sets), defer(sql_models.WorkoutSession.ai_analysis))\
+            .filter(sql_models.WorkoutSession.user_id == current_user.id)\
+            .order_by(sql_models.WorkoutSession.date.desc())\
+            .offset(skip)\
+            .limit(limit)\
+            .all()
+        return model_response(List[schemas.WorkoutSessionSummary], workouts)
+
+    # Colonnes demandées seulement (tuples, pas d'objets ORM) ; séries et analyses lues uniquement si incluses
+    names = list(projection.fields)
+    with_analysis = "ai_analysis" in projection.include
+    if with_analysis:
+        names.append("ai_analysis_ref")
+    rows = db.execute(
+        select(*(getattr(sql_models.WorkoutSession, name) for name in names))
+        .where(sql_models.WorkoutSession.user_id == current_user.id)
+        .order_by(sql_models.WorkoutSession.date.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    items = [project(row, projection.fields) for row in rows]
+
+    if "sets" in projection.include and rows:
+        sets_by_session = {row.id: [] for row in rows}
+        set_rows = db.execute(
+            select(sql_models.WorkoutSet.session_id, *(getattr(sql_models.WorkoutSet, name) for name in SET_FIELDS))
+            .where(sql_models.WorkoutSet.session_id.in_(sets_by_session))
+            .order_by(sql_models.WorkoutSet.session_id, sql_models.WorkoutSet.id)
+        )
+        for set_row in set_rows:
+            sets_by_session[set_row[0]].append(dict(zip(SET_FIELDS, set_row[1:])))
+        for item in items:
+            item["sets"] = sets_by_session[item["id"]]
+
+    if with_analysis:
+        analyses = get_artifacts(db, (row.ai_analysis_ref for row in rows))
+        for item, row in zip(items, rows):
+            item["ai_analysis"] = analyses.get(row.ai_analysis_ref)
+
+    # Réponse directe : pas de validation du modèle de liste complet
+    return FastJSONResponse(items)
+
+@router.get("/{workout_id}", response_model=schemas.WorkoutSessionResponse)
+@query_budget(4)
+async def read_workout(
+    workout_id: int,
+    db: Session = Depends(get_db),
+    current_user: sql_models.User = Depends(get_current_user)
+):
+    """Détail d'une séance, analyse IA complète incluse."""
+    workout = _load_workout(db, current_user.id, workout_id)
+    if not workout:
+        raise HTTPException(status_code=404, detail="Séance introuvable.")
+    return _workout_detail(db, workout)
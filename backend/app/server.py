@@ -0,0 +1,169 @@
+"""
+Lanceur de production pré-forké (Linux / macOS).
+
+Le process maître importe l'app (et les bibliothèques lourdes), crée le schéma et ouvre
+le socket une seule fois, puis forke N workers uvicorn qui partagent cette mémoire
+en copy-on-write. Les workers morts sont relancés ; SIGTERM / SIGINT arrêtent tout proprement.
+
+Le cache IA est adossé au disque partagé (AI_CACHE_BACKEND=tiered, fichier AI_CACHE_PATH)
+pour que les hits ne dépendent pas du worker qui reçoit la requête.
+
+Usage (depuis backend/) :
+    python -m app.server --port 8000
+    WEB_CONCURRENCY=4 python -m app.server
+
+Variables d'environnement :
+    WEB_CONCURRENCY   nombre de workers (défaut : nombre de cœurs disponibles)
+    PRELOAD_MODULES   modules importés dans le maître (défaut : pandas,google.generativeai)
+    AI_CACHE_PATH     fichier du cache IA partagé (chemin absolu conseillé ; absent : cache mémoire par worker)
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+logger = logging.getLogger("titanflow.server")
+
+DEFAULT_PRELOAD = "pandas,google.generativeai"
+
+def available_cores() -> int:
+    """Cœurs réellement alloués au process (affinité / quotas conteneur), au moins 1."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+def default_workers() -> int:
+    env = os.getenv("WEB_CONCURRENCY")
+    return int(env) if env else available_cores()
+
+def preload(modules: List[str]) -> None:
+    """Importe dans le maître les modules différés (partagés ensuite en copy-on-write)."""
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            logger.info(f"📦 Préchargé : {name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        except ImportError as e:
+            logger.warning(f"⚠️ Préchargement impossible ({name}) : {e}")
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+class PreforkServer:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str = "info"):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, int] = {}  # pid -> index du worker
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        # --- Enfant ---
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            self._run_worker(index)
+        except Exception as e:
+            logger.error(f"🔥 Worker {index} : {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _run_worker(self, index: int) -> None:
+        import uvicorn
+        from app.core.database import engine
+
+        # Les connexions du pool héritées du maître ne doivent pas être partagées
+        engine.dispose(close=False)
+        config = uvicorn.Config(self.app, log_level=self.log_level, proxy_headers=True)
+        server = uvicorn.Server(config)
+        logger.info(f"👷 Worker {index} prêt (pid {os.getpid()})")
+        server.run(sockets=[self.sock])
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        # Objets du maître gelés : le GC des workers ne les touche pas (pas de copie des pages)
+        gc.collect()
+        gc.freeze()
+
+        for index in range(self.workers):
+            self.spawn(index)
+        logger.info(f"🚀 {self.workers} workers démarrés (maître pid {os.getpid()})")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is not None and not self.stopping:
+                logger.warning(f"💀 Worker {index} (pid {pid}) arrêté (status {status}), relance...")
+                time.sleep(1)
+                self.spawn(index)
+
+        logger.info("👋 Serveur arrêté.")
+
+    def _handle_stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"🛑 Signal {signum} : arrêt des workers...")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur TitanFlow pré-forké")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("❌ Le mode pré-forké nécessite os.fork (Linux / macOS).")
+
+    logging.basicConfig(level=logging.INFO)
+    # Cache IA partagé entre workers (à fixer AVANT l'import de l'app)
+    os.environ.setdefault("AI_CACHE_BACKEND", "tiered")
+
+    start = time.perf_counter()
+    preload([m for m in os.getenv("PRELOAD_MODULES", DEFAULT_PRELOAD).split(",") if m])
+    from app import main as app_main
+
+    # Schéma créé une seule fois par le maître, pas par chaque worker
+    if not app_main.SKIP_DB_INIT:
+        app_main.init_db()
+        app_main.SKIP_DB_INIT = True
+    logger.info(f"🔥 App chargée dans le maître en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    sock = bind_socket(args.host, args.port)
+    PreforkServer(app_main.app, sock, args.workers, args.log_level).run()
+
+if __name__ == "__main__":
+    main()
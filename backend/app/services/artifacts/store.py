@@ -0,0 +1,197 @@
+"""
+Stockage des sorties IA volumineuses (analyses de séance, plans, rapports d'audit).
+
+Chaque artefact est :
+    - compressé (zlib ; gardé brut si la compression ne fait rien gagner),
+    - adressé par son contenu (sha256 du texte) : une sortie identique — séance de la bibliothèque,
+      semaine partagée par un squad, réponse servie par le cache sémantique — n'est stockée qu'une fois,
+      quel que soit le nombre d'utilisateurs qui la référencent,
+    - écrit par un INSERT ... ON CONFLICT (une requête, sûr entre workers) ; réécrire un contenu déjà
+      stocké rafraîchit son created_at, qui date donc la dernière écriture.
+
+Les artefacts non référencés sont purgés (prune_orphans) seulement après ARTIFACT_PRUNE_GRACE_HOURS :
+un artefact écrit par une transaction pas encore commitée (pointeur pas encore visible) n'est jamais supprimé.
+
+Les tables métier ne gardent qu'un pointeur (digest) et, pour les listes, un résumé court ;
+le texte complet n'est décompressé que par les routes de détail.
+
+Les fonctions acceptent une Session ou une Connection (utilisées aussi par migrate_db.py)
+et n'émettent pas de commit.
+
+Variables d'environnement :
+    ARTIFACT_ZLIB_LEVEL     niveau de compression (défaut 6)
+    ARTIFACT_SUMMARY_CHARS  longueur max des résumés de liste (défaut 160)
+    ARTIFACT_PRUNE_GRACE_HOURS  âge minimal d'un artefact orphelin avant purge (défaut 24)
+"""
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, exists, func, insert, or_, select, update
+
+from app.core.metrics import registry
+from app.models import sql_models
+
+load_dotenv()
+
+ARTIFACT_ZLIB_LEVEL = int(os.getenv("ARTIFACT_ZLIB_LEVEL", 6))
+ARTIFACT_SUMMARY_CHARS = int(os.getenv("ARTIFACT_SUMMARY_CHARS", 160))
+ARTIFACT_PRUNE_GRACE_HOURS = float(os.getenv("ARTIFACT_PRUNE_GRACE_HOURS", 24))
+
+AIArtifact = sql_models.AIArtifact
+
+ARTIFACT_BYTES = registry.counter(
+    "ai_artifact_bytes_total", "Octets des artefacts IA soumis au stockage, avant (raw) / après (stored) compression.")
+
+# Champs d'une analyse IA utilisables comme résumé, par ordre de préférence
+SUMMARY_FIELDS = ("feed_message", "performance_analysis", "markdown_report")
+
+def digest_of(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def encode(text: str) -> tuple:
+    """(codec, contenu) : zlib sauf si le texte compressé n'est pas plus petit."""
+    raw = text.encode("utf-8")
+    packed = zlib.compress(raw, ARTIFACT_ZLIB_LEVEL)
+    if len(packed) < len(raw):
+        return "zlib", packed
+    return "raw", raw
+
+def decode(codec: str, content: bytes) -> str:
+    if codec == "zlib":
+        content = zlib.decompress(content)
+    elif codec != "raw":
+        raise ValueError(f"Codec d'artefact inconnu : {codec}")
+    return bytes(content).decode("utf-8")
+
+def _touch_cutoff() -> datetime:
+    """Un artefact réécrit n'est rafraîchi que s'il a plus d'une demi-période de grâce (pas d'UPDATE à chaque hit)."""
+    return datetime.utcnow() - timedelta(hours=ARTIFACT_PRUNE_GRACE_HOURS / 2)
+
+def _insert_or_touch(db):
+    """
+    INSERT qui, pour un digest déjà présent, rafraîchit seulement created_at (dialectes supportés par l'application) :
+    un orphelin réutilisé par une nouvelle écriture ne peut plus être purgé avant que son pointeur soit commité.
+    """
+    bind = db if hasattr(db, "dialect") else db.get_bind()
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(AIArtifact).on_conflict_do_update(
+        index_elements=["digest"],
+        set_={"created_at": func.now()},
+        where=or_(AIArtifact.created_at.is_(None), AIArtifact.created_at < _touch_cutoff()),
+    )
+
+def _touch(db, digests: Iterable[str]) -> None:
+    stale = or_(AIArtifact.created_at.is_(None), AIArtifact.created_at < _touch_cutoff())
+    db.execute(update(AIArtifact).where(AIArtifact.digest.in_(list(digests)), stale).values(created_at=func.now()))
+
+def put_artifact(db, text: str) -> str:
+    """Stocke le texte (s'il est nouveau) et retourne son digest."""
+    digest = digest_of(text)
+    codec, content = encode(text)
+    values = {"digest": digest, "codec": codec, "size": len(text.encode("utf-8")), "content": content}
+    stmt = _insert_or_touch(db)
+    if stmt is None:
+        if db.execute(select(exists().where(AIArtifact.digest == digest))).scalar():
+            _touch(db, [digest])
+            return digest
+        stmt = insert(AIArtifact)
+    db.execute(stmt.values(**values))
+    ARTIFACT_BYTES.inc(stage="raw", amount=values["size"])
+    ARTIFACT_BYTES.inc(stage="stored", amount=len(content))
+    return digest
+
+def put_artifacts(db, texts: Iterable[str]) -> List[str]:
+    """Plusieurs artefacts en un INSERT groupé (executemany) ; digests dans l'ordre des textes."""
+    texts = list(texts)
+    digests = [digest_of(text) for text in texts]
+    rows = {}
+    for digest, text in zip(digests, texts):
+        if digest not in rows:
+            codec, content = encode(text)
+            rows[digest] = {"digest": digest, "codec": codec, "size": len(text.encode("utf-8")), "content": content}
+    if not rows:
+        return digests
+    stmt = _insert_or_touch(db)
+    if stmt is None:
+        present = set(db.execute(select(AIArtifact.digest).where(AIArtifact.digest.in_(rows))).scalars())
+        if present:
+            _touch(db, present)
+        rows = {digest: values for digest, values in rows.items() if digest not in present}
+        stmt = insert(AIArtifact)
+    if rows:
+        db.execute(stmt, list(rows.values()))
+    for values in rows.values():
+        ARTIFACT_BYTES.inc(stage="raw", amount=values["size"])
+        ARTIFACT_BYTES.inc(stage="stored", amount=len(values["content"]))
+    return digests
+
+def put_json_artifact(db, data: Any) -> str:
+    return put_artifact(db, json.dumps(data, sort_keys=True))
+
+def get_artifact(db, digest: Optional[str]) -> Optional[str]:
+    if not digest:
+        return None
+    row = db.execute(select(AIArtifact.codec, AIArtifact.content).where(AIArtifact.digest == digest)).first()
+    return decode(row.codec, row.content) if row else None
+
+def get_artifacts(db, digests: Iterable[str]) -> Dict[str, str]:
+    """Plusieurs artefacts en une requête : {digest: texte}."""
+    digests = {d for d in digests if d}
+    if not digests:
+        return {}
+    rows = db.execute(
+        select(AIArtifact.digest, AIArtifact.codec, AIArtifact.content).where(AIArtifact.digest.in_(digests))
+    )
+    return {row.digest: decode(row.codec, row.content) for row in rows}
+
+def summarize(text: Optional[str], limit: int = ARTIFACT_SUMMARY_CHARS) -> Optional[str]:
+    """Résumé d'une ligne pour les listes : message court de l'analyse IA, sinon début du texte."""
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        text = next((data[f] for f in SUMMARY_FIELDS if isinstance(data.get(f), str) and data[f].strip()), None)
+        if text is None:
+            return None
+    elif data is not None and not isinstance(data, str):
+        return None
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+def attach_workout_analysis(db, workout: sql_models.WorkoutSession, analysis: Optional[str]) -> None:
+    """Range l'analyse IA d'une séance : artefact compressé + résumé de liste (colonne legacy vidée)."""
+    if not analysis:
+        return
+    workout.ai_analysis_ref = put_artifact(db, analysis)
+    workout.ai_summary = summarize(analysis)
+    workout.ai_analysis = None
+
+def prune_orphans(db, grace_hours: float = ARTIFACT_PRUNE_GRACE_HOURS) -> int:
+    """
+    Supprime les artefacts qui ne sont plus référencés (plans régénérés, séances supprimées)
+    et n'ont pas été écrits depuis `grace_hours` : un artefact dont le pointeur n'est pas encore commité
+    (écriture en cours dans une autre transaction) n'est jamais concerné.
+    Lancé par le job quotidien (cleanup_old_data).
+    """
+    referenced = select(sql_models.UserPlan.digest).where(sql_models.UserPlan.digest.is_not(None)).union(
+        select(sql_models.WorkoutSession.ai_analysis_ref).where(sql_models.WorkoutSession.ai_analysis_ref.is_not(None))
+    )
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    result = db.execute(delete(AIArtifact).where(
+        AIArtifact.digest.not_in(referenced),
+        or_(AIArtifact.created_at.is_(None), AIArtifact.created_at < cutoff),
+    ))
+    return result.rowcount
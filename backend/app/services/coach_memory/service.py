@@ -12,6 +12,12 @@ from app.domain.bioenergetics import BioenergeticService
 
 logger = logging.getLogger(__name__)
 
+def load_section(value: Any) -> Dict[str, Any]:
+    """Colonne JSON d'un profil / d'une mémoire : dict, ou chaîne JSON des lignes écrites sérialisées (anciennes mémoires)."""
+    if not value:
+        return {}
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
 class CoachMemoryService:
     """Service principal pour la mémoire du coach"""
     
@@ -21,9 +27,9 @@ class CoachMemoryService:
         logger.info(f"Initialisation de la mémoire du coach pour l'athlète {athlete_profile.user_id}")
         
         # Extraire les données du profil
-        basic_info = json.loads(athlete_profile.basic_info) if athlete_profile.basic_info else {}
-        sport_context = json.loads(athlete_profile.sport_context) if athlete_profile.sport_context else {}
-        performance_baseline = json.loads(athlete_profile.performance_baseline) if athlete_profile.performance_baseline else {}
+        basic_info = load_section(athlete_profile.basic_info)
+        sport_context = load_section(athlete_profile.sport_context)
+        performance_baseline = load_section(athlete_profile.performance_baseline)
         
         # Calculer les insights initiaux
         sport_insights = CoachMemoryService._calculate_initial_sport_insights(sport_context, basic_info)
@@ -34,15 +40,15 @@ class CoachMemoryService:
         memory = sql_models.CoachMemory(
             athlete_profile_id=athlete_profile.id,
             # [CORRECTION] Utilisation de metadata_info
-            metadata_info=json.dumps({
+            metadata_info={
                 "athlete_id": athlete_profile.user_id,
                 "created_at": datetime.utcnow().isoformat(),
                 "last_updated": datetime.utcnow().isoformat(),
                 "total_interactions": 0,
                 "trust_score": 50,
                 "data_points": 0
-            }),
-            current_context=json.dumps({
+            },
+            current_context={
                 'season_week': 1,
                 'macrocycle_phase': initial_phase,
                 'mesocycle_focus': 'base_fitness',
@@ -51,20 +57,20 @@ class CoachMemoryService:
                 'days_to_competition': None,
                 'fatigue_state': 'fresh',
                 'readiness_score': 80,
-                'current_constraints': json.loads(athlete_profile.constraints) if athlete_profile.constraints else {},
+                'current_constraints': load_section(athlete_profile.constraints),
                 'environmental_factors': {},
                 'last_session_type': None,
                 'last_session_rpe': None
-            }),
-            response_patterns=json.dumps({
+            },
+            response_patterns={
                 "volume_response": "neutral",
                 "optimal_volumes": {},
                 "intensity_tolerance": "medium",
                 "recovery_profile": "normal",
                 "fatigue_indicators": []
-            }),
-            performance_baselines=json.dumps(performance_baselines),
-            adaptation_signals=json.dumps({
+            },
+            performance_baselines=performance_baselines,
+            adaptation_signals={
                 "positive_adaptations": [],
                 "last_adaptation_phase": None,
                 "current_adaptation_status": "initial",
@@ -72,9 +78,9 @@ class CoachMemoryService:
                 "regression_signals": [],
                 "adaptation_windows": [],
                 "next_suggested_focus": "base_fitness"
-            }),
-            sport_specific_insights=json.dumps(sport_insights),
-            training_history_summary=json.dumps({
+            },
+            sport_specific_insights=sport_insights,
+            training_history_summary={
                 "total_volume_by_type": {},
                 "average_rpe_by_type": {},
                 "successful_strategies": [],
@@ -83,10 +89,10 @@ class CoachMemoryService:
                 "seasonal_patterns": {},
                 "best_training_weeks": [],
                 "peak_periods": []
-            }),
-            athlete_preferences=json.dumps(json.loads(athlete_profile.training_preferences) if athlete_profile.training_preferences else {}),
-            coach_notes=json.dumps({}),
-            memory_flags=json.dumps({
+            },
+            athlete_preferences=load_section(athlete_profile.training_preferences),
+            coach_notes={},
+            memory_flags={
                 "needs_deload": False,
                 "approaching_overtraining": False,
                 "detraining_risk": False,
@@ -97,12 +103,14 @@ class CoachMemoryService:
                 "external_stress_high": False,
                 "recovery_impaired": False,
                 "motivation_low": False
-            })
+            }
         )
         
         db.add(memory)
+        db.flush()
+        memory_id = memory.id  # lu avant le commit : pas de rechargement de la mémoire
         db.commit()
-        logger.info(f"Mémoire du coach créée avec ID: {memory.id}")
+        logger.info(f"Mémoire du coach créée avec ID: {memory_id}")
         
         return memory
     
@@ -117,18 +125,18 @@ class CoachMemoryService:
         logger.info(f"Traitement de la séance pour la mémoire {coach_memory.id}")
         
         # [CORRECTION] Mettre à jour les métadonnées via metadata_info
-        metadata = json.loads(coach_memory.metadata_info) if coach_memory.metadata_info else {}
+        metadata = load_section(coach_memory.metadata_info)
         metadata['total_interactions'] = metadata.get('total_interactions', 0) + 1
         metadata['last_updated'] = datetime.utcnow().isoformat()
         
         # Mettre à jour le contexte
-        context = json.loads(coach_memory.current_context) if coach_memory.current_context else {}
+        context = load_section(coach_memory.current_context)
         context['last_session_type'] = session_data.get('type', 'unknown')
         context['last_session_rpe'] = session_data.get('rpe', 0)
         context['last_session_date'] = datetime.now().isoformat()
         
         # Mettre à jour l'historique d'entraînement
-        history = json.loads(coach_memory.training_history_summary) if coach_memory.training_history_summary else {}
+        history = load_section(coach_memory.training_history_summary)
         
         session_type = session_data.get('type', 'strength')
         volume = session_data.get('volume', 0)
@@ -149,13 +157,13 @@ class CoachMemoryService:
         history['average_rpe_by_type'][session_type]['count'] += 1
         
         # Calculer les réponses à l'entraînement
-        response_patterns = json.loads(coach_memory.response_patterns) if coach_memory.response_patterns else {}
+        response_patterns = load_section(coach_memory.response_patterns)
         
         # [CORRECTION] Sauvegarde
-        coach_memory.metadata_info = json.dumps(metadata)
-        coach_memory.current_context = json.dumps(context)
-        coach_memory.training_history_summary = json.dumps(history)
-        coach_memory.response_patterns = json.dumps(response_patterns)
+        coach_memory.metadata_info = metadata
+        coach_memory.current_context = context
+        coach_memory.training_history_summary = history
+        coach_memory.response_patterns = response_patterns
         
         db.commit()
         logger.info(f"Séance traitée pour la mémoire {coach_memory.id}")
@@ -172,17 +180,17 @@ class CoachMemoryService:
         logger.info(f"Recalcul complet de la mémoire {coach_memory.id}")
         
         # [CORRECTION] Recalculer tous les composants via metadata_info
-        metadata = json.loads(coach_memory.metadata_info) if coach_memory.metadata_info else {}
+        metadata = load_section(coach_memory.metadata_info)
         metadata['last_recalculated'] = datetime.utcnow().isoformat()
         metadata['version'] = metadata.get('version', 1) + 1
         
         # Recalculer les performances de base
-        performance_baseline = json.loads(athlete_profile.performance_baseline) if athlete_profile.performance_baseline else {}
+        performance_baseline = load_section(athlete_profile.performance_baseline)
         updated_baselines = CoachMemoryService._extract_initial_baselines(performance_baseline)
         
         # [CORRECTION] Mettre à jour la mémoire
-        coach_memory.metadata_info = json.dumps(metadata)
-        coach_memory.performance_baselines = json.dumps(updated_baselines)
+        coach_memory.metadata_info = metadata
+        coach_memory.performance_baselines = updated_baselines
         # Note: 'version' n'est pas une colonne SQL, elle est stockée dans le JSON metadata_info
         
         db.commit()
@@ -195,16 +203,16 @@ class CoachMemoryService:
     def update_daily_context(coach_memory, checkin_data, db):
         # ... Code existant inchangé ...
         logger.info(f"Mise à jour du contexte quotidien pour la mémoire {coach_memory.id}")
-        context = json.loads(coach_memory.current_context) if coach_memory.current_context else {}
+        context = load_section(coach_memory.current_context)
         readiness_score = CoachMemoryService._calculate_readiness_score(checkin_data, context)
         context['readiness_score'] = readiness_score
         context['fatigue_state'] = CoachMemoryService._determine_fatigue_state(readiness_score)
-        memory_flags = json.loads(coach_memory.memory_flags) if coach_memory.memory_flags else {}
+        memory_flags = load_section(coach_memory.memory_flags)
         memory_flags['needs_deload'] = readiness_score < 40
         memory_flags['adaptation_window_open'] = readiness_score > 70
         memory_flags['recovery_impaired'] = checkin_data.get('sleep_quality', 5) < 4
-        coach_memory.current_context = json.dumps(context)
-        coach_memory.memory_flags = json.dumps(memory_flags)
+        coach_memory.current_context = context
+        coach_memory.memory_flags = memory_flags
         db.commit()
         logger.info(f"Contexte mis à jour - Readiness: {readiness_score}")
         return context
@@ -212,9 +220,9 @@ class CoachMemoryService:
     @staticmethod
     def generate_insights(coach_memory, athlete_profile, db):
         # ... Code existant inchangé ...
-        context = json.loads(coach_memory.current_context) if coach_memory.current_context else {}
-        performance_baselines = json.loads(coach_memory.performance_baselines) if coach_memory.performance_baselines else {}
-        sport_insights = json.loads(coach_memory.sport_specific_insights) if coach_memory.sport_specific_insights else {}
+        context = load_section(coach_memory.current_context)
+        performance_baselines = load_section(coach_memory.performance_baselines)
+        sport_insights = load_section(coach_memory.sport_specific_insights)
         insights = {
             "readiness_insight": CoachMemoryService._generate_readiness_insight(context),
             "fatigue_management": CoachMemoryService._generate_fatigue_insight(context),
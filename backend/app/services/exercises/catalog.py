@@ -0,0 +1,299 @@
+"""
+Catalogue des exercices : nom canonique + graphies connues (alias), pour un exercise_id entier sur chaque série.
+
+"Squat", "squat " et "Back Squat" désignent le même exercice : la saisie libre du client est normalisée
+(minuscules, sans accents ni ponctuation) puis rattachée à un exercice par :
+    1. alias exact (dictionnaire en mémoire, aucune requête) ;
+    2. alias le plus proche (difflib, seuil EXERCISE_FUZZY_CUTOFF) : fautes de frappe, pluriels.
+       Rapprochement mot à mot (même nombre de mots, chacun au-dessus du seuil, mots courts identiques) et
+       sur le même metric_type : "hack squat" n'est pas "back squat", "planche" (gainage) n'est pas un exercice
+       en charge. La graphie n'est gardée qu'en mémoire du worker (non enregistrée en base, journalisée) :
+       un alias validé s'ajoute à SEED_CATALOG et est inséré par python migrate_db.py ;
+    3. sinon, nouvel exercice du catalogue (nom canonique = saisie nettoyée).
+Le dictionnaire est chargé une fois par worker ; une graphie inconnue le relit d'abord depuis la base
+(exercices créés par un autre worker). Écritures en INSERT ... ON CONFLICT DO NOTHING : sûres entre workers.
+
+Les fonctions acceptent une Session ou une Connection (utilisées aussi par migrate_db.py)
+et n'émettent pas de commit ; si la transaction d'une Session est annulée, le dictionnaire est relu.
+
+Variables d'environnement :
+    EXERCISE_FUZZY_CUTOFF       similarité minimale d'un rapprochement approché (défaut 0.8)
+    EXERCISE_FUZZY_MIN_CHARS    longueur minimale d'un mot rapproché (défaut 4 ; plus court : identique)
+"""
+import difflib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.metrics import registry
+from app.models import sql_models
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_FUZZY_CUTOFF = float(os.getenv("EXERCISE_FUZZY_CUTOFF", 0.8))
+EXERCISE_FUZZY_MIN_CHARS = int(os.getenv("EXERCISE_FUZZY_MIN_CHARS", 4))
+
+ExerciseTable = sql_models.Exercise.__table__
+AliasTable = sql_models.ExerciseAlias.__table__
+
+EXERCISE_RESOLUTIONS = registry.counter(
+    "exercise_resolutions_total", "Saisies d'exercice rattachées au catalogue (exact / fuzzy / created).")
+
+# Catalogue initial : (nom canonique, metric_type, alias)
+SEED_CATALOG: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("Squat", "LOAD_REPS", ("back squat", "squat barre", "barbell squat", "squat arriere")),
+    ("Front squat", "LOAD_REPS", ("squat avant", "squat clavicule")),
+    ("Développé couché", "LOAD_REPS", ("bench press", "bench", "developpe couche barre", "dc")),
+    ("Développé incliné", "LOAD_REPS", ("incline bench press", "developpe incline barre")),
+    ("Développé militaire", "LOAD_REPS", ("overhead press", "military press", "ohp", "shoulder press")),
+    ("Soulevé de terre", "LOAD_REPS", ("deadlift", "sdt", "souleve de terre conventionnel")),
+    ("Soulevé de terre roumain", "LOAD_REPS", ("romanian deadlift", "rdl", "sdt roumain")),
+    ("Hip thrust", "LOAD_REPS", ("hip thrust barre", "releve de bassin")),
+    ("Fentes", "LOAD_REPS", ("lunges", "fente", "fentes marchees", "walking lunges")),
+    ("Presse à cuisses", "LOAD_REPS", ("leg press", "presse")),
+    ("Leg curl", "LOAD_REPS", ("ischios machine", "leg curl allonge")),
+    ("Leg extension", "LOAD_REPS", ("extension jambes", "quadriceps machine")),
+    ("Rowing barre", "LOAD_REPS", ("barbell row", "bent over row", "rowing buste penche")),
+    ("Rowing haltère", "LOAD_REPS", ("dumbbell row", "rowing un bras")),
+    ("Tirage vertical", "LOAD_REPS", ("lat pulldown", "tirage poulie haute")),
+    ("Tractions", "BODYWEIGHT_REPS", ("pull ups", "pullups", "pull up", "traction", "tractions pronation")),
+    ("Dips", "BODYWEIGHT_REPS", ("dips barres paralleles", "dip")),
+    ("Pompes", "BODYWEIGHT_REPS", ("push ups", "pushups", "push up", "pompe")),
+    ("Burpees", "BODYWEIGHT_REPS", ("burpee",)),
+    ("Curl biceps", "LOAD_REPS", ("biceps curl", "curl barre", "curl halteres")),
+    ("Extension triceps", "LOAD_REPS", ("triceps extension", "barre au front", "skull crusher")),
+    ("Élévations latérales", "LOAD_REPS", ("lateral raise", "elevations laterales halteres")),
+    ("Mollets debout", "LOAD_REPS", ("calf raise", "mollets")),
+    ("Kettlebell swing", "LOAD_REPS", ("swing", "kb swing")),
+    ("Gainage", "ISOMETRIC_TIME", ("planche", "plank", "gainage ventral")),
+    ("Gainage latéral", "ISOMETRIC_TIME", ("side plank", "planche laterale")),
+    ("Chaise", "ISOMETRIC_TIME", ("wall sit", "chaise murale")),
+    ("Rameur", "POWER_TIME", ("rowing machine", "erg", "ergometre", "concept2")),
+    ("Vélo", "POWER_TIME", ("bike", "home trainer", "cycling", "velo d appartement")),
+    ("Course", "PACE_DISTANCE", ("running", "run", "footing", "course a pied")),
+    ("Course fractionnée", "PACE_DISTANCE", ("fractionne", "intervals", "interval running")),
+    ("Natation", "PACE_DISTANCE", ("swimming", "nage", "crawl")),
+)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize(name: Optional[str]) -> str:
+    """Clé de rapprochement : minuscules, sans accents, ponctuation et espaces multiples réduits."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(" ", text).strip()[:120]
+
+def _close_words(key: str, alias: str) -> bool:
+    """Rapprochement mot à mot : un mot différent (faute de frappe) ne change pas d'exercice."""
+    words, alias_words = key.split(), alias.split()
+    if len(words) != len(alias_words):
+        return False
+    for word, alias_word in zip(words, alias_words):
+        if word == alias_word:
+            continue
+        if min(len(word), len(alias_word)) < EXERCISE_FUZZY_MIN_CHARS:
+            return False
+        if difflib.SequenceMatcher(None, word, alias_word).ratio() < EXERCISE_FUZZY_CUTOFF:
+            return False
+    return True
+
+def display_name(name: str) -> str:
+    """Nom canonique d'un exercice créé depuis une saisie libre."""
+    name = " ".join(name.split())[:120]
+    return name[:1].upper() + name[1:]
+
+def _insert_ignore(db, table, index_elements: List[str]):
+    bind = db if hasattr(db, "dialect") else db.get_bind()
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+def _insert_missing(db, table, key: str, rows: List[dict]) -> None:
+    if not rows:
+        return
+    stmt = _insert_ignore(db, table, [key])
+    if stmt is None:
+        present = set(db.execute(select(table.c[key]).where(table.c[key].in_([row[key] for row in rows]))).scalars())
+        rows = [row for row in rows if row[key] not in present]
+        stmt = insert(table)
+    if rows:
+        db.execute(stmt, rows)
+
+class ExerciseCatalog:
+    """Dictionnaire alias normalisé -> exercise_id, partagé par le worker."""
+
+    def __init__(self):
+        self._aliases: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._metrics: Dict[int, str] = {}
+        self._fuzzy: Dict[str, int] = {}  # rapprochements approchés : mémoire du worker, jamais en base
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _refresh(self, db) -> None:
+        aliases = dict(db.execute(select(AliasTable.c.alias, AliasTable.c.exercise_id)).all())
+        rows = db.execute(select(ExerciseTable.c.id, ExerciseTable.c.name, ExerciseTable.c.metric_type)).all()
+        with self._lock:
+            self._aliases, self._loaded = aliases, True
+            self._names = {exercise_id: name for exercise_id, name, _ in rows}
+            self._metrics = {exercise_id: metric_type for exercise_id, _, metric_type in rows}
+
+    def _ensure_loaded(self, db) -> bool:
+        """Charge le dictionnaire au premier usage ; True s'il vient d'être lu (inutile de le relire)."""
+        if self._loaded:
+            return False
+        self._refresh(db)
+        if not self._aliases:
+            seed_catalog(db)
+            self._refresh(db)
+            if isinstance(db, Session):
+                db.info[_LEARNED] = True
+        return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._aliases, self._names, self._metrics, self._fuzzy, self._loaded = {}, {}, {}, {}, False
+
+    def name(self, exercise_id: int) -> Optional[str]:
+        return self._names.get(exercise_id)
+
+    def resolve(self, db, names: Iterable[str], metric_types: Optional[Dict[str, str]] = None) -> Dict[str, Optional[int]]:
+        """
+        Saisie -> exercise_id (None pour une saisie vide). Sans requête si toutes les graphies sont connues ;
+        sinon une relecture du catalogue puis quelques INSERT groupés pour les nouvelles graphies.
+        `metric_types` : mode d'enregistrement des séries (metric_type des exercices créés).
+        """
+        fresh = self._ensure_loaded(db)
+        keys = {name: normalize(name) for name in set(names) if name is not None}
+        unknown = {key for key in keys.values() if key and key not in self._aliases and key not in self._fuzzy}
+        if unknown and not fresh:
+            self._refresh(db)  # graphies apprises entre-temps par un autre worker
+            unknown = {key for key in unknown if key not in self._aliases}
+        if unknown:
+            originals = {}
+            for name, key in sorted(keys.items()):  # graphie retenue pour un nouvel exercice : déterministe
+                originals.setdefault(key, name)
+            self._learn(db, unknown, originals, metric_types or {})
+        else:
+            EXERCISE_RESOLUTIONS.inc(len(keys), result="exact")
+        return {name: self._aliases.get(key, self._fuzzy.get(key)) for name, key in keys.items()}
+
+    def _closest(self, key: str, known: List[str], metric_type: Optional[str]) -> Optional[int]:
+        """exercise_id de l'alias le plus proche qui passe le rapprochement mot à mot et le metric_type."""
+        if len(key) < EXERCISE_FUZZY_MIN_CHARS:
+            return None
+        for match in difflib.get_close_matches(key, known, n=5, cutoff=EXERCISE_FUZZY_CUTOFF):
+            exercise_id = self._aliases[match]
+            if metric_type and self._metrics.get(exercise_id) != metric_type:
+                continue
+            if _close_words(key, match):
+                return exercise_id
+        return None
+
+    def _learn(self, db, unknown: Iterable[str], originals: Dict[str, str], metric_types: Dict[str, str]) -> None:
+        known = list(self._aliases)
+        fuzzy: Dict[str, int] = {}
+        created: Dict[str, str] = {}  # clé -> nom canonique à créer
+        for key in sorted(unknown):
+            exercise_id = self._closest(key, known, metric_types.get(originals[key]))
+            if exercise_id is not None:
+                fuzzy[key] = exercise_id
+                logger.info(f"🔎 Exercice '{originals[key]}' rapproché de '{self._names.get(exercise_id)}' "
+                            "(non enregistré : alias à valider dans SEED_CATALOG)")
+            else:
+                created[key] = display_name(originals[key])
+
+        _insert_missing(db, ExerciseTable, "name", [
+            {"name": name, "metric_type": metric_types.get(originals[key]) or "LOAD_REPS"}
+            for key, name in created.items()
+        ])
+        exercises, learned = [], {}
+        if created:
+            exercises = db.execute(
+                select(ExerciseTable.c.name, ExerciseTable.c.id, ExerciseTable.c.metric_type)
+                .where(ExerciseTable.c.name.in_(list(created.values())))
+            ).all()
+            ids = {name: exercise_id for name, exercise_id, _ in exercises}
+            rows = [{"alias": key, "exercise_id": ids[name]} for key, name in created.items()]
+            _insert_missing(db, AliasTable, "alias", rows)
+            # Relecture : en cas de course entre workers, l'alias déjà enregistré fait foi
+            learned = dict(db.execute(
+                select(AliasTable.c.alias, AliasTable.c.exercise_id).where(AliasTable.c.alias.in_(list(created)))
+            ).all())
+        with self._lock:
+            self._aliases.update(learned)
+            self._fuzzy.update(fuzzy)
+            self._names.update({exercise_id: name for name, exercise_id, _ in exercises})
+            self._metrics.update({exercise_id: metric_type for _, exercise_id, metric_type in exercises})
+        if isinstance(db, Session):
+            db.info[_LEARNED] = True
+        EXERCISE_RESOLUTIONS.inc(len(fuzzy), result="fuzzy")
+        EXERCISE_RESOLUTIONS.inc(len(created), result="created")
+
+    def search(self, db, query: str, limit: int = 20) -> List[int]:
+        """Exercices correspondant à une saisie partielle : préfixe / sous-chaîne, puis rapprochement approché."""
+        self._ensure_loaded(db)
+        key = normalize(query)
+        if not key:
+            return []
+        ranked: List[Tuple[float, int, int]] = []
+        for alias, exercise_id in self._aliases.items():
+            if alias.startswith(key):
+                score = 3.0
+            elif key in alias:
+                score = 2.0
+            else:
+                score = difflib.SequenceMatcher(None, key, alias).ratio()
+                if score < 0.6:
+                    continue
+            ranked.append((score, len(alias), exercise_id))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        ids: List[int] = []
+        for _, _, exercise_id in ranked:
+            if exercise_id not in ids:
+                ids.append(exercise_id)
+            if len(ids) == limit:
+                break
+        return ids
+
+catalog = ExerciseCatalog()
+
+_LEARNED = "exercise_catalog_learned"
+
+@event.listens_for(Session, "after_commit")
+def _keep_learned(session: Session) -> None:
+    session.info.pop(_LEARNED, None)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_learned(session: Session) -> None:
+    # Graphies apprises dans une transaction annulée : le dictionnaire est relu au prochain usage
+    if session.info.pop(_LEARNED, None):
+        catalog.reset()
+
+def seed_catalog(db) -> int:
+    """Insère le catalogue initial (exercices et alias absents) ; retourne le nombre d'alias soumis."""
+    _insert_missing(db, ExerciseTable, "name", [
+        {"name": name, "metric_type": metric_type} for name, metric_type, _ in SEED_CATALOG
+    ])
+    ids = dict(db.execute(select(ExerciseTable.c.name, ExerciseTable.c.id)).all())
+    rows = {}
+    for name, _, aliases in SEED_CATALOG:
+        for alias in (name,) + aliases:
+            rows.setdefault(normalize(alias), {"alias": normalize(alias), "exercise_id": ids[name]})
+    _insert_missing(db, AliasTable, "alias", list(rows.values()))
+    return len(rows)
@@ -0,0 +1,193 @@
+"""
+Export colonnaire de l'historique d'entraînement (coachs, data science) : une ligne par série,
+jointe à sa séance et au catalogue d'exercices, en Parquet ou en flux Arrow IPC.
+
+    GET /exports/training      export HTTP streamé (app/routers/exports.py)
+    python export_training.py  export vers un fichier (même code)
+
+Une seule requête, lue par lots (curseur serveur : stream_results / yield_per) : chaque lot de
+EXPORT_CHUNK_ROWS séries devient un RecordBatch Arrow (un row group Parquet), écrit puis relâché.
+La mémoire reste bornée par la taille d'un lot, quelle que soit la taille de l'historique exporté.
+
+pyarrow est une dépendance optionnelle, importée au premier export (pas au démarrage des workers) :
+sans lui, l'export répond ExportUnavailable.
+
+Variables d'environnement :
+    EXPORT_CHUNK_ROWS           séries par lot (défaut 50 000)
+    EXPORT_PARQUET_COMPRESSION  codec Parquet (défaut zstd)
+    EXPORT_ADMINS               utilisateurs (username, séparés par des virgules) autorisés à exporter
+                                toute la population ; les autres n'exportent que leur propre historique
+"""
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import registry
+from app.models import sql_models
+
+load_dotenv()
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 50000))
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+EXPORT_ADMINS = frozenset(name.strip() for name in os.getenv("EXPORT_ADMINS", "").split(",") if name.strip())
+
+# format -> (Content-Type, extension)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+WorkoutSession, WorkoutSet, Exercise = sql_models.WorkoutSession, sql_models.WorkoutSet, sql_models.Exercise
+
+# Colonnes exportées : (nom, colonne SQL, type Arrow)
+COLUMNS = (
+    ("session_id", WorkoutSet.session_id, "int64"),
+    ("user_id", WorkoutSession.user_id, "int64"),
+    ("date", WorkoutSession.date, "date32"),
+    ("duration", WorkoutSession.duration, "float64"),
+    ("session_rpe", WorkoutSession.rpe, "float64"),
+    ("energy_level", WorkoutSession.energy_level, "int32"),
+    ("set_id", WorkoutSet.id, "int64"),
+    ("set_order", WorkoutSet.set_order, "int32"),
+    ("exercise_id", WorkoutSet.exercise_id, "int64"),
+    ("exercise", Exercise.name, "string"),
+    ("exercise_name", WorkoutSet.exercise_name, "string"),
+    ("metric_type", WorkoutSet.metric_type, "string"),
+    ("weight", WorkoutSet.weight, "float64"),
+    ("reps", WorkoutSet.reps, "float64"),
+    ("rpe", WorkoutSet.rpe, "float64"),
+    ("rest_seconds", WorkoutSet.rest_seconds, "int32"),
+)
+
+EXPORTED_ROWS = registry.counter("training_export_rows_total", "Séries exportées en colonnaire, par format.")
+
+class ExportUnavailable(RuntimeError):
+    """pyarrow absent : export colonnaire impossible."""
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    batches: int = 0
+    bytes: int = 0
+
+def _pyarrow():
+    """Module pyarrow (import différé : pyarrow et numpy coûtent ~190 ms au démarrage) ; None s'il est absent."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:  # dépendance optionnelle : export colonnaire désactivé
+        return None
+    return pyarrow
+
+def available() -> bool:
+    return _pyarrow() is not None
+
+def schema():
+    pyarrow = _pyarrow()
+    return pyarrow.schema([(name, getattr(pyarrow, arrow_type)()) for name, _, arrow_type in COLUMNS])
+
+def export_query(start: Optional[date] = None, end: Optional[date] = None, user_ids: Optional[Sequence[int]] = None):
+    """Séries jointes à leur séance, dans l'ordre des clés (parcours d'index, pas de tri global)."""
+    query = (
+        select(*(column.label(name) for name, column, _ in COLUMNS))
+        .join(WorkoutSession, WorkoutSession.id == WorkoutSet.session_id)
+        .outerjoin(Exercise, Exercise.id == WorkoutSet.exercise_id)
+        .order_by(WorkoutSet.id)
+    )
+    if start is not None:
+        query = query.where(WorkoutSession.date >= start)
+    if end is not None:
+        query = query.where(WorkoutSession.date <= end)
+    if user_ids:
+        query = query.where(WorkoutSession.user_id.in_(list(user_ids)))
+    return query
+
+class _ChunkSink:
+    """Fichier en écriture seule qui garde les octets jusqu'au prochain drain() (flux HTTP)."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _writer(pyarrow, sink, fmt: str, arrow_schema):
+    if fmt == "parquet":
+        return pyarrow.parquet.ParquetWriter(sink, arrow_schema, compression=EXPORT_PARQUET_COMPRESSION)
+    return pyarrow.ipc.new_stream(sink, arrow_schema)
+
+def stream_export(
+    bind: Engine,
+    fmt: str = "parquet",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_ids: Optional[Sequence[int]] = None,
+    chunk_rows: Optional[int] = None,
+    stats: Optional[ExportStats] = None,
+) -> Iterator[bytes]:
+    """
+    Octets du fichier exporté, lot par lot (sa propre connexion : utilisable après la fin de la requête HTTP).
+    Un lot de séries en mémoire à la fois ; `stats` (optionnel) reçoit les compteurs de l'export.
+    """
+    pyarrow = _pyarrow()
+    if pyarrow is None:
+        raise ExportUnavailable("Export colonnaire indisponible : installer pyarrow.")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    chunk_rows = chunk_rows or EXPORT_CHUNK_ROWS
+    stats = stats if stats is not None else ExportStats()
+
+    arrow_schema = schema()
+    types = [field.type for field in arrow_schema]
+    sink = _ChunkSink()
+    writer = _writer(pyarrow, sink, fmt, arrow_schema)
+    try:
+        with bind.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(
+                export_query(start, end, user_ids)
+            )
+            for rows in result.partitions():
+                columns = zip(*rows)
+                batch = pyarrow.RecordBatch.from_arrays(
+                    [pyarrow.array(values, type=arrow_type) for values, arrow_type in zip(columns, types)],
+                    schema=arrow_schema,
+                )
+                writer.write_batch(batch)
+                stats.rows += len(rows)
+                stats.batches += 1
+                data = sink.drain()
+                if data:
+                    stats.bytes += len(data)
+                    yield data
+    finally:
+        # Requête en échec ou client déconnecté (GeneratorExit) : le writer est libéré dans tous les cas
+        writer.close()
+    data = sink.drain()
+    stats.bytes += len(data)
+    EXPORTED_ROWS.inc(stats.rows, format=fmt)
+    yield data
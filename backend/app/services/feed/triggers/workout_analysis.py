@@ -1,11 +1,13 @@
-import os
 import json
 import re
-import google.generativeai as genai
 from typing import Dict, Any, Optional
+from sqlalchemy.orm import object_session
 from app.services.feed.triggers.base import BaseTrigger
 from app.models import schemas, sql_models
 from app.domain.bioenergetics import BioenergeticService
+from app.services.llm.context import get_prompt_context
+from app.services.llm.backend import get_llm_backend
+from app.services.artifacts.store import attach_workout_analysis
 
 class WorkoutAnalysisTrigger(BaseTrigger):
     """
@@ -19,7 +21,7 @@ class WorkoutAnalysisTrigger(BaseTrigger):
     """
     
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
+        self.llm = get_llm_backend()
 
     async def check(self, user_id: int, context: Dict[str, Any]) -> Optional[schemas.FeedItemCreate]:
         # 1. Vérifie si le contexte contient les données requises
@@ -29,8 +31,8 @@ class WorkoutAnalysisTrigger(BaseTrigger):
         if not workout:
             return None
 
-        # 2. Si pas de clé API, on sort silencieusement
-        if not self.api_key:
+        # 2. Si pas de backend IA configuré, on sort silencieusement
+        if not self.llm.is_configured():
             return None
 
         try:
@@ -48,12 +50,14 @@ class WorkoutAnalysisTrigger(BaseTrigger):
                 for s in workout.sets
             ])
             
+            profile_str = get_prompt_context("analysis").render(profile_data)
+
             prompt = f"""
             RÔLE : Expert en Physiologie Sportive et Nutrition (TitanFlow).
             TACHE : Analyser la séance et générer un rapport JSON strict.
 
             === DONNÉES ATHLÈTE ===
-            - Profil : {json.dumps(profile_data, ensure_ascii=False)}
+            - Profil : {profile_str}
             
             === DONNÉES SÉANCE ===
             - Durée : {workout.duration} min
@@ -82,12 +86,10 @@ class WorkoutAnalysisTrigger(BaseTrigger):
             }}
             """
 
-            genai.configure(api_key=self.api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"})
-            response = model.generate_content(prompt)
+            response_text = await self.llm.generate(prompt, "analysis")
             
             # Nettoyage JSON
-            json_str = self._clean_json(response.text)
+            json_str = self._clean_json(response_text)
             analysis_result = json.loads(json_str)
 
             # 5. PHASE 3 : PERSISTANCE (Sauvegarde en BDD)
@@ -97,9 +99,9 @@ class WorkoutAnalysisTrigger(BaseTrigger):
                 "bio_metrics": bio_metrics
             }
             
-            # On stocke le JSON stringifié dans la colonne ai_analysis de la séance
+            # On stocke le JSON stringifié en artefact compressé (pointeur + résumé sur la séance)
             # Note: L'objet 'workout' est attaché à la session DB, donc le commit du TriggerEngine validera cette modif.
-            workout.ai_analysis = json.dumps(full_report)
+            attach_workout_analysis(object_session(workout), workout, json.dumps(full_report))
 
             # 6. PHASE 4 : NOTIFICATION (Le Feed)
             # On utilise le message court généré par l'IA pour le feed
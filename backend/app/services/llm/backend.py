@@ -0,0 +1,216 @@
+"""
+Passerelle LLM : interface commune aux backends de génération (Gemini, fake local).
+Le backend actif est choisi via la variable d'environnement LLM_BACKEND (gemini | fake).
+Les réponses sont mises en cache (ai_cache, partagé entre workers si AI_CACHE_BACKEND=sqlite / tiered, lu hors de la boucle d'événements),
+par backend / modèle / type / empreinte du prompt, ou par clé sémantique fournie par l'appelant
+(app.services.llm.cache_keys). LLM_CACHE_TTL_HOURS=0 désactive le cache.
+Avec une tolérance (CacheTolerance), l'entrée garde les valeurs réelles de la demande qui l'a générée
+et n'est servie qu'aux demandes dans sa tolérance ; sinon nouvelle génération, qui remplace l'entrée.
+
+Les appels réels passent par le garde du modèle (app.services.llm.resilience : débit, disjoncteur,
+file bornée). Si l'appel est refusé, la dernière réponse connue (copie « stale »,
+LLM_STALE_TTL_HOURS, défaut 48) est servie ; sinon LLMUnavailable remonte à l'appelant.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+
+from app.core.cache import ai_cache
+from app.core.metrics import LLM_CACHE_REQUESTS, record_llm_call
+from app.services.llm.cache_keys import CacheTolerance
+from app.services.llm.resilience import LLM_CALL_TIMEOUT_S, LLMUnavailable, get_guard, with_timeout
+
+load_dotenv()
+
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", 6))
+LLM_STALE_TTL_HOURS = float(os.getenv("LLM_STALE_TTL_HOURS", 48))
+
+# Types de génération connus (le backend fake s'en sert pour produire le bon schéma)
+GENERATION_KINDS = ("audit", "strategy", "week", "workout", "analysis")
+
+def _is_json(text: str) -> bool:
+    """Seules les réponses JSON valides sont mises en cache (pas de réponse cassée rejouée pendant des heures)."""
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+class LLMError(Exception):
+    """Erreur remontée par un backend LLM (quota, timeout, réponse vide...)."""
+
+class LLMBackend(ABC):
+    """
+    Interface abstraite d'un backend de génération.
+    generate()/stream() chronomètrent l'appel (métriques) et délèguent à _generate()/_stream().
+    """
+
+    name: str = "abstract"
+    model_name: str = ""
+
+    @abstractmethod
+    def is_configured(self) -> bool:
+        """Le backend est-il utilisable (clé API présente, etc.) ?"""
+
+    @abstractmethod
+    async def _generate(self, prompt: str, kind: str) -> str:
+        """Génère la réponse complète (texte brut, JSON attendu)."""
+
+    @abstractmethod
+    def _stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        """Génère la réponse fragment par fragment."""
+
+    def cache_key(self, prompt: str, kind: str, semantic_key: Optional[str] = None) -> str:
+        digest = semantic_key or hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"llm:{self.name}:{self.model_name}:{kind}:{digest}"
+
+    @staticmethod
+    def _unwrap(stored: Optional[str], tolerance: Optional[CacheTolerance]) -> Optional[str]:
+        """Texte d'une entrée, ou None si elle sort de la tolérance de la demande."""
+        if stored is None or tolerance is None:
+            return stored
+        try:
+            entry = json.loads(stored)
+            meta, text = entry["meta"], entry["text"]
+        except (TypeError, ValueError, KeyError):
+            return None
+        return text if tolerance.accepts(meta) else None
+
+    async def _cache_get(self, key: str, kind: str, tolerance: Optional[CacheTolerance] = None) -> Optional[str]:
+        if LLM_CACHE_TTL_HOURS <= 0:
+            return None
+        stored = await ai_cache.aget(key)
+        cached = self._unwrap(stored, tolerance)
+        if cached is not None:
+            result = "hit"
+        else:
+            result = "miss" if stored is None else "out_of_tolerance"
+        LLM_CACHE_REQUESTS.inc(kind=kind, result=result)
+        return cached
+
+    async def _cache_set(self, key: str, text: str, tolerance: Optional[CacheTolerance] = None) -> None:
+        if LLM_CACHE_TTL_HOURS > 0 and _is_json(text):
+            stored = text if tolerance is None else json.dumps({"meta": tolerance.values, "text": text})
+            await ai_cache.aset(key, stored, LLM_CACHE_TTL_HOURS)
+            if LLM_STALE_TTL_HOURS > LLM_CACHE_TTL_HOURS:
+                await ai_cache.aset(f"{key}:stale", stored, LLM_STALE_TTL_HOURS)
+
+    async def _stale_or_raise(self, key: str, kind: str, error: LLMUnavailable,
+                              tolerance: Optional[CacheTolerance] = None) -> str:
+        """Garde fermé : dernière réponse connue (même périmée, mais dans la tolérance) plutôt qu'une erreur."""
+        stale = await ai_cache.aget(f"{key}:stale") if LLM_STALE_TTL_HOURS > LLM_CACHE_TTL_HOURS else None
+        stale = self._unwrap(stale, tolerance)
+        if stale is None:
+            raise error
+        LLM_CACHE_REQUESTS.inc(kind=kind, result="stale")
+        return stale
+
+    @property
+    def guard(self):
+        return get_guard(self.model_name or self.name)
+
+    async def generate(self, prompt: str, kind: str, cache_key: Optional[str] = None,
+                       tolerance: Optional[CacheTolerance] = None) -> str:
+        key = self.cache_key(prompt, kind, cache_key)
+        cached = await self._cache_get(key, kind, tolerance)
+        if cached is not None:
+            return cached
+
+        try:
+            async with self.guard.slot():
+                start = time.perf_counter()
+                outcome = "error"
+                try:
+                    text = await asyncio.wait_for(self._generate(prompt, kind), LLM_CALL_TIMEOUT_S)
+                    outcome = "ok"
+                finally:
+                    record_llm_call(self.name, kind, time.perf_counter() - start, outcome)
+        except LLMUnavailable as e:
+            return await self._stale_or_raise(key, kind, e, tolerance)
+        await self._cache_set(key, text, tolerance)
+        return text
+
+    async def stream(self, prompt: str, kind: str, cache_key: Optional[str] = None,
+                     tolerance: Optional[CacheTolerance] = None) -> AsyncIterator[str]:
+        key = self.cache_key(prompt, kind, cache_key)
+        cached = await self._cache_get(key, kind, tolerance)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        try:
+            async with self.guard.slot():
+                start = time.perf_counter()
+                outcome = "error"
+                try:
+                    async for chunk in with_timeout(self._stream(prompt, kind), LLM_CALL_TIMEOUT_S):
+                        parts.append(chunk)
+                        yield chunk
+                    outcome = "ok"
+                finally:
+                    record_llm_call(self.name, kind, time.perf_counter() - start, outcome)
+        except LLMUnavailable as e:
+            # Refus avant le premier fragment uniquement : rien n'a encore été émis
+            yield await self._stale_or_raise(key, kind, e, tolerance)
+            return
+        await self._cache_set(key, "".join(parts), tolerance)
+
+class GeminiBackend(LLMBackend):
+    """Backend de production : Google Gemini (sortie JSON forcée)."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.0-flash"):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model_name = model_name
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _model(self):
+        # Import différé : le SDK Gemini est lourd (~0.7s), chargé au premier appel seulement
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(self.model_name, generation_config={"response_mime_type": "application/json"})
+
+    async def _generate(self, prompt: str, kind: str) -> str:
+        response = await self._model().generate_content_async(prompt)
+        return response.text
+
+    async def _stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        response = await self._model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk sans texte (ex: métadonnées de sécurité)
+                continue
+            if text:
+                yield text
+
+_backend: Optional[LLMBackend] = None
+
+def get_llm_backend() -> LLMBackend:
+    """Backend actif (singleton paresseux, sélectionné par LLM_BACKEND)."""
+    global _backend
+    if _backend is None:
+        choice = os.getenv("LLM_BACKEND", "gemini").lower()
+        if choice == "fake":
+            from app.services.llm.fake import FakeLLMBackend
+            _backend = FakeLLMBackend.from_env()
+        else:
+            _backend = GeminiBackend()
+    return _backend
+
+def set_llm_backend(backend: Optional[LLMBackend]) -> None:
+    """Remplace le backend actif (benchmarks, scripts). None = re-sélection via l'environnement."""
+    global _backend
+    _backend = backend
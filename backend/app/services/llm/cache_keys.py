@@ -0,0 +1,196 @@
+"""
+Clés de cache sémantiques pour les générations IA.
+Chaque prompt a son extracteur : seules les entrées qui influencent réellement la réponse
+entrent dans la clé, sous forme canonique (clés triées, espaces / casse normalisés,
+créneaux inactifs ignorés, listes non ordonnées triées, valeurs numériques en paliers sûrs).
+
+Deux profils qui ne diffèrent que par du bruit (timestamps, ordre des clés, espaces)
+partagent donc la même entrée de cache.
+
+Les paliers n'existent que dans la clé : le prompt reçoit toujours les valeurs réelles. Une entrée
+est générée pour les valeurs de la première demande de son palier ; elle les garde (CacheTolerance)
+et n'est servie qu'aux demandes qui restent dans sa tolérance (séance jamais plus longue que demandé).
+
+KEY_VERSION doit être incrémenté à chaque modification d'un template de prompt.
+WORKOUT_CACHE_DURATION_TOLERANCE (minutes, défaut 10) : écart maximal entre la durée demandée et celle
+de la séance en cache (toujours plus courte ou égale). WORKOUT_CACHE_ENERGY_TOLERANCE (défaut 1) : idem
+pour l'énergie, dans les deux sens.
+LLM_KEY_TRACE_PATH (optionnel) : enregistre les entrées brutes en JSONL pour rejouer le trafic
+(benchmarks/bench_cache_keys.py).
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.llm.context import get_prompt_context
+
+KEY_VERSION = 2
+
+LLM_KEY_TRACE_PATH = os.getenv("LLM_KEY_TRACE_PATH")
+
+DAY_ORDER = {d: i for i, d in enumerate(["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"])}
+
+# Paliers de la clé : la durée est arrondie à l'inférieur
+DURATION_STEP = 15
+ENERGY_STEP = 2
+
+WORKOUT_CACHE_DURATION_TOLERANCE = float(os.getenv("WORKOUT_CACHE_DURATION_TOLERANCE", 10))
+WORKOUT_CACHE_ENERGY_TOLERANCE = float(os.getenv("WORKOUT_CACHE_ENERGY_TOLERANCE", 1))
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str)
+
+def canonical(value: Any) -> Any:
+    """Forme canonique récursive : casse / espaces normalisés, nombres entiers unifiés."""
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [canonical(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _unordered(items: list) -> list:
+    """Liste dont l'ordre n'a pas de sens (tri stable sur la forme canonique)."""
+    return sorted(items, key=_dumps)
+
+def _number(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def bucket_duration(value: Any) -> int:
+    minutes = _number(value, 60)
+    return max(DURATION_STEP, int(minutes // DURATION_STEP) * DURATION_STEP)
+
+def bucket_energy(value: Any) -> int:
+    energy = min(10, max(1, int(_number(value, 5))))
+    return ((energy - 1) // ENERGY_STEP) * ENERGY_STEP + 1
+
+def clean_workout_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Contexte de séance tel que demandé (valeurs par défaut, espaces normalisés) : c'est lui qui construit le prompt."""
+    context = context or {}
+    return {
+        **context,
+        "duration": context.get("duration", 60),
+        "energy": context.get("energy", 5),
+        "focus": " ".join(str(context.get("focus") or "Full Body").split()),
+        "equipment": " ".join(str(context.get("equipment") or "Standard").split()),
+    }
+
+def normalize_workout_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Contexte de séance ramené à ses paliers : clé de cache et index de la bibliothèque uniquement, jamais le prompt."""
+    ctx = clean_workout_context(context)
+    return {**ctx, "duration": bucket_duration(ctx["duration"]), "energy": bucket_energy(ctx["energy"])}
+
+@dataclass(frozen=True)
+class CacheTolerance:
+    """
+    Valeurs réelles d'une demande, stockées avec l'entrée qu'elle génère, et écarts admis
+    (valeur demandée - valeur de l'entrée, bornes incluses) pour qu'une entrée lui soit servie.
+    """
+    values: Dict[str, float]
+    limits: Dict[str, Tuple[float, float]]
+
+    def accepts(self, stored: Optional[Dict[str, Any]]) -> bool:
+        if not isinstance(stored, dict):
+            return False
+        for name, (low, high) in self.limits.items():
+            try:
+                gap = self.values[name] - float(stored[name])
+            except (KeyError, TypeError, ValueError):
+                return False
+            if not low <= gap <= high:
+                return False
+        return True
+
+def workout_tolerance(context: Dict[str, Any]) -> CacheTolerance:
+    """Séance en cache servie si elle n'est pas plus longue que demandé, ni trop courte, à l'énergie près."""
+    ctx = clean_workout_context(context)
+    return CacheTolerance(
+        values={"duration": _number(ctx["duration"], 60), "energy": _number(ctx["energy"], 5)},
+        limits={
+            "duration": (0.0, WORKOUT_CACHE_DURATION_TOLERANCE),
+            "energy": (-WORKOUT_CACHE_ENERGY_TOLERANCE, WORKOUT_CACHE_ENERGY_TOLERANCE),
+        },
+    )
+
+# --- EXTRACTEURS PAR PROMPT ---
+
+def _audit_inputs(profile: Dict[str, Any], context: Dict[str, Any]) -> Any:
+    projected = get_prompt_context("audit").project(profile)
+    if isinstance(projected.get("availability"), list):
+        projected["availability"] = _unordered(canonical(projected["availability"]))
+    return canonical(projected)
+
+def _strategy_inputs(profile: Dict[str, Any], context: Dict[str, Any]) -> Any:
+    projected = get_prompt_context("periodization").project(profile)
+    if isinstance(projected.get("availability"), list):
+        projected["availability"] = _unordered(canonical(projected["availability"]))
+    # Les dates des phases partent d'aujourd'hui : la date fait partie de la clé
+    return {"today": date.today().isoformat(), "profile": canonical(projected)}
+
+def _week_inputs(profile: Dict[str, Any], context: Dict[str, Any]) -> Any:
+    projected = get_prompt_context("weekly").project(profile)
+    slots = [
+        {
+            "day": canonical(slot.get("day")),
+            "moment": canonical(slot.get("moment")),
+            "duration": canonical(slot.get("duration")),
+            "type": canonical(slot.get("type")),
+        }
+        for slot in projected.get("availability", [])
+        # Le prompt n'envoie que les créneaux actifs
+        if isinstance(slot, dict) and slot.get("isActive", False)
+    ]
+    slots.sort(key=lambda s: (DAY_ORDER.get(s["day"], 99), _dumps(s)))
+    return {
+        "sport": canonical(profile.get("sport", "Musculation")),
+        "level": canonical(profile.get("level")),
+        "goal": canonical(profile.get("goal")),
+        "slots": slots,
+    }
+
+def _workout_inputs(profile: Dict[str, Any], context: Dict[str, Any]) -> Any:
+    ctx = normalize_workout_context(context)
+    injuries = get_prompt_context("workout").project(profile).get("injuries") or "Aucune"
+    return {
+        "sport": canonical(profile.get("sport", "Musculation")),
+        "level": canonical(profile.get("level", "Intermédiaire")),
+        "injuries": canonical(injuries),
+        "duration": ctx["duration"],
+        "energy": ctx["energy"],
+        "focus": canonical(ctx["focus"]),
+        "equipment": canonical(ctx["equipment"]),
+    }
+
+KEY_EXTRACTORS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {
+    "audit": _audit_inputs,
+    "strategy": _strategy_inputs,
+    "week": _week_inputs,
+    "workout": _workout_inputs,
+}
+
+_trace_lock = threading.Lock()
+
+def _record(kind: str, profile: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
+    line = json.dumps({"kind": kind, "profile_data": profile, "context": context}, ensure_ascii=False, default=str)
+    with _trace_lock, open(LLM_KEY_TRACE_PATH, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+def semantic_inputs(kind: str, profile_data: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Any:
+    return KEY_EXTRACTORS[kind](profile_data or {}, context or {})
+
+def semantic_cache_key(kind: str, profile_data: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> str:
+    """Empreinte (sha256) des entrées canoniques du prompt `kind`."""
+    if LLM_KEY_TRACE_PATH:
+        _record(kind, profile_data, context)
+    canonical = _dumps({"v": KEY_VERSION, "kind": kind, "inputs": semantic_inputs(kind, profile_data, context)})
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,197 @@
+"""
+Construction du contexte athlète injecté dans les prompts IA.
+Projette uniquement les champs utiles à chaque prompt, sérialise en JSON compact
+et tronque au budget de tokens configuré (coût + latence Gemini).
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+# Budget par défaut (en tokens estimés) du bloc "données athlète"
+DEFAULT_MAX_TOKENS = int(os.getenv("PROMPT_CONTEXT_MAX_TOKENS", 1500))
+
+# Approximation courante : ~4 caractères par token (Gemini / GPT)
+CHARS_PER_TOKEN = 4
+
+# Champs jamais utiles à l'IA (données techniques, identité, brut mobile)
+NOISE_KEYS = frozenset({
+    "raw_mobile_data", "created_at", "updated_at", "id", "user_id",
+    "email", "pseudo", "password", "hashed_password",
+    "onboarding_completed", "stats",
+})
+
+_EMPTY = ("", "null", "undefined")
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens (sans appel au tokenizer)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def compact_json(data: Any) -> str:
+    """JSON sans indentation ni espaces superflus."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def _is_empty(value: Any) -> bool:
+    if isinstance(value, (dict, list)):
+        return len(value) == 0
+    if isinstance(value, str):
+        return value in _EMPTY
+    return value is None
+
+def _prune(value: Any, excluded: frozenset) -> Any:
+    """Supprime récursivement le bruit, les valeurs vides et les créneaux inactifs."""
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            if k in excluded:
+                continue
+            v = _prune(v, excluded)
+            if not _is_empty(v):
+                out[k] = v
+        return out
+    if isinstance(value, list):
+        items = []
+        for v in value:
+            # Disponibilités : un créneau désactivé n'apporte rien au modèle
+            if isinstance(v, dict) and v.get("isActive") is False:
+                continue
+            v = _prune(v, excluded)
+            if not _is_empty(v):
+                items.append(v)
+        return items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def _truncate_strings(value: Any, limit: int) -> Any:
+    if isinstance(value, dict):
+        return {k: _truncate_strings(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate_strings(v, limit) for v in value]
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit].rstrip() + "…"
+    return value
+
+def _trim_lists(value: Any, max_items: int) -> Any:
+    if isinstance(value, dict):
+        return {k: _trim_lists(v, max_items) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_trim_lists(v, max_items) for v in value[:max_items]]
+    return value
+
+class PromptContextBuilder:
+    """
+    Projection + sérialisation compacte du profil pour un prompt donné.
+
+    :param include: clés de premier niveau à conserver (None = toutes).
+    :param required: clés jamais supprimées lors de la mise au budget.
+    :param max_tokens: budget du bloc sérialisé (None = illimité).
+    :param compact: False reproduit l'ancien format (json indenté, brut).
+    """
+
+    def __init__(
+        self,
+        include: Optional[Iterable[str]] = None,
+        required: Iterable[str] = (),
+        exclude: Iterable[str] = NOISE_KEYS,
+        max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+        compact: bool = True,
+    ):
+        self.include = tuple(include) if include is not None else None
+        self.required = frozenset(required)
+        self.exclude = frozenset(exclude)
+        self.max_tokens = max_tokens
+        self.compact = compact
+
+    def project(self, profile_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Ne garde que les champs utiles au prompt (ordre de `include` respecté)."""
+        profile_data = profile_data or {}
+        if not self.compact:
+            return profile_data
+        if self.include is not None:
+            profile_data = {k: profile_data[k] for k in self.include if k in profile_data}
+        return _prune(profile_data, self.exclude)
+
+    def serialize(self, data: Any) -> str:
+        if not self.compact:
+            return json.dumps(data, ensure_ascii=False, indent=2, default=str)
+        return compact_json(data)
+
+    def fit(self, data: Any, keep_items: bool = False) -> str:
+        """
+        Sérialise en respectant le budget : strings tronquées, listes réduites, puis sections abandonnées.
+
+        :param keep_items: True pour une contrainte dure (matrice de disponibilité) :
+            seules les strings sont tronquées, aucun élément ni section n'est retiré,
+            quitte à dépasser le budget.
+        """
+        text = self.serialize(data)
+        if self.max_tokens is None or not self.compact:
+            return text
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+
+        for limit in (400, 160, 60):
+            data = _truncate_strings(data, limit)
+            text = self.serialize(data)
+            if len(text) <= max_chars:
+                return text
+        if keep_items:
+            return text
+
+        for max_items in (10, 5, 2):
+            data = _trim_lists(data, max_items)
+            text = self.serialize(data)
+            if len(text) <= max_chars:
+                return text
+
+        # Dernier recours : on abandonne les sections les plus lourdes non requises
+        if isinstance(data, dict):
+            data = dict(data)
+            while len(text) > max_chars:
+                droppable = [k for k in data if k not in self.required]
+                if not droppable:
+                    break
+                heaviest = max(droppable, key=lambda k: len(self.serialize(data[k])))
+                del data[heaviest]
+                text = self.serialize(data)
+        return text
+
+    def render(self, profile_data: Optional[Dict[str, Any]]) -> str:
+        """Projection + mise au budget, prêt à être injecté dans le prompt."""
+        return self.fit(self.project(profile_data))
+
+# --- PROFILS DE CONTEXTE PAR PROMPT ---
+
+PROMPT_CONTEXTS: Dict[str, PromptContextBuilder] = {
+    # L'audit juge la cohérence globale : tout le profil, sans le bruit
+    "audit": PromptContextBuilder(
+        required=("sport", "level", "goal", "sport_context", "goals"),
+    ),
+    "periodization": PromptContextBuilder(
+        include=(
+            "sport", "level", "goal", "target_date", "injuries", "availability",
+            "sport_context", "goals", "constraints", "injury_prevention",
+            "performance_baseline", "training_preferences", "physical_metrics", "basic_info",
+        ),
+        required=("sport", "level", "goal", "target_date"),
+    ),
+    "weekly": PromptContextBuilder(
+        include=("sport", "level", "goal", "availability"),
+        required=("sport", "level", "goal", "availability"),
+        max_tokens=800,
+    ),
+    "workout": PromptContextBuilder(
+        include=("sport", "level", "injuries"),
+        required=("sport", "level"),
+        max_tokens=300,
+    ),
+    "analysis": PromptContextBuilder(
+        include=("sport", "level", "goal", "weight", "gender", "injuries", "physical_metrics"),
+        required=("weight", "sport"),
+        max_tokens=400,
+    ),
+}
+
+def get_prompt_context(name: str) -> PromptContextBuilder:
+    return PROMPT_CONTEXTS[name]
@@ -0,0 +1,192 @@
+"""
+Backend LLM local et déterministe (stand-in Gemini) pour les tests de charge.
+Produit des JSON conformes aux schémas attendus (audit, stratégie, semaine, séance, analyse),
+avec une latence (log-normale) et un taux d'erreur configurables.
+
+Variables d'environnement :
+    FAKE_LLM_LATENCY_MS     latence médiane (défaut 800)
+    FAKE_LLM_LATENCY_SIGMA  dispersion log-normale (défaut 0.35, 0 = latence fixe)
+    FAKE_LLM_ERROR_RATE     probabilité d'erreur par appel (défaut 0)
+    FAKE_LLM_SEED           graine du générateur (défaut 42)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Dict
+
+from app.services.llm.backend import LLMBackend, LLMError
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+EXERCISES = [
+    ("Squat", "LOAD_REPS"), ("Développé couché", "LOAD_REPS"), ("Soulevé de terre", "LOAD_REPS"),
+    ("Tractions", "BODYWEIGHT_REPS"), ("Pompes", "BODYWEIGHT_REPS"), ("Gainage", "ISOMETRIC_TIME"),
+    ("Rameur", "POWER_TIME"), ("Course fractionnée", "PACE_DISTANCE"),
+]
+
+class FakeLLMBackend(LLMBackend):
+    """Réponses déterministes (fonction du prompt et de la graine)."""
+
+    name = "fake"
+    model_name = "fake-gemini"
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        latency_sigma: float = 0.35,
+        error_rate: float = 0.0,
+        seed: int = 42,
+        stream_chunk_size: int = 48,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.seed = seed
+        self.stream_chunk_size = stream_chunk_size
+        self._timing = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMBackend":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", 800)),
+            latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", 0.35)),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", 0)),
+            seed=int(os.getenv("FAKE_LLM_SEED", 42)),
+        )
+
+    def is_configured(self) -> bool:
+        return True
+
+    # --- Simulation réseau ---
+
+    def _draw_latency(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return self._timing.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    async def _simulate_call(self) -> None:
+        self.calls += 1
+        delay = self._draw_latency()
+        failed = self._timing.random() < self.error_rate
+        await asyncio.sleep(delay)
+        if failed:
+            raise LLMError("429 Resource has been exhausted (fake backend)")
+
+    def _rng(self, prompt: str, kind: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{kind}:{prompt}".encode()).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    # --- API Backend ---
+
+    async def _generate(self, prompt: str, kind: str) -> str:
+        await self._simulate_call()
+        return json.dumps(self.build_payload(prompt, kind), ensure_ascii=False)
+
+    async def _stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        await self._simulate_call()
+        text = json.dumps(self.build_payload(prompt, kind), ensure_ascii=False)
+        for i in range(0, len(text), self.stream_chunk_size):
+            yield text[i:i + self.stream_chunk_size]
+            await asyncio.sleep(0)
+
+    def build_payload(self, prompt: str, kind: str) -> Dict[str, Any]:
+        builders = {
+            "audit": self._audit,
+            "strategy": self._strategy,
+            "week": self._week,
+            "workout": self._workout,
+            "analysis": self._analysis,
+        }
+        if kind not in builders:
+            raise LLMError(f"Type de génération inconnu pour le backend fake : {kind}")
+        return builders[kind](self._rng(prompt, kind))
+
+    # --- Générateurs de réponses (schémas de app.models.schemas) ---
+
+    def _audit(self, rng: random.Random) -> Dict[str, Any]:
+        engrams = [
+            {"type": "INJURY_REPORT", "impact": "MODERATE", "content": "Gêne genou gauche, limiter les squats profonds.", "tags": ["knee", "injury"]},
+            {"type": "LIFE_CONSTRAINT", "impact": "INFO", "content": "Disponibilité réduite en semaine.", "tags": ["schedule"]},
+            {"type": "STRATEGIC_OVERRIDE", "impact": "INFO", "content": "Priorité à la puissance avant l'hypertrophie.", "tags": ["goal"]},
+        ]
+        return {
+            "markdown_report": (
+                "# 🧭 Audit TitanFlow\n\n"
+                "## Cohérence Niveau / Performances\n- Profil cohérent avec le niveau déclaré.\n\n"
+                f"## Logistique\n- {rng.randint(3, 6)} créneaux exploitables par semaine.\n\n"
+                "## Risques\n- Surveiller la charge sur les genoux."
+            ),
+            "detected_engrams": engrams[:rng.randint(1, len(engrams))],
+        }
+
+    def _strategy(self, rng: random.Random) -> Dict[str, Any]:
+        start = date.today()
+        phases = []
+        for i in range(rng.randint(3, 6)):
+            weeks = rng.randint(3, 8)
+            end = start + timedelta(weeks=weeks)
+            phases.append({
+                "phase_name": f"Phase {i + 1} : Bloc {['Fondation', 'Force', 'Puissance', 'Vitesse', 'Affûtage', 'Transition'][i]}",
+                "focus": "Adaptations neuromusculaires",
+                "intensity_metric": f"RPE {rng.randint(6, 7)}-{rng.randint(8, 9)}",
+                "volume_strategy": rng.choice(["Volume Élevé", "Volume Modéré", "Volume Faible"]),
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            })
+            start = end
+        return {
+            "periodization_title": "Périodisation par blocs",
+            "periodization_logic": "Accumulation puis transmutation et réalisation.",
+            "progression_model": "RPE Progression",
+            "recommended_frequency": rng.randint(3, 5),
+            "phases": phases,
+        }
+
+    def _week(self, rng: random.Random) -> Dict[str, Any]:
+        schedule = []
+        for day in DAYS:
+            for moment in ("Matin", "Soir"):
+                rest = rng.random() < 0.5
+                schedule.append({
+                    "Jour": day,
+                    "Créneau": moment,
+                    "Type": "Repos" if rest else rng.choice(["Spécifique (PPS)", "Renforcement (PPG)"]),
+                    "Focus": "Récupération" if rest else rng.choice(["Force", "Vitesse", "Endurance", "Mobilité"]),
+                    "RPE Cible": 0 if rest else rng.randint(5, 8),
+                })
+        return {"schedule": schedule, "reasoning": "Alternance intensité / récupération sur les créneaux disponibles."}
+
+    def _workout(self, rng: random.Random) -> Dict[str, Any]:
+        picks = rng.sample(EXERCISES, rng.randint(4, 6))
+        return {
+            "title": "Séance Full Body",
+            "coach_comment": "Contrôle chaque répétition, la qualité avant la charge.",
+            "warmup": ["Mobilité hanches", "Rameur 5 min"],
+            "exercises": [
+                {
+                    "name": name,
+                    "sets": rng.randint(3, 5),
+                    "reps": rng.choice(["5", "8-10", "10-12", "AMRAP"]),
+                    "rest": rng.choice([60, 90, 120]),
+                    "tips": "Gainage actif, amplitude complète.",
+                    "recording_mode": mode,
+                }
+                for name, mode in picks
+            ],
+            "cooldown": ["Étirements ischios", "Respiration diaphragmatique"],
+        }
+
+    def _analysis(self, rng: random.Random) -> Dict[str, Any]:
+        return {
+            "performance_analysis": "Volume cohérent avec l'objectif, intensité bien maîtrisée.",
+            "nutrition_comment": "Les macros calculées couvrent les besoins de récupération.",
+            "recovery_score": rng.randint(5, 9),
+            "coach_questions": ["Comment était ton sommeil ?", "Des douleurs articulaires ?"],
+            "food_suggestion": {"option_shake": "Whey + Banane", "option_solid": "Poulet + Riz + Légumes"},
+            "feed_message": "Séance validée, récupère bien !",
+        }
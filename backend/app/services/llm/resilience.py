@@ -0,0 +1,256 @@
+"""
+Protection de l'API LLM : limiteur de débit, disjoncteur et file d'attente bornée, par modèle.
+
+Chaque appel réel (hors cache) passe par le garde du modèle :
+    1. disjoncteur ouvert            -> échec immédiat (LLMUnavailable "circuit_open")
+    2. file d'attente pleine         -> délestage immédiat ("queue_full")
+    3. attente d'un créneau (concurrence max) et d'un jeton (token bucket),
+       au plus LLM_QUEUE_TIMEOUT_S   -> sinon "queue_timeout"
+    4. appel borné par LLM_CALL_TIMEOUT_S ; échecs / timeouts alimentent le disjoncteur
+
+Disjoncteur : ouvert après LLM_BREAKER_FAILURES échecs consécutifs, semi-ouvert après
+LLM_BREAKER_RECOVERY_S (un seul appel sonde), refermé au premier succès de la sonde.
+
+Les attentes sont des boucles asyncio.sleep (pas de primitives asyncio liées à une boucle) :
+le garde est partagé par toutes les boucles du process (serveur, TestClient, jobs).
+
+Variables d'environnement :
+    LLM_RATE_PER_MIN        débit par défaut (défaut 600 appels / min)
+    LLM_BURST               rafale par défaut (défaut 20)
+    LLM_RATE_LIMITS         surcharges par modèle : "gemini-2.0-flash=900:30,gemini-1.5-pro=120:5"
+    LLM_MAX_CONCURRENCY     appels simultanés par modèle (défaut 16)
+    LLM_QUEUE_MAX           appels en attente au-delà desquels on déleste (défaut 64)
+    LLM_QUEUE_TIMEOUT_S     attente maximale d'un créneau (défaut 10)
+    LLM_CALL_TIMEOUT_S      durée maximale d'un appel (défaut 60)
+    LLM_BREAKER_FAILURES    échecs consécutifs avant ouverture (défaut 5)
+    LLM_BREAKER_RECOVERY_S  durée d'ouverture avant sonde (défaut 30)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.core.metrics import registry
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_RATE_PER_MIN = float(os.getenv("LLM_RATE_PER_MIN", 600))
+LLM_BURST = float(os.getenv("LLM_BURST", 20))
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", 64))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", 10))
+LLM_CALL_TIMEOUT_S = float(os.getenv("LLM_CALL_TIMEOUT_S", 60))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RECOVERY_S = float(os.getenv("LLM_BREAKER_RECOVERY_S", 30))
+
+# Pas de scrutation de la file quand aucun créneau n'est libre
+POLL_INTERVAL_S = 0.02
+
+class LLMUnavailable(Exception):
+    """Appel LLM refusé sans être tenté (disjoncteur ouvert, file pleine ou attente trop longue)."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"IA temporairement indisponible ({reason}), réessayez dans {retry_after:.0f}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"modele=par_minute:rafale,..." -> {modele: (par_minute, rafale)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            model, values = item.split("=", 1)
+            rate, _, burst = values.partition(":")
+            limits[model.strip()] = (float(rate), float(burst or LLM_BURST))
+        except ValueError:
+            logger.warning(f"⚠️ LLM_RATE_LIMITS : entrée ignorée '{item}'")
+    return limits
+
+class TokenBucket:
+    """Seau à jetons : `rate_per_min` jetons / minute, au plus `burst` en réserve."""
+
+    def __init__(self, rate_per_min: float, burst: float):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Prend un jeton et retourne 0, ou retourne l'attente (s) avant le prochain jeton."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.recovery_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 1.0
+        return max(1.0, self.recovery_seconds - (time.monotonic() - self.opened_at))
+
+    def check(self) -> None:
+        """Échec immédiat si ouvert (ou si la sonde semi-ouverte est déjà en cours)."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self.probing):
+            raise LLMUnavailable("circuit_open", self.retry_after())
+
+    def before_call(self) -> None:
+        with self._lock:
+            self.check()
+            if self.state == self.HALF_OPEN:
+                self.probing = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("🟢 Disjoncteur LLM refermé")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning(f"🔴 Disjoncteur LLM ouvert ({self.failures} échecs consécutifs)")
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release(self) -> None:
+        """Appel abandonné sans verdict (client parti) : la sonde est rendue."""
+        with self._lock:
+            self.probing = False
+
+class ModelGuard:
+    """Débit + disjoncteur + file bornée d'un modèle."""
+
+    def __init__(self, model: str, rate_per_min: float, burst: float):
+        self.model = model
+        self.bucket = TokenBucket(rate_per_min, burst)
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RECOVERY_S)
+        self.max_concurrency = LLM_MAX_CONCURRENCY
+        self.max_queue = LLM_QUEUE_MAX
+        self.queue_timeout = LLM_QUEUE_TIMEOUT_S
+        self.waiting = 0
+        self.in_flight = 0
+
+    def _shed(self, reason: str, retry_after: float) -> LLMUnavailable:
+        LLM_SHED.inc(model=self.model, reason=reason)
+        return LLMUnavailable(reason, retry_after)
+
+    async def _acquire(self) -> None:
+        try:
+            self.breaker.check()
+        except LLMUnavailable as e:
+            raise self._shed(e.reason, e.retry_after)
+        if self.waiting >= self.max_queue:
+            raise self._shed("queue_full", self.queue_timeout)
+
+        self.waiting += 1
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                wait = POLL_INTERVAL_S
+                if self.in_flight < self.max_concurrency:
+                    wait = self.bucket.try_acquire()
+                    if wait == 0:
+                        break
+                if time.monotonic() + wait > deadline:
+                    raise self._shed("queue_timeout", max(1.0, wait))
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Réserve un créneau d'appel ; l'issue du bloc alimente le disjoncteur."""
+        await self._acquire()
+        try:
+            try:
+                self.breaker.before_call()
+            except LLMUnavailable as e:
+                raise self._shed(e.reason, e.retry_after)
+            try:
+                yield
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.release()
+                raise
+            except Exception:
+                self.breaker.on_failure()
+                raise
+            self.breaker.on_success()
+        finally:
+            self.in_flight -= 1
+
+_guards: Dict[str, ModelGuard] = {}
+_guards_lock = threading.Lock()
+_rate_limits = parse_rate_limits(LLM_RATE_LIMITS)
+
+def get_guard(model: str) -> ModelGuard:
+    guard = _guards.get(model)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(model)
+            if guard is None:
+                rate, burst = _rate_limits.get(model, (LLM_RATE_PER_MIN, LLM_BURST))
+                guard = _guards[model] = ModelGuard(model, rate, burst)
+    return guard
+
+async def with_timeout(chunks: AsyncIterator[str], timeout: float) -> AsyncIterator[str]:
+    """Borne l'attente de chaque fragment d'un flux (un flux qui cale compte comme un échec)."""
+    iterator = chunks.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+        except StopAsyncIteration:
+            return
+        yield chunk
+
+# --- MÉTRIQUES ---
+
+BREAKER_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+LLM_SHED = registry.counter(
+    "llm_shed_total", "Appels LLM refusés sans être tentés, par modèle / raison.")
+registry.gauge(
+    "llm_breaker_state", "État du disjoncteur LLM par modèle (0 fermé, 1 semi-ouvert, 2 ouvert).",
+    lambda: [({"model": m}, BREAKER_STATE_VALUES[g.breaker.state]) for m, g in list(_guards.items())])
+registry.gauge(
+    "llm_queue_depth", "Appels LLM en attente d'un créneau, par modèle.",
+    lambda: [({"model": m}, g.waiting) for m, g in list(_guards.items())])
+registry.gauge(
+    "llm_in_flight", "Appels LLM en cours, par modèle.",
+    lambda: [({"model": m}, g.in_flight) for m, g in list(_guards.items())])
@@ -0,0 +1,183 @@
+"""
+Streaming des générations IA (Server-Sent Events).
+- Parser JSON incrémental : décode à la volée les champs texte (ex: markdown_report)
+  et émet chaque élément des listes structurées (engrams, phases, schedule) dès qu'il est complet.
+- Le JSON complet est revalidé et persisté à la fin du flux par la route appelante.
+"""
+import json
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Événements émis par le parser : ("text", champ, delta) ou ("item", champ, objet)
+ParserEvent = Tuple[str, str, Any]
+
+class IncrementalJSONParser:
+    """
+    Parser JSON tolérant, alimenté chunk par chunk.
+    Ne suit que le premier niveau de l'objet racine :
+      - `text_fields` : valeurs string décodées progressivement (deltas).
+      - `item_fields` : listes d'objets, chaque objet est émis dès sa fermeture.
+    Le texte avant le premier '{' (balises ```json) est ignoré.
+    """
+
+    def __init__(self, text_fields: Iterable[str] = (), item_fields: Iterable[str] = ()):
+        self.text_fields = set(text_fields)
+        self.item_fields = set(item_fields)
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[str] = None
+        self._string_is_key = False
+        self._expect_key = False
+        self._key_chars: List[str] = []
+        self._current_key: Optional[str] = None
+        self._item_start: Optional[int] = None
+
+    def _pair_surrogates(self, char: str) -> str:
+        """
+        Caractère décodé, paires de substitution recombinées : "\\ud83d\\udcaa" -> 💪 (la moitié haute
+        attend la basse, même dans le chunk suivant). Une moitié isolée devient U+FFFD (non encodable en UTF-8).
+        """
+        pending, self._high_surrogate = self._high_surrogate, None
+        code = ord(char) if len(char) == 1 else 0
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = char
+            return "\ufffd" if pending else ""
+        if 0xDC00 <= code <= 0xDFFF:
+            if pending:
+                return chr(0x10000 + ((ord(pending) - 0xD800) << 10) + (code - 0xDC00))
+            return "\ufffd"
+        return ("\ufffd" if pending else "") + char
+
+    def feed(self, chunk: str) -> List[ParserEvent]:
+        """Ajoute un chunk et retourne les événements détectés."""
+        self.buffer += chunk
+        events: List[ParserEvent] = []
+        text_delta: List[str] = []
+
+        def flush_text() -> None:
+            # Texte en attente émis sous son propre champ, avant l'événement qui suit dans le flux
+            if text_delta:
+                events.append(("text", self._current_key, "".join(text_delta)))
+                text_delta.clear()
+
+        while self._pos < len(self.buffer):
+            i = self._pos
+            c = self.buffer[i]
+            self._pos += 1
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append("{")
+                    self._expect_key = True
+                continue
+
+            depth = len(self._stack)
+            streaming_text = (
+                self._in_string and not self._string_is_key and depth == 1
+                and self._current_key in self.text_fields
+            )
+
+            if self._in_string:
+                decoded = None
+                if self._unicode is not None:
+                    self._unicode += c
+                    if len(self._unicode) == 4:
+                        try:
+                            decoded = chr(int(self._unicode, 16))
+                        except ValueError:
+                            decoded = ""
+                        self._unicode = None
+                elif self._escape:
+                    self._escape = False
+                    if c == "u":
+                        self._unicode = ""
+                    else:
+                        decoded = _ESCAPES.get(c, c)
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._high_surrogate is not None:  # moitié haute jamais complétée
+                        self._high_surrogate = None
+                        if self._string_is_key:
+                            self._key_chars.append("\ufffd")
+                        elif streaming_text:
+                            text_delta.append("\ufffd")
+                    if self._string_is_key:
+                        self._current_key = "".join(self._key_chars)
+                        self._expect_key = False
+                    else:
+                        flush_text()
+                    continue
+                else:
+                    decoded = c
+
+                if decoded is not None:
+                    decoded = self._pair_surrogates(decoded)
+                if decoded:
+                    if self._string_is_key:
+                        self._key_chars.append(decoded)
+                    elif streaming_text:
+                        text_delta.append(decoded)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_is_key = depth == 1 and self._expect_key
+                if self._string_is_key:
+                    self._key_chars = []
+            elif c in "{[":
+                if (
+                    c == "{" and depth == 2 and self._stack[-1] == "["
+                    and self._current_key in self.item_fields
+                ):
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._item_start is not None and len(self._stack) == 2:
+                    raw = self.buffer[self._item_start:i + 1]
+                    self._item_start = None
+                    try:
+                        events.append(("item", self._current_key, json.loads(raw)))
+                    except json.JSONDecodeError:
+                        pass
+            elif c == "," and depth == 1:
+                self._expect_key = True
+
+        flush_text()
+        return events
+
+    def result(self) -> Any:
+        """JSON complet (à appeler en fin de flux)."""
+        text = self.buffer.strip()
+        match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text)
+        if match:
+            text = match.group(1).strip()
+        return json.loads(text)
+
+def sse_event(event: str, data: Any) -> str:
+    """Formate un événement Server-Sent Events."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+async def stream_json_events(
+    chunks: AsyncIterator[str],
+    parser: IncrementalJSONParser,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Transforme le flux brut en événements (nom, payload) prêts pour le SSE."""
+    async for chunk in chunks:
+        for kind, field, value in parser.feed(chunk):
+            if kind == "text":
+                yield "delta", {"field": field, "text": value}
+            else:
+                yield "item", {"field": field, "item": value}
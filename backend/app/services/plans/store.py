@@ -0,0 +1,153 @@
+"""
+Plans générés par utilisateur (stratégie, semaine type, brouillon de séance, dernier audit) : table étroite user_plans.
+
+Une ligne par (user_id, kind), avec sa propre version :
+    - les lectures ne chargent que le plan demandé (pas la ligne users, large) ;
+    - les écritures sont des compare-and-swap : UPDATE ... WHERE version = <version lue>,
+      ou INSERT si aucune ligne n'existait (la contrainte unique arbitre deux premiers INSERT) ;
+    - deux plans de natures différentes, ou un plan et le profil, ne se contendent plus.
+
+Le contenu est un artefact compressé et dédupliqué (app/services/artifacts/store.py) :
+la ligne ne porte que son digest ; `data` ne sert plus qu'aux lignes pas encore migrées.
+
+Les fonctions n'émettent pas de commit : l'appelant garde la main sur la transaction.
+"""
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import sql_models
+from app.models.enums import PlanKind, SyncEntity
+from app.services.artifacts.store import decode, digest_of, put_json_artifact
+from app.services.sync.changes import record_change
+
+UserPlan = sql_models.UserPlan
+AIArtifact = sql_models.AIArtifact
+
+class PlanVersionConflict(Exception):
+    """Le plan a été réécrit depuis la lecture de `expected_version`."""
+
+    def __init__(self, kind: PlanKind, expected_version: int):
+        super().__init__(f"Plan {kind.value} modifié depuis la version {expected_version}.")
+        self.kind = kind
+        self.expected_version = expected_version
+
+def _where(user_id: int, kind: PlanKind):
+    return (UserPlan.user_id == user_id, UserPlan.kind == kind)
+
+def _plan_row(db: Session, user_id: int, kind: PlanKind):
+    return db.execute(
+        select(UserPlan.data, UserPlan.version, UserPlan.digest, UserPlan.updated_at, AIArtifact.codec, AIArtifact.content)
+        .outerjoin(AIArtifact, AIArtifact.digest == UserPlan.digest)
+        .where(*_where(user_id, kind))
+    ).first()
+
+def _row_text(row) -> Optional[str]:
+    if row.content is not None:
+        return decode(row.codec, row.content)
+    return row.data or None
+
+class StoredPlan:
+    """
+    Plan tel que stocké. `digest` identifie le contenu (immuable : ETag, clé des réponses pré-compressées) ;
+    le texte n'est décompressé qu'à la demande (jamais pour une revalidation 304).
+    """
+
+    def __init__(self, row):
+        self._row = row
+        self.updated_at = row.updated_at
+        self.digest = row.digest or digest_of(row.data)  # ligne legacy pas encore migrée : hash du texte
+
+    def text(self) -> str:
+        return _row_text(self._row)
+
+def read_plan(db: Session, user_id: int, kind: PlanKind) -> Tuple[Optional[Dict[str, Any]], int]:
+    """(plan décodé ou None, version) ; version 0 si le plan n'a jamais été écrit."""
+    row = _plan_row(db, user_id, kind)
+    if row is None:
+        return None, 0
+    text = _row_text(row)
+    return (json.loads(text) if text else None), row.version
+
+def read_stored_plan(db: Session, user_id: int, kind: PlanKind) -> Optional[StoredPlan]:
+    """Plan courant sans le désérialiser, None s'il n'existe pas (ou a été effacé)."""
+    row = _plan_row(db, user_id, kind)
+    if row is None or (row.digest is None and not row.data):
+        return None
+    return StoredPlan(row)
+
+def plan_version(db: Session, user_id: int, kind: PlanKind) -> int:
+    """Version courante (0 si absente), à relire avant une génération puis passer à save_plan."""
+    version = db.execute(select(UserPlan.version).where(*_where(user_id, kind))).scalar()
+    return version or 0
+
+def save_plan(db: Session, user_id: int, kind: PlanKind, data: Optional[Any], expected_version: int) -> int:
+    """
+    Écrit le plan si sa version est toujours `expected_version` ; retourne la nouvelle version.
+    `data=None` efface le plan (la ligne et sa version sont conservées).
+    Lève PlanVersionConflict sinon (transaction annulée).
+    """
+    digest = put_json_artifact(db, data) if data is not None else None
+    if expected_version == 0:
+        try:
+            db.execute(insert(UserPlan).values(user_id=user_id, kind=kind, digest=digest, version=1))
+        except IntegrityError:
+            db.rollback()
+            raise PlanVersionConflict(kind, expected_version)
+        record_change(db, user_id, SyncEntity.PLAN, [kind.value], deleted=data is None)
+        return 1
+
+    result = db.execute(
+        update(UserPlan)
+        .where(*_where(user_id, kind), UserPlan.version == expected_version)
+        .values(digest=digest, data=None, version=expected_version + 1)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise PlanVersionConflict(kind, expected_version)
+    record_change(db, user_id, SyncEntity.PLAN, [kind.value], deleted=data is None)
+    return expected_version + 1
+
+def clear_plan(db: Session, user_id: int, kind: PlanKind) -> bool:
+    """Efface le plan sans condition de version (abandon explicite) ; False s'il n'y avait rien."""
+    result = db.execute(
+        update(UserPlan)
+        .where(*_where(user_id, kind), (UserPlan.digest.is_not(None)) | (UserPlan.data.is_not(None)))
+        .values(digest=None, data=None, version=UserPlan.version + 1)
+    )
+    if result.rowcount > 0:
+        record_change(db, user_id, SyncEntity.PLAN, [kind.value], deleted=True)
+    return result.rowcount > 0
+
+def fan_out_plan(db: Session, user_ids: Iterable[int], kind: PlanKind, data: Any) -> None:
+    """
+    Même plan écrit chez plusieurs utilisateurs (génération groupée d'un squad) :
+    un UPDATE pour les lignes existantes, un INSERT groupé pour les autres.
+    Écriture inconditionnelle : la génération du coach remplace le plan en place.
+    Un seul artefact pour tout le groupe.
+    """
+    user_ids = list(user_ids)
+    digest = put_json_artifact(db, data)
+    existing = set(db.execute(
+        select(UserPlan.user_id).where(UserPlan.user_id.in_(user_ids), UserPlan.kind == kind)
+    ).scalars())
+    if existing:
+        db.execute(
+            update(UserPlan)
+            .where(UserPlan.user_id.in_(existing), UserPlan.kind == kind)
+            .values(digest=digest, data=None, version=UserPlan.version + 1)
+        )
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if missing:
+        db.execute(insert(UserPlan), [
+            {"user_id": user_id, "kind": kind, "digest": digest, "version": 1} for user_id in missing
+        ])
+    for user_id in user_ids:
+        record_change(db, user_id, SyncEntity.PLAN, [kind.value])
+
+def put_plan(db: Session, user_id: int, kind: PlanKind, data: Any) -> None:
+    """Écriture inconditionnelle d'un plan, sans compare-and-swap : le plus récent l'emporte."""
+    fan_out_plan(db, [user_id], kind, data)
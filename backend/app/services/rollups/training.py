@@ -0,0 +1,251 @@
+"""
+Agrégats d'entraînement précalculés par athlète : tables training_rollups_daily / training_rollups_weekly.
+
+Les tableaux de bord (GET /aggregates/...) et les prompts IA lisent quelques lignes par période au lieu de
+parcourir workout_sets : volume hebdomadaire, tonnage par exercice, temps par metric_type, charge RPE.
+
+Temps par metric_type / par exercice : la durée d'une séance est répartie au prorata de ses séries
+(séance mono-type : toute la durée ; 3 séries en charge + 1 de course sur 60 min : 45 + 15 min).
+La charge RPE suit la même répartition (part de durée x RPE de séance). La somme des lignes par
+metric_type égale la durée des séances avec séries ; une séance sans série ne compte qu'en totaux.
+
+Tenue à jour incrémentale, par période touchée :
+    - écritures ORM sur les séances / séries (création, modification, suppression) : détectées au flush ;
+    - écritures SQL directes (import groupé, INSERT groupé des séries) : mark_dirty() explicite.
+Au commit, les semaines touchées sont recalculées depuis leurs séances (une lecture, puis suppression et
+réinsertion des lignes journalières et hebdomadaires de ces semaines), dans la même transaction que les
+données : une modification ou une suppression ne laisse jamais d'agrégat périmé.
+Le coût suit le nombre de semaines touchées, jamais la taille de l'historique.
+
+Reconstruction complète (données importées hors de l'API, changement de règle d'agrégation) :
+    python rebuild_rollups.py
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.metrics import registry
+from app.models import sql_models
+
+WorkoutSession, WorkoutSet = sql_models.WorkoutSession, sql_models.WorkoutSet
+DailyTable, WeeklyTable = sql_models.DailyRollup.__table__, sql_models.WeeklyRollup.__table__
+
+# Colonnes de séance / de série qui changent les agrégats
+SESSION_COLUMNS = ("user_id", "date", "duration", "rpe")
+SET_COLUMNS = ("session_id", "exercise_id", "metric_type", "weight", "reps")
+COUNTERS = ("sessions", "sets", "reps", "volume", "duration", "rpe_load")
+TOTAL = ("", 0)  # (metric_type, exercise_id) de la ligne de totaux
+
+REFRESHED_WEEKS = registry.counter(
+    "training_rollup_weeks_total", "Semaines d'agrégats recalculées (au commit ou par reconstruction).")
+
+_DIRTY = "rollup_days"
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+def mark_dirty(db: Session, user_id: int, days: Iterable[Optional[date]]) -> None:
+    """Note les jours dont les séances ont changé ; agrégats recalculés au prochain commit de la session."""
+    dirty = db.info.setdefault(_DIRTY, set())
+    dirty.update((user_id, day) for day in days if day is not None)
+
+def _aggregate(rows: Iterable[tuple]) -> Tuple[Dict[tuple, list], Dict[tuple, list]]:
+    """
+    Lignes (séance, date, durée, RPE, metric_type, exercice, poids, reps) — une par série, séance sans série
+    incluse (colonnes de série NULL) — vers les compteurs par (période, metric_type, exercice).
+    Chaque série porte une part égale de la durée de sa séance (répartition au prorata des séries).
+    """
+    rows = list(rows)
+    set_counts: Dict[int, int] = {}
+    for row in rows:
+        if row[4] is not None:
+            set_counts[row[0]] = set_counts.get(row[0], 0) + 1
+    daily: Dict[tuple, list] = {}
+    weekly: Dict[tuple, list] = {}
+    # (période, clé, séance) déjà comptées, par table : une séance compte une fois par ligne
+    counted: Tuple[Set[tuple], Set[tuple]] = (set(), set())
+    for session_id, day, duration, rpe, metric_type, exercise_id, weight, reps in rows:
+        if day is None:
+            continue
+        for table, period, seen in ((daily, day, counted[0]), (weekly, week_start(day), counted[1])):
+            if (period, TOTAL, session_id) not in seen:
+                seen.add((period, TOTAL, session_id))
+                total = table.setdefault((period,) + TOTAL, [0, 0, 0.0, 0.0, 0.0, 0.0])
+                total[0] += 1
+                total[4] += duration or 0.0
+                total[5] += (duration or 0.0) * (rpe or 0.0)
+            if metric_type is None:
+                continue
+            volume = (weight or 0.0) * (reps or 0.0) if metric_type == "LOAD_REPS" else 0.0
+            share = (duration or 0.0) / set_counts[session_id]
+            keys = [TOTAL, (metric_type, 0)]
+            if exercise_id:
+                keys.append((metric_type, exercise_id))
+            for key in keys:
+                counters = table.setdefault((period,) + key, [0, 0, 0.0, 0.0, 0.0, 0.0])
+                if (period, key, session_id) not in seen:
+                    seen.add((period, key, session_id))
+                    counters[0] += 1
+                counters[1] += 1
+                if key != TOTAL:  # unités propres au metric_type : pas de somme tous types confondus
+                    counters[2] += reps or 0.0
+                    counters[4] += share  # totaux : durée entière, comptée une fois par séance ci-dessus
+                    counters[5] += share * (rpe or 0.0)
+                counters[3] += volume
+    return daily, weekly
+
+def _rows(user_id: int, counters: Dict[tuple, list]) -> List[dict]:
+    return [
+        {"user_id": user_id, "period_start": period, "metric_type": metric_type, "exercise_id": exercise_id,
+         **dict(zip(COUNTERS, values))}
+        for (period, metric_type, exercise_id), values in counters.items()
+    ]
+
+def _source(user_id: int):
+    return (
+        select(WorkoutSession.id, WorkoutSession.date, WorkoutSession.duration, WorkoutSession.rpe,
+               WorkoutSet.metric_type, WorkoutSet.exercise_id, WorkoutSet.weight, WorkoutSet.reps)
+        .select_from(WorkoutSession)
+        .outerjoin(WorkoutSet, WorkoutSet.session_id == WorkoutSession.id)
+        .where(WorkoutSession.user_id == user_id)
+    )
+
+def refresh_weeks(db, user_id: int, days: Iterable[date]) -> int:
+    """Recalcule les semaines contenant `days` (Session ou Connection) ; retourne le nombre de semaines."""
+    weeks = sorted({week_start(day) for day in days})
+    if not weeks:
+        return 0
+    week_days = [week + timedelta(days=i) for week in weeks for i in range(7)]
+    daily, weekly = _aggregate(db.execute(_source(user_id).where(WorkoutSession.date.in_(week_days))))
+    db.execute(delete(DailyTable).where(DailyTable.c.user_id == user_id, DailyTable.c.period_start.in_(week_days)))
+    db.execute(delete(WeeklyTable).where(WeeklyTable.c.user_id == user_id, WeeklyTable.c.period_start.in_(weeks)))
+    if daily:
+        db.execute(insert(DailyTable), _rows(user_id, daily))
+        db.execute(insert(WeeklyTable), _rows(user_id, weekly))
+    REFRESHED_WEEKS.inc(len(weeks))
+    return len(weeks)
+
+def rebuild_user(db, user_id: int) -> int:
+    """Reconstruit tout l'historique d'un utilisateur ; retourne le nombre de lignes journalières."""
+    daily, weekly = _aggregate(db.execute(_source(user_id)))
+    db.execute(delete(DailyTable).where(DailyTable.c.user_id == user_id))
+    db.execute(delete(WeeklyTable).where(WeeklyTable.c.user_id == user_id))
+    if daily:
+        db.execute(insert(DailyTable), _rows(user_id, daily))
+        db.execute(insert(WeeklyTable), _rows(user_id, weekly))
+    REFRESHED_WEEKS.inc(len({key[0] for key in weekly}))
+    return len(daily)
+
+def users_with_workouts(db, user_ids: Optional[Sequence[int]] = None) -> List[int]:
+    query = select(WorkoutSession.user_id).distinct().where(WorkoutSession.user_id.is_not(None))
+    if user_ids:
+        query = query.where(WorkoutSession.user_id.in_(list(user_ids)))
+    return sorted(db.execute(query).scalars())
+
+# --- Détection des écritures ORM ---
+
+def _changed(obj, columns: Sequence[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in columns)
+
+def _previous(obj, name: str):
+    """Valeur d'une colonne avant modification (ancienne date d'une séance déplacée)."""
+    history = inspect(obj).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(obj, name)
+
+def _set_session(session: Session, workout_set: sql_models.WorkoutSet, previous: bool = False):
+    session_id = _previous(workout_set, "session_id") if previous else workout_set.session_id
+    if not previous and workout_set.session is not None:
+        return workout_set.session
+    return session.get(WorkoutSession, session_id) if session_id is not None else None
+
+@event.listens_for(Session, "before_flush")
+def _collect_orm_changes(session: Session, flush_context, instances) -> None:
+    with session.no_autoflush:
+        for obj, state in [(o, "new") for o in session.new] + [(o, "dirty") for o in session.dirty] \
+                + [(o, "deleted") for o in session.deleted]:
+            if isinstance(obj, WorkoutSession):
+                if state == "dirty" and not _changed(obj, SESSION_COLUMNS):
+                    continue
+                mark_dirty(session, obj.user_id, [obj.date])
+                if state == "dirty":  # séance déplacée (autre jour / autre utilisateur)
+                    mark_dirty(session, _previous(obj, "user_id"), [_previous(obj, "date")])
+            elif isinstance(obj, WorkoutSet):
+                if state == "dirty" and not _changed(obj, SET_COLUMNS):
+                    continue
+                for previous in ((False, True) if state == "dirty" else (False,)):
+                    owner = _set_session(session, obj, previous)
+                    if owner is not None:
+                        mark_dirty(session, owner.user_id, [owner.date])
+
+# --- Écriture au commit ---
+
+@event.listens_for(Session, "before_commit")
+def _refresh_dirty(session: Session) -> None:
+    if not (session.info.get(_DIRTY) or session.new or session.dirty or session.deleted):
+        return
+    session.flush()  # collecte les dernières écritures ORM
+    dirty = session.info.pop(_DIRTY, None)
+    if not dirty:
+        return
+    by_user: Dict[int, Set[date]] = {}
+    for user_id, day in dirty:
+        if user_id is not None:
+            by_user.setdefault(user_id, set()).add(day)
+    for user_id, days in by_user.items():
+        refresh_weeks(session, user_id, days)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_dirty(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_DIRTY, None)
+
+# --- Lecture (GET /aggregates, prompts IA) ---
+
+GROUPINGS = ("total", "metric_type", "exercise")
+
+def get_aggregates(
+    db: Session,
+    user_id: int,
+    period: str = "weekly",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: str = "total",
+    metric_type: Optional[str] = None,
+    exercise_id: Optional[int] = None,
+) -> List[dict]:
+    """Lignes précalculées d'une période (daily / weekly), par ordre chronologique : une requête."""
+    model = sql_models.DailyRollup if period == "daily" else sql_models.WeeklyRollup
+    query = (
+        select(model, sql_models.Exercise.name)
+        .outerjoin(sql_models.Exercise, sql_models.Exercise.id == model.exercise_id)
+        .where(model.user_id == user_id)
+        .order_by(model.period_start, model.metric_type, model.exercise_id)
+    )
+    if group_by == "total":
+        query = query.where(model.metric_type == "", model.exercise_id == 0)
+    elif group_by == "metric_type":
+        query = query.where(model.metric_type != "", model.exercise_id == 0)
+    else:
+        query = query.where(model.exercise_id != 0)
+    if start is not None:
+        query = query.where(model.period_start >= (week_start(start) if period == "weekly" else start))
+    if end is not None:
+        query = query.where(model.period_start <= end)
+    if metric_type:
+        query = query.where(model.metric_type == metric_type)
+    if exercise_id:
+        query = query.where(model.exercise_id == exercise_id)
+
+    return [
+        {
+            "period_start": row.period_start,
+            "metric_type": row.metric_type or None,
+            "exercise_id": row.exercise_id or None,
+            "exercise": name,
+            **{counter: getattr(row, counter) for counter in COUNTERS},
+        }
+        for row, name in db.execute(query)
+    ]
@@ -0,0 +1,185 @@
+"""
+Génération groupée des semaines types d'un squad.
+
+1. Les athlètes sont regroupés par entrées de planification équivalentes
+   (clé sémantique "week" : sport, niveau, objectif, créneaux actifs).
+2. Une seule génération par groupe, en parallèle sous SQUAD_BATCH_CONCURRENCY.
+3. Le résultat est recopié dans le plan WEEK (user_plans) de chaque membre du groupe.
+4. L'avancement par athlète est tenu à jour dans SquadPlanJob (lisible par GET /squads/jobs/{id}).
+
+Le job tourne dans le worker qui l'a lancé : si ce worker s'arrête, le job reste PENDING / RUNNING.
+Chaque écriture d'avancement rafraîchit updated_at ; un job actif sans nouvelles depuis
+SQUAD_JOB_STALE_MINUTES (défaut 15) est considéré orphelin et passé FAILED (expire_stale_jobs,
+au démarrage et avant chaque nouvelle génération du squad).
+
+Les entrées viennent du profil enregistré côté serveur (User.profile_data), pas du client.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.database import SessionLocal
+from app.core.metrics import track_queries
+from app.models import sql_models
+from app.models.enums import AthleteJobStatus, BatchJobStatus, PlanKind
+from app.models.schemas import WeeklyPlanResponse
+from app.routers.coach import normalize_week, clean_ai_json, get_weekly_planning_prompt
+from app.services.llm.backend import get_llm_backend
+from app.services.llm.cache_keys import semantic_cache_key
+from app.services.plans.store import fan_out_plan
+
+logger = logging.getLogger(__name__)
+
+SQUAD_BATCH_CONCURRENCY = int(os.getenv("SQUAD_BATCH_CONCURRENCY", 4))
+SQUAD_JOB_STALE_MINUTES = float(os.getenv("SQUAD_JOB_STALE_MINUTES", 15))
+
+ACTIVE_STATUSES = (BatchJobStatus.PENDING, BatchJobStatus.RUNNING)
+
+REQUIRED_FIELDS = ("sport", "level", "goal")
+
+# Groupe : (clé sémantique, profil représentatif, ids des athlètes)
+Group = Tuple[str, Dict[str, Any], List[int]]
+
+def planning_inputs(user: sql_models.User) -> Dict[str, Any]:
+    data = user.profile_data
+    if isinstance(data, str):
+        try:
+            data = json.loads(data) if data.strip() else {}
+        except json.JSONDecodeError:
+            data = {}
+    return data if isinstance(data, dict) else {}
+
+def _missing_inputs(profile: Dict[str, Any]) -> str:
+    missing = [field for field in REQUIRED_FIELDS if not profile.get(field)]
+    if missing:
+        return f"Profil incomplet : {', '.join(missing)}"
+    slots = profile.get("availability") or []
+    if not any(isinstance(slot, dict) and slot.get("isActive", False) for slot in slots):
+        return "Aucun créneau actif"
+    return ""
+
+def group_athletes(users: List[sql_models.User]) -> Tuple[List[Group], Dict[int, str]]:
+    """Regroupe les athlètes par entrées équivalentes ; retourne aussi les athlètes écartés (raison)."""
+    groups: Dict[str, Group] = {}
+    skipped: Dict[int, str] = {}
+    for user in users:
+        profile = planning_inputs(user)
+        reason = _missing_inputs(profile)
+        if reason:
+            skipped[user.id] = reason
+            continue
+        key = semantic_cache_key("week", profile)
+        if key not in groups:
+            groups[key] = (key, profile, [])
+        groups[key][2].append(user.id)
+    return list(groups.values()), skipped
+
+def initial_progress(groups: List[Group], skipped: Dict[int, str]) -> Dict[str, Dict[str, Any]]:
+    athletes = {}
+    for index, (_, _, user_ids) in enumerate(groups):
+        for user_id in user_ids:
+            athletes[str(user_id)] = {"status": AthleteJobStatus.PENDING.value, "group": index, "detail": None}
+    for user_id, reason in skipped.items():
+        athletes[str(user_id)] = {"status": AthleteJobStatus.SKIPPED.value, "group": None, "detail": reason}
+    return athletes
+
+def expire_stale_jobs(db, squad_id: Optional[int] = None) -> int:
+    """Passe FAILED les jobs actifs sans battement depuis SQUAD_JOB_STALE_MINUTES ; retourne leur nombre."""
+    now = datetime.utcnow()
+    Job = sql_models.SquadPlanJob
+    query = db.query(Job).filter(
+        Job.status.in_(ACTIVE_STATUSES),
+        Job.updated_at < now - timedelta(minutes=SQUAD_JOB_STALE_MINUTES),
+    )
+    if squad_id is not None:
+        query = query.filter(Job.squad_id == squad_id)
+    expired = query.update({
+        Job.status: BatchJobStatus.FAILED,
+        Job.error: f"Job interrompu : aucune nouvelle depuis {SQUAD_JOB_STALE_MINUTES:g} min (worker arrêté ?).",
+        Job.finished_at: now,
+    }, synchronize_session=False)
+    if expired:
+        logger.warning(f"⚠️ {expired} job(s) de squad orphelin(s) passé(s) FAILED.")
+    return expired
+
+class _JobProgress:
+    """Écritures d'avancement (session dédiée : le job tourne après la réponse HTTP)."""
+
+    def __init__(self, db, job_id: str):
+        self.db = db
+        self.job = db.get(sql_models.SquadPlanJob, job_id)
+
+    def set_athletes(self, user_ids: List[int], status: AthleteJobStatus, detail: str = None) -> None:
+        athletes = dict(self.job.athletes or {})
+        for user_id in user_ids:
+            entry = dict(athletes.get(str(user_id), {}))
+            entry.update(status=status.value, detail=detail)
+            athletes[str(user_id)] = entry
+        # Réassignation : la colonne JSON n'est pas suivie en mutation
+        self.job.athletes = athletes
+
+    def commit(self) -> None:
+        self.db.commit()
+
+async def _run_group(llm, progress: "_JobProgress", group: Group, semaphore: asyncio.Semaphore) -> bool:
+    """Une génération pour tout le groupe, puis copie du résultat chez chaque membre."""
+    key, profile, user_ids = group
+    try:
+        async with semaphore:
+            progress.set_athletes(user_ids, AthleteJobStatus.GENERATING)
+            progress.commit()
+            text = await llm.generate(get_weekly_planning_prompt(profile), "week", cache_key=key)
+        result = normalize_week(json.loads(clean_ai_json(text)))
+        WeeklyPlanResponse.model_validate(result)
+    except Exception as e:
+        logger.warning(f"⚠️ Génération de groupe en échec ({len(user_ids)} athlètes) : {e}")
+        progress.set_athletes(user_ids, AthleteJobStatus.FAILED, str(e)[:200])
+        progress.commit()
+        return False
+
+    # Pas d'await entre les écritures et le commit : les écritures des groupes ne s'entrelacent pas
+    fan_out_plan(progress.db, user_ids, PlanKind.WEEK, result)
+    progress.set_athletes(user_ids, AthleteJobStatus.DONE)
+    progress.commit()
+    return True
+
+async def run_week_job(job_id: str, groups: List[Group]) -> None:
+    """Exécute le job : générations dédupliquées en parallèle, puis fan-out vers chaque athlète."""
+    start = time.perf_counter()
+    db = SessionLocal(expire_on_commit=False)
+    # Requêtes SQL / temps LLM du job comptés à part (pas dans le budget de la route qui l'a lancé)
+    with track_queries() as stats:
+        try:
+            progress = _JobProgress(db, job_id)
+            progress.job.status = BatchJobStatus.RUNNING
+            progress.commit()
+
+            llm = get_llm_backend()
+            semaphore = asyncio.Semaphore(SQUAD_BATCH_CONCURRENCY)
+
+            results = await asyncio.gather(*(_run_group(llm, progress, group, semaphore) for group in groups))
+            done_count = sum(results)
+
+            progress.job.status = BatchJobStatus.DONE if done_count or not groups else BatchJobStatus.FAILED
+            progress.job.finished_at = datetime.utcnow()
+            progress.commit()
+            logger.info(
+                f"✅ Job {job_id} : {done_count}/{len(groups)} groupes générés "
+                f"({sum(len(g[2]) for g in groups)} athlètes) en {time.perf_counter() - start:.1f}s, "
+                f"{stats.db_queries} requêtes SQL"
+            )
+        except Exception as e:
+            logger.error(f"💥 Job {job_id} en échec : {e}")
+            db.rollback()
+            job = db.get(sql_models.SquadPlanJob, job_id)
+            if job is not None:
+                job.status = BatchJobStatus.FAILED
+                job.error = str(e)[:500]
+                job.finished_at = datetime.utcnow()
+                db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,194 @@
+"""
+Journal des changements pour la synchronisation incrémentale du mobile (GET /sync).
+
+Chaque utilisateur a une séquence monotone (table user_sync_state). Toute écriture sur une entité synchronisée
+(séance, série, carte du feed, engramme, section du profil, plan) y prend un numéro, et la table
+sync_changes garde, par entité, la dernière modification (ou sa suppression : tombstone).
+Un client qui revient avec son dernier numéro ne relit que les entités modifiées depuis : O(changements).
+
+Enregistrement :
+    - écritures ORM (séances, cartes du feed, engrammes, profil) : détectées automatiquement au flush ;
+    - écritures SQL directes (INSERT groupé des séries, plans) : record_change() explicite.
+Les changements sont écrits au commit, dans la même transaction que les données (deux requêtes par
+utilisateur concerné), et abandonnés si la transaction est annulée.
+
+Le numéro est réservé par un UPSERT de la ligne user_sync_state de l'utilisateur : deux transactions
+du même utilisateur se sérialisent sur ce verrou, les numéros sont donc visibles dans l'ordre où ils ont
+été attribués (un client ne peut pas « sauter » un changement commité plus tard avec un numéro plus petit).
+Ligne étroite dédiée : le verrou tenu jusqu'au commit ne bloque pas les écritures sur la ligne users.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app.core.metrics import registry
+from app.models import sql_models
+from app.models.enums import SyncEntity
+
+SyncChangeTable = sql_models.SyncChange.__table__
+SyncStateTable = sql_models.UserSyncState.__table__
+
+# Sections JSON du profil synchronisées individuellement
+PROFILE_SECTIONS = (
+    "basic_info", "physical_metrics", "sport_context", "training_preferences",
+    "goals", "constraints", "injury_prevention", "performance_baseline",
+)
+
+SYNC_CHANGES = registry.counter(
+    "sync_changes_total", "Changements enregistrés dans le journal de synchronisation, par entité.")
+
+_PENDING = "sync_changes"
+_OWNERS = "sync_memory_owners"
+
+def _pending(db: Session) -> List[tuple]:
+    return db.info.setdefault(_PENDING, [])
+
+def record_change(db: Session, user_id: int, entity: SyncEntity, entity_ids: Iterable, deleted: bool = False) -> None:
+    """Note des entités modifiées (ou supprimées) ; écrites au prochain commit de la session."""
+    pending = _pending(db)
+    for entity_id in entity_ids:
+        pending.append((user_id, entity, entity_id, deleted))
+
+# --- Détection des écritures ORM ---
+
+def _engram_user(engram: sql_models.CoachEngram) -> Optional[int]:
+    if engram.memory_id is None:
+        return None
+    # Propriétaire d'une mémoire : une requête par mémoire et par transaction (audit = N engrammes, 1 mémoire)
+    owners = object_session(engram).info.setdefault(_OWNERS, {})
+    if engram.memory_id not in owners:
+        owners[engram.memory_id] = object_session(engram).execute(
+            select(sql_models.AthleteProfile.user_id)
+            .join(sql_models.CoachMemory, sql_models.CoachMemory.athlete_profile_id == sql_models.AthleteProfile.id)
+            .where(sql_models.CoachMemory.id == engram.memory_id)
+        ).scalar()
+    return owners[engram.memory_id]
+
+def _set_user(workout_set: sql_models.WorkoutSet) -> Optional[int]:
+    return workout_set.session.user_id if workout_set.session is not None else None
+
+# Entité synchronisée -> (nature, propriétaire)
+_TRACKED = {
+    sql_models.WorkoutSession: (SyncEntity.WORKOUT, lambda obj: obj.user_id),
+    sql_models.WorkoutSet: (SyncEntity.SET, _set_user),
+    sql_models.FeedItem: (SyncEntity.FEED_ITEM, lambda obj: obj.user_id),
+    sql_models.CoachEngram: (SyncEntity.ENGRAM, _engram_user),
+}
+
+def _changed_sections(profile: sql_models.AthleteProfile, new: bool) -> List[str]:
+    state = inspect(profile)
+    return [
+        name for name in PROFILE_SECTIONS
+        if (getattr(profile, name) if new else state.attrs[name].history.has_changes())
+    ]
+
+@event.listens_for(Session, "before_flush")
+def _collect_orm_changes(session: Session, flush_context, instances) -> None:
+    pending = None
+    with session.no_autoflush:
+        for obj, deleted in [(o, False) for o in session.new] + [(o, False) for o in session.dirty] \
+                + [(o, True) for o in session.deleted]:
+            if isinstance(obj, sql_models.AthleteProfile):
+                sections = PROFILE_SECTIONS if deleted else _changed_sections(obj, obj in session.new)
+                if sections and obj.user_id is not None:
+                    pending = pending if pending is not None else _pending(session)
+                    pending.extend((obj.user_id, SyncEntity.PROFILE_SECTION, name, deleted) for name in sections)
+                continue
+            tracked = _TRACKED.get(type(obj))
+            if tracked is None or (not deleted and obj in session.dirty and not session.is_modified(obj)):
+                continue
+            entity, owner = tracked
+            user_id = owner(obj)
+            if user_id is not None:
+                pending = pending if pending is not None else _pending(session)
+                # Objet : identifiant lu au commit (pas encore attribué pour une nouvelle ligne)
+                pending.append((user_id, entity, obj, deleted))
+
+# --- Écriture au commit ---
+
+def _entity_id(ref) -> str:
+    if isinstance(ref, (str, int)):
+        return str(ref)
+    return str(inspect(ref).identity[0])
+
+def _dialect_insert(db: Session):
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+def _upsert(db: Session):
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        return None
+    stmt = dialect_insert(SyncChangeTable)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "entity", "entity_id"],
+        set_={"seq": stmt.excluded.seq, "deleted": stmt.excluded.deleted, "changed_at": stmt.excluded.changed_at},
+    )
+
+def current_seq(db: Session, user_id: int) -> int:
+    """Dernier numéro attribué à l'utilisateur (0 s'il n'a encore rien journalisé)."""
+    return db.execute(select(SyncStateTable.c.seq).where(SyncStateTable.c.user_id == user_id)).scalar() or 0
+
+def _reserve(db: Session, user_id: int, count: int) -> int:
+    """Réserve `count` numéros dans la séquence de l'utilisateur ; retourne le dernier."""
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        stmt = dialect_insert(SyncStateTable).values(user_id=user_id, seq=count)
+        stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_={"seq": SyncStateTable.c.seq + count})
+        return db.execute(stmt.returning(SyncStateTable.c.seq)).scalar_one()
+    result = db.execute(
+        update(SyncStateTable).where(SyncStateTable.c.user_id == user_id).values(seq=SyncStateTable.c.seq + count)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(SyncStateTable).values(user_id=user_id, seq=count))
+    return current_seq(db, user_id)
+
+def write_changes(db: Session, pending: List[tuple]) -> None:
+    # Dernière opération par entité, dans l'ordre d'enregistrement
+    latest: Dict[int, Dict[Tuple[SyncEntity, str], bool]] = {}
+    for user_id, entity, ref, deleted in pending:
+        changes = latest.setdefault(user_id, {})
+        key = (entity, _entity_id(ref))
+        changes.pop(key, None)
+        changes[key] = deleted
+
+    for user_id, changes in latest.items():
+        last = _reserve(db, user_id, len(changes))
+        first = last - len(changes) + 1
+        rows = [
+            {"user_id": user_id, "entity": entity, "entity_id": entity_id, "seq": first + i, "deleted": deleted}
+            for i, ((entity, entity_id), deleted) in enumerate(changes.items())
+        ]
+        stmt = _upsert(db)
+        if stmt is None:
+            columns = SyncChangeTable.c
+            db.execute(delete(SyncChangeTable).where(columns.user_id == user_id, or_(*(
+                and_(columns.entity == row["entity"], columns.entity_id == row["entity_id"]) for row in rows
+            ))))
+            stmt = insert(SyncChangeTable)
+        db.execute(stmt, rows)
+        for entity, _ in changes:
+            SYNC_CHANGES.inc(entity=entity.value)
+
+@event.listens_for(Session, "before_commit")
+def _write_pending(session: Session) -> None:
+    if not (session.info.get(_PENDING) or session.new or session.dirty or session.deleted):
+        return
+    session.flush()  # collecte les dernières écritures ORM, attribue les identifiants des nouvelles lignes
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        write_changes(session, pending)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction) -> None:
+    # Commit (déjà écrit) ou rollback : rien ne survit à la transaction
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+        session.info.pop(_OWNERS, None)
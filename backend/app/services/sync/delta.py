@@ -0,0 +1,145 @@
+"""
+Réponse de GET /sync : entités modifiées depuis le jeton du client + tombstones des suppressions.
+
+Une requête pour la séquence de l'utilisateur (jeton non nul), une pour le journal (index user_id, seq),
+puis une requête par nature d'entité présente dans la page : le coût suit le nombre de changements,
+jamais la taille de l'historique.
+Une entité journalisée mais introuvable (supprimée sans tombstone, ex. cascade SQL) est renvoyée
+comme supprimée.
+"""
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
+
+from app.core.projection import project
+from app.models import sql_models, schemas
+from app.models.enums import PlanKind, SyncEntity
+from app.services.artifacts.store import decode
+from app.services.sync.changes import PROFILE_SECTIONS, current_seq
+
+WORKOUT_FIELDS = ("id", "date", "duration", "rpe", "energy_level", "notes", "ai_summary", "ai_analysis_ref", "created_at")
+SET_FIELDS = ("id", "session_id", "exercise_id", "exercise_name", "set_order", "weight", "reps", "rpe", "rest_seconds", "metric_type")
+
+# Identifiants numériques renvoyés comme entiers
+INT_IDS = (SyncEntity.WORKOUT, SyncEntity.SET, SyncEntity.ENGRAM)
+
+def _rows(db: Session, model, fields, ids: List[str], *where) -> Dict[str, Dict[str, Any]]:
+    columns = [getattr(model, name) for name in fields]
+    rows = db.execute(select(*columns).where(model.id.in_([int(i) for i in ids]), *where))
+    return {str(row[0]): project(row, fields) for row in rows}
+
+def _workouts(db: Session, user_id: int, ids: List[str]) -> Dict[str, Any]:
+    Workout = sql_models.WorkoutSession
+    return _rows(db, Workout, WORKOUT_FIELDS, ids, Workout.user_id == user_id)
+
+def _sets(db: Session, user_id: int, ids: List[str]) -> Dict[str, Any]:
+    WorkoutSet, Workout = sql_models.WorkoutSet, sql_models.WorkoutSession
+    owned = select(Workout.id).where(Workout.user_id == user_id)
+    return _rows(db, WorkoutSet, SET_FIELDS, ids, WorkoutSet.session_id.in_(owned))
+
+def _feed_items(db: Session, user_id: int, ids: List[str]) -> Dict[str, Any]:
+    items = db.query(sql_models.FeedItem).filter(
+        sql_models.FeedItem.id.in_(ids), sql_models.FeedItem.user_id == user_id
+    )
+    return {item.id: schemas.FeedItemResponse.model_validate(item).model_dump(mode="json") for item in items}
+
+def _engrams(db: Session, user_id: int, ids: List[str]) -> Dict[str, Any]:
+    engrams = db.query(sql_models.CoachEngram)\
+        .join(sql_models.CoachMemory)\
+        .join(sql_models.AthleteProfile)\
+        .filter(sql_models.CoachEngram.id.in_([int(i) for i in ids]), sql_models.AthleteProfile.user_id == user_id)
+    return {
+        str(engram.id): schemas.CoachEngramResponse.model_validate(engram).model_dump(mode="json")
+        for engram in engrams
+    }
+
+def _profile_sections(db: Session, user_id: int, names: List[str]) -> Dict[str, Any]:
+    names = [name for name in names if name in PROFILE_SECTIONS]
+    profile = db.query(sql_models.AthleteProfile)\
+        .options(load_only(
+            sql_models.AthleteProfile.user_id, *(getattr(sql_models.AthleteProfile, name) for name in names)
+        ))\
+        .filter(sql_models.AthleteProfile.user_id == user_id)\
+        .first()
+    if profile is None:
+        return {}
+    # Même nettoyage des sections legacy que GET /api/v1/profiles/me
+    data = {"id": profile.id, "user_id": profile.user_id, **{name: getattr(profile, name) for name in names}}
+    return schemas.AthleteProfileResponse.model_validate(data).model_dump(mode="json", include=set(names))
+
+def _plans(db: Session, user_id: int, kinds: List[str]) -> Dict[str, Any]:
+    UserPlan, AIArtifact = sql_models.UserPlan, sql_models.AIArtifact
+    rows = db.execute(
+        select(UserPlan.kind, UserPlan.data, AIArtifact.codec, AIArtifact.content)
+        .outerjoin(AIArtifact, AIArtifact.digest == UserPlan.digest)
+        .where(UserPlan.user_id == user_id, UserPlan.kind.in_([PlanKind(kind) for kind in kinds]))
+    )
+    plans = {}
+    for row in rows:
+        text = decode(row.codec, row.content) if row.content is not None else row.data
+        if text:
+            plans[row.kind.value] = json.loads(text)
+    return plans
+
+LOADERS = {
+    SyncEntity.WORKOUT: _workouts,
+    SyncEntity.SET: _sets,
+    SyncEntity.FEED_ITEM: _feed_items,
+    SyncEntity.ENGRAM: _engrams,
+    SyncEntity.PROFILE_SECTION: _profile_sections,
+    SyncEntity.PLAN: _plans,
+}
+
+def _public_id(entity: SyncEntity, entity_id: str):
+    return int(entity_id) if entity in INT_IDS else entity_id
+
+def build_delta(db: Session, user: sql_models.User, since: int, limit: int) -> Dict[str, Any]:
+    """
+    Changements de l'utilisateur de numéro > `since`, par ordre de séquence, au plus `limit` entités.
+    `cursor` est le jeton à renvoyer au prochain appel ; `has_more` indique qu'une autre page suit.
+    Un jeton inconnu (supérieur à la séquence de l'utilisateur, ex. base restaurée) déclenche
+    une resynchronisation complète (`reset`).
+    """
+    reset = since < 0 or (since > 0 and since > current_seq(db, user.id))
+    if reset:
+        since = 0
+
+    SyncChange = sql_models.SyncChange
+    changes = db.execute(
+        select(SyncChange.entity, SyncChange.entity_id, SyncChange.seq, SyncChange.deleted)
+        .where(SyncChange.user_id == user.id, SyncChange.seq > since)
+        .order_by(SyncChange.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    upserts: Dict[SyncEntity, List[str]] = {}
+    deletes: Dict[str, List[Any]] = {entity.value: [] for entity in SyncEntity}
+    for change in changes:
+        if change.deleted:
+            deletes[change.entity.value].append(_public_id(change.entity, change.entity_id))
+        else:
+            upserts.setdefault(change.entity, []).append(change.entity_id)
+
+    payload: Dict[str, Any] = {entity.value: [] for entity in SyncEntity}
+    payload[SyncEntity.PROFILE_SECTION.value] = {}
+    payload[SyncEntity.PLAN.value] = {}
+    for entity, ids in upserts.items():
+        found = LOADERS[entity](db, user.id, ids)
+        if entity in (SyncEntity.PROFILE_SECTION, SyncEntity.PLAN):
+            payload[entity.value] = found
+        else:
+            payload[entity.value] = [found[i] for i in ids if i in found]
+        deletes[entity.value].extend(_public_id(entity, i) for i in ids if i not in found)
+
+    return {
+        "since": since,
+        "cursor": changes[-1].seq if changes else since,
+        "has_more": has_more,
+        "reset": reset,
+        "upserts": payload,
+        "deletes": deletes,
+    }
@@ -0,0 +1,262 @@
+"""
+Bibliothèque de séances pré-générées (court-circuit du LLM pour les combinaisons courantes).
+
+Index construit hors ligne (app/jobs/build_workout_templates.py), clé :
+    (sport, niveau, focus, palier de durée, palier d'énergie, matériel)
+avec les mêmes paliers que les clés de cache sémantiques (app.services.llm.cache_keys).
+Chaque clé porte plusieurs variantes d'AIWorkoutPlan ; l'index est chargé une fois en mémoire
+(variantes gardées sérialisées : un json.loads par hit, plus rapide qu'un deepcopy)
+et une variante est servie sans appel IA.
+
+Les profils blessés ne passent jamais par la bibliothèque : la séance doit tenir compte
+de la blessure, seul le LLM la personnalise.
+
+La bibliothèque n'est active que si son index existe (sinon aucune consultation, aucun journal).
+
+Journal des clés absentes (optionnel, WORKOUT_TEMPLATE_MISSES_PATH) : les absences sont comptées en
+mémoire et écrites par agrégat (une ligne JSONL par clé avec son compteur) au plus toutes les
+WORKOUT_TEMPLATE_MISSES_FLUSH_S secondes, hors de la boucle d'événements, puis à l'arrêt du process.
+Le build suivant pré-génère les clés les plus demandées.
+
+Variables d'environnement :
+    WORKOUT_TEMPLATES_ENABLED           1 (défaut) / 0
+    WORKOUT_TEMPLATES_PATH              index JSON (défaut : backend/workout_templates.json)
+    WORKOUT_TEMPLATE_MISSES_PATH        journal des clés absentes (défaut : aucun journal)
+    WORKOUT_TEMPLATE_MISSES_FLUSH_S     intervalle d'écriture du journal (défaut 60)
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.core.metrics import registry
+from app.services.llm.cache_keys import canonical, normalize_workout_context
+from app.services.llm.context import get_prompt_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WORKOUT_TEMPLATES_ENABLED = os.getenv("WORKOUT_TEMPLATES_ENABLED", "1") not in ("0", "false", "False")
+WORKOUT_TEMPLATES_PATH = os.getenv(
+    "WORKOUT_TEMPLATES_PATH", str(Path(__file__).resolve().parents[3] / "workout_templates.json"))
+WORKOUT_TEMPLATE_MISSES_PATH = os.getenv("WORKOUT_TEMPLATE_MISSES_PATH") or None
+WORKOUT_TEMPLATE_MISSES_FLUSH_S = float(os.getenv("WORKOUT_TEMPLATE_MISSES_FLUSH_S", 60))
+
+INDEX_VERSION = 1
+
+WORKOUT_TEMPLATE_REQUESTS = registry.counter(
+    "workout_template_requests_total", "Consultations de la bibliothèque de séances (hit / miss / skip / fallback).")
+
+# Valeurs de blessures équivalentes à « aucune »
+NO_INJURY = {"", "aucune", "aucun", "none", "rien", "ras"}
+
+TemplateKey = Tuple[str, str, str, int, int, str]
+
+def _has_injuries(injuries: Any) -> bool:
+    if isinstance(injuries, dict):
+        injuries = list(injuries.values())
+    if isinstance(injuries, list):
+        return any(_has_injuries(item) for item in injuries)
+    return bool(injuries) and canonical(str(injuries)) not in NO_INJURY
+
+def template_key(profile_data: Dict[str, Any], context: Dict[str, Any]) -> Optional[TemplateKey]:
+    """Clé de la bibliothèque, ou None si le profil exige une séance personnalisée (blessures)."""
+    profile_data = profile_data or {}
+    if _has_injuries(get_prompt_context("workout").project(profile_data).get("injuries")):
+        return None
+    ctx = normalize_workout_context(context)
+    return (
+        canonical(str(profile_data.get("sport", "Musculation"))),
+        canonical(str(profile_data.get("level", "Intermédiaire"))),
+        canonical(ctx["focus"]),
+        ctx["duration"],
+        ctx["energy"],
+        canonical(ctx["equipment"]),
+    )
+
+def encode_key(key: TemplateKey) -> str:
+    return "|".join(str(part) for part in key)
+
+def decode_key(encoded: str) -> TemplateKey:
+    sport, level, focus, duration, energy, equipment = encoded.split("|")
+    return sport, level, focus, int(duration), int(energy), equipment
+
+class WorkoutTemplateLibrary:
+    """Index en mémoire {clé encodée: [variantes JSON]}, chargé paresseusement depuis le fichier."""
+
+    def __init__(self, path: str = WORKOUT_TEMPLATES_PATH, misses_path: Optional[str] = WORKOUT_TEMPLATE_MISSES_PATH):
+        self.path = path
+        self.misses_path = misses_path
+        self._templates: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+        # Absences en attente d'écriture : {clé encodée: dernière entrée, avec son compteur}
+        self._misses: Dict[str, Dict[str, Any]] = {}
+        self._misses_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    @property
+    def templates(self) -> Dict[str, List[str]]:
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self._load()
+        return self._templates
+
+    def _load(self) -> Dict[str, List[str]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Bibliothèque de séances illisible ({self.path}) : {e}")
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            logger.warning(f"⚠️ Bibliothèque de séances ignorée : version {index.get('version')} != {INDEX_VERSION}")
+            return {}
+        templates = {
+            key: [json.dumps(plan, ensure_ascii=False) for plan in variants]
+            for key, variants in index.get("templates", {}).items()
+        }
+        logger.info(f"📚 Bibliothèque de séances : {len(templates)} clés chargées")
+        return templates
+
+    def reload(self) -> None:
+        with self._lock:
+            self._templates = None
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def lookup(self, profile_data: Dict[str, Any], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Variante pré-générée (copie modifiable) ou None ; une clé absente est journalisée."""
+        key = template_key(profile_data, context)
+        if key is None:
+            WORKOUT_TEMPLATE_REQUESTS.inc(result="skip")
+            return None
+        variants = self.templates.get(encode_key(key))
+        if not variants:
+            WORKOUT_TEMPLATE_REQUESTS.inc(result="miss")
+            self.record_miss(key, profile_data, context)
+            return None
+        WORKOUT_TEMPLATE_REQUESTS.inc(result="hit")
+        return json.loads(random.choice(variants))
+
+    def nearest(self, profile_data: Dict[str, Any], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Repli quand l'IA est indisponible : même sport / niveau / focus / matériel,
+        palier de durée le plus proche sans dépasser la durée demandée, puis énergie la plus proche.
+        """
+        key = template_key(profile_data, context)
+        if key is None:
+            return None
+        sport, level, focus, duration, energy, equipment = key
+        best, best_score = None, None
+        for encoded, variants in self.templates.items():
+            k_sport, k_level, k_focus, k_duration, k_energy, k_equipment = decode_key(encoded)
+            if (k_sport, k_level, k_focus, k_equipment) != (sport, level, focus, equipment) or k_duration > duration:
+                continue
+            score = (duration - k_duration, abs(energy - k_energy))
+            if best_score is None or score < best_score:
+                best, best_score = variants, score
+        if not best:
+            return None
+        WORKOUT_TEMPLATE_REQUESTS.inc(result="fallback")
+        return json.loads(random.choice(best))
+
+    def variants(self, encoded_key: str) -> List[Dict[str, Any]]:
+        return [json.loads(plan) for plan in self.templates.get(encoded_key, [])]
+
+    def record_miss(self, key: TemplateKey, profile_data: Dict[str, Any], context: Dict[str, Any]) -> None:
+        """Compte une clé absente en mémoire ; l'écriture du journal est groupée et périodique."""
+        if not self.misses_path:
+            return
+        encoded = encode_key(key)
+        with self._misses_lock:
+            entry = self._misses.get(encoded)
+            if entry is None:
+                ctx = normalize_workout_context(context)
+                entry = self._misses[encoded] = {
+                    "key": encoded,
+                    "sport": profile_data.get("sport", "Musculation"),
+                    "level": profile_data.get("level", "Intermédiaire"),
+                    "context": {k: ctx[k] for k in ("duration", "energy", "focus", "equipment")},
+                    "count": 0,
+                }
+            entry["count"] += 1
+            due = time.monotonic() - self._flushed_at >= WORKOUT_TEMPLATE_MISSES_FLUSH_S
+            if due:
+                self._flushed_at = time.monotonic()
+        if due:
+            # Écriture dans un thread : jamais d'E/S disque sur le chemin de la requête
+            threading.Thread(target=self.flush_misses, name="template-misses", daemon=True).start()
+
+    def flush_misses(self) -> int:
+        """Écrit les absences en attente (une ligne par clé) ; retourne le nombre de lignes."""
+        with self._misses_lock:
+            pending, self._misses = self._misses, {}
+        if not pending or not self.misses_path:
+            return 0
+        at = datetime.utcnow().isoformat()
+        lines = "".join(
+            json.dumps({**entry, "at": at}, ensure_ascii=False, default=str) + "\n" for entry in pending.values()
+        )
+        try:
+            # Un seul append par flush : sûr entre workers
+            with open(self.misses_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"⚠️ Journal des séances manquantes indisponible : {e}")
+            return 0
+        return len(pending)
+
+def load_misses(path: Optional[str] = WORKOUT_TEMPLATE_MISSES_PATH) -> List[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return []
+    misses = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                misses.append(json.loads(line))
+            except ValueError:
+                continue  # ligne tronquée (écriture concurrente interrompue)
+    return misses
+
+def write_index(templates: Dict[str, List[Dict[str, Any]]], path: str = WORKOUT_TEMPLATES_PATH) -> None:
+    """Écriture atomique : les workers ne lisent jamais un index à moitié écrit."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "built_at": datetime.utcnow().isoformat(),
+            "templates": templates,
+        }, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+_library: Optional[WorkoutTemplateLibrary] = None
+
+def get_template_library() -> Optional[WorkoutTemplateLibrary]:
+    """Bibliothèque du process (None si désactivée ou si l'index n'a pas encore été construit)."""
+    global _library
+    if not WORKOUT_TEMPLATES_ENABLED:
+        return None
+    if _library is None:
+        if not os.path.exists(WORKOUT_TEMPLATES_PATH):
+            return None
+        _library = WorkoutTemplateLibrary()
+        atexit.register(_library.flush_misses)
+    return _library
+
+def set_template_library(library: Optional[WorkoutTemplateLibrary]) -> None:
+    """Remplace la bibliothèque du process (tests / benchmarks)."""
+    global _library
+    _library = library
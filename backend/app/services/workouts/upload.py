@@ -0,0 +1,193 @@
+"""
+Import groupé des séances enregistrées hors ligne (POST /workouts/batch).
+
+Le mobile rejoue sa file d'attente dès que le réseau revient ; un envoi interrompu (timeout) est renvoyé tel quel.
+Chaque séance porte une clé d'idempotence générée par le client, unique par utilisateur
+(index ix_workout_sessions_idempotency) : une séance déjà reçue est renvoyée comme « duplicate », jamais recréée.
+
+    1. clés déjà connues : une requête pour tout le lot ;
+    2. nouvelles séances : un INSERT groupé pour les analyses fournies, un pour les séances, un pour
+       toutes leurs séries (INSERT directs : journalisés pour /sync par record_change, agrégats par mark_dirty) ;
+    3. un seul commit : le lot est importé en entier ou pas du tout ;
+    4. post-traitement (analyse IA + carte du feed) une fois par lot, en tâche de fond, sur la séance la plus
+       récente : les cartes d'analyse sont de toute façon dédupliquées par le feed (une par 24 h).
+"""
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.database import SessionLocal
+from app.core.metrics import registry, track_queries
+from app.models import schemas, sql_models
+from app.models.enums import PlanKind, SyncEntity
+from app.services.artifacts.store import put_artifacts, summarize
+from app.services.exercises.catalog import catalog
+from app.services.feed.engine import TriggerEngine
+from app.services.feed.triggers.workout_analysis import WorkoutAnalysisTrigger
+from app.services.plans.store import clear_plan
+from app.services.rollups.training import mark_dirty
+from app.services.sync.changes import record_change
+
+logger = logging.getLogger(__name__)
+
+WorkoutSession, WorkoutSet = sql_models.WorkoutSession, sql_models.WorkoutSet
+
+UPLOADED_WORKOUTS = registry.counter(
+    "workout_uploads_total", "Séances reçues par import groupé, créées ou déjà connues (duplicate).")
+
+def insert_sets(db: Session, user_id: int, sessions: Iterable[Tuple[int, Sequence[schemas.WorkoutSetCreate]]]) -> List[int]:
+    """
+    Séries de plusieurs séances en un seul INSERT groupé (executemany) ; journalisées pour /sync.
+    Chaque série est rattachée au catalogue (exercise_id) : aucune requête si les graphies sont connues.
+    """
+    sessions = [(session_id, sets) for session_id, sets in sessions]
+    metric_types = {s.exercise_name: s.metric_type for _, sets in sessions for s in sets}
+    exercise_ids = catalog.resolve(db, metric_types, metric_types)
+    rows = [
+        {
+            "session_id": session_id,
+            "exercise_id": exercise_ids.get(s.exercise_name),
+            "exercise_name": s.exercise_name,
+            "set_order": s.set_order,
+            "weight": s.weight,
+            "reps": s.reps,
+            "rpe": s.rpe,
+            "rest_seconds": s.rest_seconds,
+            "metric_type": s.metric_type,
+        }
+        for session_id, sets in sessions
+        for s in sets
+    ]
+    if not rows:
+        return []
+    set_ids = db.execute(insert(WorkoutSet).returning(WorkoutSet.id), rows).scalars().all()
+    record_change(db, user_id, SyncEntity.SET, set_ids)
+    return set_ids
+
+def known_keys(db: Session, user_id: int, keys: Iterable[str]) -> Dict[str, int]:
+    """Clé d'idempotence -> id des séances déjà enregistrées."""
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(WorkoutSession.idempotency_key, WorkoutSession.id)
+        .where(WorkoutSession.user_id == user_id, WorkoutSession.idempotency_key.in_(keys))
+    )
+    return {key: workout_id for key, workout_id in rows}
+
+def _import(db: Session, user_id: int, uploads: List[schemas.WorkoutUpload]):
+    known = known_keys(db, user_id, (upload.idempotency_key for upload in uploads))
+
+    # Nouvelles séances (une clé répétée dans le lot n'est créée qu'une fois)
+    fresh: Dict[str, schemas.WorkoutUpload] = {}
+    for upload in uploads:
+        if upload.idempotency_key not in known:
+            fresh.setdefault(upload.idempotency_key, upload)
+
+    created: Dict[str, int] = {}
+    latest = None
+    if fresh:
+        uploads_in = list(fresh.values())
+        # Analyses fournies par le client : artefacts compressés, un INSERT groupé
+        analysed = [upload for upload in uploads_in if upload.ai_analysis]
+        refs = dict(zip((upload.idempotency_key for upload in analysed),
+                        put_artifacts(db, (upload.ai_analysis for upload in analysed))))
+        rows = [
+            {
+                "user_id": user_id,
+                "idempotency_key": upload.idempotency_key,
+                "date": upload.date,
+                "duration": upload.duration,
+                "rpe": upload.rpe,
+                "energy_level": upload.energy_level,
+                "notes": upload.notes,
+                "ai_analysis_ref": refs.get(upload.idempotency_key),
+                "ai_summary": summarize(upload.ai_analysis),
+            }
+            for upload in uploads_in
+        ]
+        # Un INSERT groupé ; les ids sont rattachés par clé (l'ordre de RETURNING n'est pas garanti)
+        created = {
+            key: workout_id for workout_id, key in db.execute(
+                insert(WorkoutSession).returning(WorkoutSession.id, WorkoutSession.idempotency_key), rows
+            )
+        }
+        record_change(db, user_id, SyncEntity.WORKOUT, created.values())
+        mark_dirty(db, user_id, (upload.date for upload in uploads_in))
+        insert_sets(db, user_id, ((created[key], upload.sets) for key, upload in fresh.items()))
+        if any(upload.sets for upload in uploads_in):
+            # Une séance réalisée remplace le brouillon proposé par le coach (une fois par lot)
+            clear_plan(db, user_id, PlanKind.DRAFT_WORKOUT)
+        db.commit()
+        latest = created[max(fresh, key=lambda key: (fresh[key].date, created[key]))]
+
+    items, reported = [], set()
+    for upload in uploads:
+        key = upload.idempotency_key
+        is_new = key in created and key not in reported
+        reported.add(key)
+        items.append(schemas.WorkoutBatchItem(
+            idempotency_key=key, id=created.get(key) or known[key], status="created" if is_new else "duplicate"
+        ))
+    return items, latest
+
+def import_workouts(db: Session, user_id: int, uploads: List[schemas.WorkoutUpload]) -> schemas.WorkoutBatchResponse:
+    """
+    Importe le lot (déjà validé) en une transaction ; les items suivent l'ordre du lot.
+    Deux envois simultanés du même lot : le second bute sur l'index unique, est annulé puis rejoué,
+    et voit alors les séances du premier comme « duplicate ».
+    `latest_id` : séance créée la plus récente (à post-traiter), None si tout était déjà connu.
+    """
+    try:
+        items, latest = _import(db, user_id, uploads)
+    except IntegrityError:
+        db.rollback()
+        logger.info(f"🔁 Lot de séances concurrent pour l'utilisateur {user_id} : rejeu après conflit de clé")
+        items, latest = _import(db, user_id, uploads)
+
+    created = sum(item.status == "created" for item in items)
+    UPLOADED_WORKOUTS.inc(created, status="created")
+    UPLOADED_WORKOUTS.inc(len(items) - created, status="duplicate")
+    return schemas.WorkoutBatchResponse(
+        created=created, duplicates=len(items) - created, items=items, latest_id=latest
+    )
+
+async def run_batch_post_processing(user_id: int, workout_id: int) -> None:
+    """Analyse IA + carte du feed pour la séance la plus récente du lot (tâche de fond, sa propre session)."""
+    start = time.perf_counter()
+    db = SessionLocal(expire_on_commit=False)
+    with track_queries() as stats:
+        try:
+            workout = db.query(WorkoutSession)\
+                .options(selectinload(WorkoutSession.sets))\
+                .filter(WorkoutSession.id == workout_id, WorkoutSession.user_id == user_id)\
+                .first()
+            user = db.get(sql_models.User, user_id)
+            if workout is None or user is None:
+                return
+            profile_data = {}
+            if user.profile_data:
+                try:
+                    profile_data = json.loads(user.profile_data)
+                except (TypeError, ValueError):
+                    pass
+
+            engine = TriggerEngine()
+            engine.register(WorkoutAnalysisTrigger())
+            await engine.run_all(db, user_id, {"workout": workout, "profile": profile_data})
+            # L'analyse (pointeur d'artefact) est persistée même si la carte Feed est dédupliquée
+            db.commit()
+            logger.info(
+                f"✅ Post-traitement du lot (séance {workout_id}) en {time.perf_counter() - start:.1f}s, "
+                f"{stats.db_queries} requêtes SQL"
+            )
+        except Exception as e:
+            logger.error(f"💥 Post-traitement du lot (séance {workout_id}) en échec : {e}")
+            db.rollback()
+        finally:
+            db.close()
@@ -0,0 +1,154 @@
+"""
+Benchmark des clés de cache IA : taux de hit AVANT (empreinte du prompt brut)
+et APRÈS (clé sémantique canonique, app.services.llm.cache_keys), par type de génération.
+
+Le trafic est rejoué depuis une trace JSONL (enregistrée avec LLM_KEY_TRACE_PATH=...)
+ou synthétisé : quelques profils types, chacun renvoyé avec le bruit habituel des clients
+(timestamps, ordre des clés, casse / espaces, ordre des créneaux, durée / énergie au fil de l'eau).
+Cache supposé illimité : un hit = clé déjà vue.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_cache_keys
+    python -m benchmarks.bench_cache_keys --trace /tmp/llm_trace.jsonl
+    python -m benchmarks.bench_cache_keys --requests 5000 --archetypes 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routers.coach import (
+    get_profile_analysis_prompt_v2,
+    get_periodization_prompt,
+    get_weekly_planning_prompt,
+    get_workout_generation_prompt,
+)
+from app.services.llm.cache_keys import semantic_cache_key
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+SPORTS = ["Rugby", "Musculation", "Running", "CrossFit", "Natation"]
+LEVELS = ["Débutant", "Intermédiaire", "Avancé"]
+GOALS = ["Prise de masse", "Perte de poids", "Puissance", "Endurance"]
+FOCUSES = ["Full Body", "Haut du corps", "Bas du corps"]
+EQUIPMENTS = ["Standard", "Poids du corps", "Salle complète"]
+
+# Prompt utilisé pour la clé historique (le workout reçoit le contexte brut)
+PROMPTS = {
+    "audit": lambda p, c: get_profile_analysis_prompt_v2(p),
+    "strategy": lambda p, c: get_periodization_prompt(p),
+    "week": lambda p, c: get_weekly_planning_prompt(p),
+    "workout": lambda p, c: get_workout_generation_prompt(p, c or {}),
+}
+
+def _archetype(rng: random.Random, index: int) -> dict:
+    slots = [
+        {"day": d, "moment": m, "duration": rng.choice([45, 60, 90]),
+         "type": rng.choice(["PPS", "PPG", "Libre"]), "isActive": rng.random() < 0.35}
+        for d in DAYS for m in ("Matin", "Soir")
+    ]
+    return {
+        "sport": SPORTS[index % len(SPORTS)],
+        "level": LEVELS[index % len(LEVELS)],
+        "goal": GOALS[index % len(GOALS)],
+        "target_date": "2026-09-01",
+        "injuries": rng.choice([[], ["Entorse cheville droite"], ["Tendinite rotulienne"]]),
+        "availability": slots,
+        "physical_metrics": {"height": 170 + index % 20, "weight": 65 + index % 30},
+        "goals": {"primary": GOALS[index % len(GOALS)]},
+    }
+
+def _noisy(rng: random.Random, profile: dict) -> dict:
+    """Même profil, tel qu'un client le renverrait : sémantique identique, octets différents."""
+    stamp = (datetime(2026, 1, 1) + timedelta(seconds=rng.randrange(10**7))).isoformat()
+    slots = []
+    for slot in profile["availability"]:
+        slot = dict(slot)
+        if not slot["isActive"] and rng.random() < 0.5:
+            slot["type"] = rng.choice(["PPS", "PPG", "Libre"])  # créneau inactif : sans effet
+        slots.append(slot)
+    rng.shuffle(slots)
+    noisy = {
+        **profile,
+        "goal": rng.choice([profile["goal"], f" {profile['goal']} ", profile["goal"].lower()]),
+        "availability": slots,
+        "goals": {**profile["goals"], "updated_at": stamp},
+        "basic_info": {"pseudo": "athlete", "created_at": stamp},
+        "stats": {"xp": rng.randrange(5000)},
+    }
+    items = list(noisy.items())
+    rng.shuffle(items)
+    return dict(items)
+
+def synthesize(requests: int, archetypes: int, seed: int) -> list:
+    rng = random.Random(seed)
+    profiles = [_archetype(rng, i) for i in range(archetypes)]
+    trace = []
+    for _ in range(requests):
+        profile = _noisy(rng, rng.choice(profiles))
+        kind = rng.choices(list(PROMPTS), weights=[1, 1, 2, 6])[0]
+        context = None
+        if kind == "workout":
+            context = {
+                "duration": rng.choice([45, 50, 55, 60, 60, 75, 90]),
+                "energy": rng.randint(1, 10),
+                "focus": rng.choice(FOCUSES),
+                "equipment": rng.choice(EQUIPMENTS),
+            }
+        trace.append({"kind": kind, "profile_data": profile, "context": context})
+    return trace
+
+def load_trace(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def hit_rates(trace: list) -> dict:
+    seen = {"prompt": set(), "semantic": set()}
+    stats = defaultdict(lambda: {"requests": 0, "prompt": 0, "semantic": 0})
+    for entry in trace:
+        kind, profile, context = entry["kind"], entry["profile_data"], entry.get("context")
+        keys = {
+            "prompt": hashlib.sha256(PROMPTS[kind](profile, context).encode("utf-8")).hexdigest(),
+            "semantic": semantic_cache_key(kind, profile, context),
+        }
+        row = stats[kind]
+        row["requests"] += 1
+        for scheme, key in keys.items():
+            scoped = (kind, key)
+            if scoped in seen[scheme]:
+                row[scheme] += 1
+            seen[scheme].add(scoped)
+    return dict(stats)
+
+def main():
+    parser = argparse.ArgumentParser(description="Taux de hit du cache IA : clé prompt vs clé sémantique")
+    parser.add_argument("--trace", help="Trace JSONL (LLM_KEY_TRACE_PATH) ; sinon trafic synthétique")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--archetypes", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthesize(args.requests, args.archetypes, args.seed)
+    source = args.trace or f"synthétique ({args.archetypes} profils types, seed {args.seed})"
+    print(f"🔑 Clés de cache IA — {len(trace)} requêtes, trace {source}\n")
+
+    header = f"{'type':<10}{'requêtes':>10}{'hit prompt':>14}{'hit sémantique':>17}"
+    print(header)
+    print("-" * len(header))
+    totals = {"requests": 0, "prompt": 0, "semantic": 0}
+    for kind, row in sorted(hit_rates(trace).items()):
+        for k in totals:
+            totals[k] += row[k]
+        n = row["requests"]
+        print(f"{kind:<10}{n:>10}{100 * row['prompt'] / n:>13.1f}%{100 * row['semantic'] / n:>16.1f}%")
+    n = totals["requests"] or 1
+    print("-" * len(header))
+    print(f"{'total':<10}{totals['requests']:>10}{100 * totals['prompt'] / n:>13.1f}%{100 * totals['semantic'] / n:>16.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark de l'encodage JSON des réponses (app/core/responses.py) :
+listes de WorkoutSessionResponse (100 / 1000 séances), du chemin historique au chemin direct.
+
+    jsonable_encoder + json     chemin historique de FastAPI : arbre de dict puis json.dumps (JSONResponse)
+    model_dump + json           dict JSON produit par Pydantic puis json.dumps
+    FastJSONResponse            même dict, rendu par orjson (ou json compact sans orjson)
+    model_response              modèles validés sérialisés directement en octets (TypeAdapter.dump_json)
+
+Les quatre sorties sont vérifiées identiques (après json.loads) avant la mesure.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_json_encoding
+    python -m benchmarks.bench_json_encoding --sizes 100 1000 5000 --sets 12 --repeat 30
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+def _sessions(count: int, sets: int) -> list:
+    from app.models import schemas
+
+    start = date.today() - timedelta(days=count)
+    analysis = json.dumps({
+        "performance_analysis": "Volume cohérent avec l'objectif, RPE maîtrisé. " * 4,
+        "recovery_score": 7,
+        "feed_message": "Séance solide, récupère bien !",
+    }, ensure_ascii=False)
+    return [
+        schemas.WorkoutSessionResponse.model_validate({
+            "id": i, "user_id": 1, "date": start + timedelta(days=i), "duration": 60 + i % 30, "rpe": 6 + i % 4,
+            "energy_level": 5 + i % 5, "notes": "Bonnes sensations, charge progressive sur le squat. " * 2,
+            "ai_analysis": analysis, "ai_summary": "Séance solide, récupère bien !", "ai_analysis_ref": "%064x" % i,
+            "sets": [
+                {"id": i * sets + k, "exercise_name": f"Exercice {k % 6}", "set_order": k + 1, "weight": 60 + k * 2.5,
+                 "reps": 8, "rpe": 8, "rest_seconds": 90, "metric_type": "LOAD_REPS"}
+                for k in range(sets)
+            ],
+        })
+        for i in range(count)
+    ]
+
+def _encoders():
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.core.responses import FastJSONResponse, model_response
+    from app.models import schemas
+
+    list_type = List[schemas.WorkoutSessionResponse]
+    adapter = TypeAdapter(list_type)
+    return [
+        ("jsonable_encoder + json", lambda items: JSONResponse(jsonable_encoder(items)).body),
+        ("model_dump + json", lambda items: JSONResponse(adapter.dump_python(items, mode="json")).body),
+        ("FastJSONResponse", lambda items: FastJSONResponse(adapter.dump_python(items, mode="json")).body),
+        ("model_response", lambda items: model_response(list_type, items).body),
+    ]
+
+def _measure(encode, items, repeat: int) -> tuple:
+    encode(items)  # chauffe
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(items)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return len(body), samples[len(samples) // 2], sum(samples) / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark encodage JSON des réponses")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--sets", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.core import responses
+
+    encoders = _encoders()
+    print(f"orjson : {'oui' if responses.orjson is not None else 'non (repli json standard)'}")
+    for size in args.sizes:
+        items = _sessions(size, args.sets)
+        reference = json.loads(encoders[0][1](items))
+        for label, encode in encoders[1:]:
+            assert json.loads(encode(items)) == reference, f"Sortie divergente : {label}"
+
+        print(f"\n{size} séances x {args.sets} séries")
+        header = f"{'encodage':<26}{'octets':>10}{'p50 ms':>10}{'moy ms':>10}{'gain':>8}"
+        print(header)
+        print("-" * len(header))
+        base_p50 = None
+        for label, encode in encoders:
+            size_bytes, p50, mean = _measure(encode, items, args.repeat)
+            base_p50 = base_p50 or p50
+            print(f"{label:<26}{size_bytes:>10}{p50:>10.2f}{mean:>10.2f}{base_p50 / p50:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de charge bout-en-bout, en process, sans appel réseau à Gemini.
+L'app FastAPI est pilotée via httpx (ASGITransport) avec le backend LLM fake,
+sur une base SQLite jetable. Rapporte p50/p95/p99 et le débit par scénario.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_load --users 20 --rounds 5 --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+SCENARIOS = ("signup", "login", "workout_log", "feed_poll", "coach_week", "coach_workout")
+
+PROFILE = {
+    "sport": "Rugby",
+    "level": "Intermédiaire",
+    "goal": "Puissance",
+    "availability": [
+        {"day": d, "moment": "Soir", "duration": 60, "type": "PPG", "isActive": True}
+        for d in ("Lundi", "Mercredi", "Vendredi")
+    ],
+}
+
+WORKOUT = {
+    "date": date.today().isoformat(),
+    "duration": 60,
+    "rpe": 7,
+    "energy_level": 6,
+    "sets": [
+        {"exercise_name": "Squat", "set_order": i, "weight": 100, "reps": 5, "rpe": 8, "metric_type": "LOAD_REPS"}
+        for i in range(1, 6)
+    ],
+}
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, name: str, coro, expected=(200, 201)):
+        start = time.perf_counter()
+        response = await coro
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        if response.status_code not in expected:
+            self.errors[name] += 1
+        return response
+
+async def _athlete(client, rec: Recorder, idx: int, rounds: int):
+    username = f"bench_{idx}_{int(time.time() * 1000)}"
+    await rec.timed("signup", client.post("/auth/signup", json={"username": username, "password": "Bench123!"}))
+    r = await rec.timed("login", client.post("/auth/token", data={"username": username, "password": "Bench123!"}))
+    if r.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    for _ in range(rounds):
+        await rec.timed("coach_week", client.post("/coach/week", json={"profile_data": PROFILE}, headers=headers))
+        await rec.timed("coach_workout", client.post(
+            "/coach/workout",
+            json={"profile_data": PROFILE, "context": {"duration": 60, "energy": 5, "focus": "Full Body"}},
+            headers=headers,
+        ))
+        await rec.timed("workout_log", client.post("/workouts/", json=WORKOUT, headers=headers))
+        await rec.timed("feed_poll", client.get("/feed/", headers=headers))
+
+async def run(users: int, rounds: int) -> None:
+    import httpx
+    from app.main import app
+    from app.services.llm.backend import get_llm_backend
+
+    rec = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport ne déclenche pas le lifespan (création du schéma) : on l'ouvre nous-mêmes
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(_athlete(client, rec, i, rounds) for i in range(users)))
+            wall = time.perf_counter() - start
+
+    llm = get_llm_backend()
+    total = sum(len(v) for v in rec.latencies.values())
+    print(f"\n🏋️  {users} athlètes x {rounds} tours — backend LLM : {llm.name} ({getattr(llm, 'calls', '?')} appels)")
+    header = f"{'scénario':<15}{'n':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name in SCENARIOS:
+        samples = rec.latencies.get(name, [])
+        if not samples:
+            continue
+        print(
+            f"{name:<15}{len(samples):>6}{rec.errors[name]:>6}"
+            f"{_percentile(samples, 50):>10.1f}{_percentile(samples, 95):>10.1f}{_percentile(samples, 99):>10.1f}"
+            f"{len(samples) / wall:>10.1f}"
+        )
+    print(f"\n⏱️  Total : {total} requêtes en {wall:.2f}s → {total / wall:.1f} req/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge TitanFlow (LLM fake, en process)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--latency-sigma", type=float, default=0.35)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Configuration AVANT l'import de l'app (moteur SQL et backend LLM lus à l'import)
+    db_path = os.path.join(tempfile.mkdtemp(prefix="titan_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["LLM_BACKEND"] = "fake"
+    # Pas de cache disque persistant : chaque run part d'un cache froid
+    os.environ.setdefault("AI_CACHE_BACKEND", "memory")
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_LATENCY_SIGMA"] = str(args.latency_sigma)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+
+    asyncio.run(run(args.users, args.rounds))
+
+if __name__ == "__main__":
+    main()
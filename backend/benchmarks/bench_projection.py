@@ -0,0 +1,145 @@
+"""
+Benchmark de la projection des réponses (?fields= / ?include=, app/core/projection.py) :
+taille de la réponse et temps serveur de GET /workouts/ et GET /api/v1/profiles/me,
+réponse complète (historique) contre réponses projetées des écrans mobiles.
+
+App pilotée en process via httpx (ASGITransport) sur une base SQLite jetable,
+historique inséré directement en base (séances, séries, analyses IA en artefacts).
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_projection
+    python -m benchmarks.bench_projection --sessions 500 --sets 12 --limit 100 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+WORKOUT_QUERIES = [
+    ("complète (historique)", ""),
+    ("liste mobile", "fields=id,date,duration,rpe"),
+    ("liste + résumé IA", "fields=id,date,rpe,ai_summary"),
+    ("liste + séries", "fields=id,date&include=sets"),
+]
+PROFILE_QUERIES = [
+    ("complète (historique)", ""),
+    ("une section", "fields=basic_info"),
+    ("deux sections", "fields=sport_context,goals"),
+]
+
+def _seed(username: str, sessions: int, sets: int) -> None:
+    from sqlalchemy import insert
+    from app.core.database import SessionLocal
+    from app.models import sql_models
+    from app.services.artifacts.store import attach_workout_analysis
+
+    db = SessionLocal()
+    user = db.query(sql_models.User).filter(sql_models.User.username == username).one()
+    db.add(sql_models.AthleteProfile(
+        user_id=user.id,
+        basic_info={"pseudo": username, "training_age": 6, "biological_sex": "FEMALE"},
+        physical_metrics={"height": 172, "weight": 64, "resting_hr": 52},
+        sport_context={"sport": "Rugby", "position": "Ailier", "level": "ADVANCED", "equipment": ["COMMERCIAL_GYM"]},
+        training_preferences={"days_available": ["Lundi", "Mercredi", "Vendredi"], "duration_min": 75},
+        goals={"primary": "Puissance", "target_date": "2027-03-01", "notes": "Saison de sélection " * 20},
+        constraints={"schedule": "Travail posté " * 10},
+        injury_prevention={"history": ["Entorse cheville droite", "Tendinite rotulienne"], "notes": "RAS " * 30},
+        performance_baseline={"squat_1rm": 110, "bench_1rm": 70, "deadlift_1rm": 140, "run_vma_est": "16.5"},
+    ))
+    start = date.today() - timedelta(days=sessions)
+    for i in range(sessions):
+        workout = sql_models.WorkoutSession(
+            user_id=user.id, date=start + timedelta(days=i), duration=60 + i % 30, rpe=6 + i % 4,
+            energy_level=5 + i % 5, notes="Bonnes sensations, charge progressive sur le squat. " * 3,
+        )
+        db.add(workout)
+        db.flush()
+        analysis = json.dumps({
+            "performance_analysis": f"Séance {i} : volume cohérent avec l'objectif, RPE maîtrisé. " * 4,
+            "nutrition_comment": "Apport protéique à viser dans les 2 heures. " * 3,
+            "recovery_score": 7,
+            "coach_questions": ["Sommeil de la nuit dernière ?", "Douleurs à la cheville ?"],
+            "feed_message": "Séance solide, récupère bien !",
+            "bio_metrics": {"kcal_total": 540 + i, "protein_g": 38, "carbs_g": 95, "water_ml": 900},
+        }, ensure_ascii=False)
+        attach_workout_analysis(db, workout, analysis)
+        db.execute(insert(sql_models.WorkoutSet), [
+            {"session_id": workout.id, "exercise_name": f"Exercice {k % 6}", "set_order": k + 1,
+             "weight": 60 + k * 2.5, "reps": 8, "rpe": 8, "rest_seconds": 90, "metric_type": "LOAD_REPS"}
+            for k in range(sets)
+        ])
+    db.commit()
+    db.close()
+
+async def _measure(client, headers, path: str, repeat: int) -> tuple:
+    await client.get(path, headers=headers)  # chauffe
+    samples: List[float] = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text[:200]
+        size = len(response.content)
+    samples.sort()
+    return size, samples[len(samples) // 2], sum(samples) / len(samples)
+
+def _report(title: str, rows: list) -> None:
+    print(f"\n{title}")
+    header = f"{'réponse':<24}{'octets':>10}{'ratio':>8}{'p50 ms':>10}{'moy ms':>10}{'gain':>8}"
+    print(header)
+    print("-" * len(header))
+    base_size, base_p50 = rows[0][1], rows[0][2]
+    for label, size, p50, mean in rows:
+        print(f"{label:<24}{size:>10}{size / base_size:>8.2f}{p50:>10.2f}{mean:>10.2f}{base_p50 / p50:>7.1f}x")
+
+async def run(args) -> None:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await client.post("/auth/signup", json={"username": "bench", "password": "Bench123!"})
+            r = await client.post("/auth/token", data={"username": "bench", "password": "Bench123!"})
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            _seed("bench", args.sessions, args.sets)
+
+            rows = []
+            for label, query in WORKOUT_QUERIES:
+                path = f"/workouts/?limit={args.limit}" + (f"&{query}" if query else "")
+                rows.append((label, *await _measure(client, headers, path, args.repeat)))
+            _report(f"GET /workouts/ — {args.limit} séances x {args.sets} séries", rows)
+
+            rows = []
+            for label, query in PROFILE_QUERIES:
+                path = "/api/v1/profiles/me" + (f"?{query}" if query else "")
+                rows.append((label, *await _measure(client, headers, path, args.repeat)))
+            _report("GET /api/v1/profiles/me", rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark projection ?fields= / ?include=")
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--sets", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # Configuration AVANT l'import de l'app (moteur SQL lu à l'import)
+    db_path = os.path.join(tempfile.mkdtemp(prefix="titan_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("AI_CACHE_BACKEND", "memory")
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
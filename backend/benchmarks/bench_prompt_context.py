@@ -0,0 +1,99 @@
+"""
+Benchmark des prompts IA : taille (caractères / tokens estimés) et temps de construction,
+AVANT (json.dumps indenté du profil brut) et APRÈS (PromptContextBuilder compact + budget).
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_prompt_context
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routers.coach import (
+    get_profile_analysis_prompt_v2,
+    get_periodization_prompt,
+    get_weekly_planning_prompt,
+    get_workout_generation_prompt,
+)
+from app.services.llm.context import PromptContextBuilder, estimate_tokens
+
+ITERATIONS = 2000
+
+# Format historique : profil complet, indenté, sans projection ni budget
+LEGACY = PromptContextBuilder(compact=False, max_tokens=None)
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+
+SAMPLE_PROFILE = {
+    "sport": "Rugby",
+    "level": "Intermédiaire",
+    "goal": "Gagner en puissance avant la reprise",
+    "target_date": "2026-09-01",
+    "weight": 92,
+    "gender": "Homme",
+    "injuries": ["Entorse cheville droite (2024)", "Tendinite rotulienne gauche"],
+    "availability": [
+        {"day": d, "moment": m, "duration": 60, "type": "PPG" if i % 2 else "PPS", "isActive": i % 3 != 0}
+        for i, (d, m) in enumerate((d, m) for d in DAYS for m in ("Matin", "Soir"))
+    ],
+    "basic_info": {
+        "pseudo": "titan_92", "email": "titan@example.com", "birth_date": "1998-04-12",
+        "training_age": 6, "biological_sex": "MALE", "created_at": "2025-01-03T10:12:44.120391",
+    },
+    "physical_metrics": {"height": 184, "weight": 92, "body_fat": 14.5, "resting_hr": 54, "sleep_quality_avg": 6},
+    "sport_context": {"sport": "Rugby", "position": "Troisième ligne", "level": "INTERMEDIATE",
+                      "equipment": ["COMMERCIAL_GYM", "KETTLEBELLS", "BANDS"]},
+    "performance_baseline": {
+        "squat_1rm": 160, "bench_1rm": 115, "deadlift_1rm": 190, "running_vma": 16.2,
+        "raw_mobile_data": {
+            "run_short_dist": 1200, "run_short_min": 4, "run_short_sec": 12,
+            "run_long_dist": 3000, "run_long_min": 11, "run_long_sec": 40,
+            "squat_1rm": "160", "bench_1rm": "115", "deadlift_1rm": "190",
+            "run_vma_est": "16.2 km/h", "notes": "Tests réalisés en pré-saison sur piste de 400m " * 8,
+        },
+    },
+    "injury_prevention": {"history": ["Cheville droite", "Genou gauche"], "notes": ""},
+    "training_preferences": {"days_available": DAYS[:5], "duration_min": 75, "preferred_split": "Upper/Lower"},
+    "goals": {"primary": "Puissance", "secondary": "Vitesse", "updated_at": "2025-02-01T08:00:00"},
+    "constraints": {"travel": "Déplacements le mardi", "equipment": None},
+    "onboarding_completed": True,
+    "stats": {"level": 4, "xp": 1220},
+}
+
+WORKOUT_CONTEXT = {"duration": 60, "energy": 5, "focus": "Full Body", "equipment": "Standard"}
+
+BUILDERS = {
+    "audit": lambda p, b=None: get_profile_analysis_prompt_v2(p, b),
+    "periodization": lambda p, b=None: get_periodization_prompt(p, b),
+    "weekly": lambda p, b=None: get_weekly_planning_prompt(p, b),
+    "workout": lambda p, b=None: get_workout_generation_prompt(p, WORKOUT_CONTEXT, b),
+}
+
+def _measure(build, builder):
+    prompt = build(SAMPLE_PROFILE, builder)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        build(SAMPLE_PROFILE, builder)
+    elapsed_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+    return len(prompt), estimate_tokens(prompt), elapsed_us
+
+def main():
+    print(f"📏 Benchmark prompts ({ITERATIONS} itérations / builder)\n")
+    header = f"{'prompt':<14}{'avant (car/tok/µs)':>26}{'après (car/tok/µs)':>26}{'gain tokens':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, build in BUILDERS.items():
+        before = _measure(build, LEGACY)
+        after = _measure(build, None)
+        gain = 100 * (1 - after[1] / before[1]) if before[1] else 0
+        print(
+            f"{name:<14}"
+            f"{before[0]:>10}/{before[1]:>6}/{before[2]:>7.1f}"
+            f"{after[0]:>10}/{after[1]:>6}/{after[2]:>7.1f}"
+            f"{gain:>13.1f}%"
+        )
+
+if __name__ == "__main__":
+    main()
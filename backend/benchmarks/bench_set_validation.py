@@ -0,0 +1,130 @@
+"""
+Micro-benchmark de la validation physiologique des séances (app/domain/set_validation.py) :
+import de 10 000 séries (lot de séances hors ligne), ancienne validation vs table compilée.
+
+    legacy          ancienne closure de create_workout, séance par séance, puis seconde boucle sur les séries
+                    (arrêt à la première violation : mesurée ici sur un lot valide, son meilleur cas)
+    compiled        validate_sessions : règles par metric_type compilées, toutes les séries en une passe numpy,
+                    toutes les violations rapportées
+
+Avant la mesure, les deux chemins sont comparés sur des lots aléatoires (valides ou non) :
+ils doivent accepter et refuser les mêmes séances.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_set_validation
+    python -m benchmarks.bench_set_validation --sets 10000 --per-session 20 --repeat 30
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+METRICS = ("LOAD_REPS", "POWER_TIME", "PACE_DISTANCE", "ISOMETRIC_TIME", "BODYWEIGHT_REPS")
+
+def _sessions(total_sets: int, per_session: int, rng: random.Random, invalid_rate: float = 0.0) -> list:
+    from app.models import schemas
+
+    def value(valid, bad):
+        return bad if rng.random() < invalid_rate else valid
+
+    sessions = []
+    for i in range(max(1, total_sets // per_session)):
+        sets = []
+        for k in range(per_session):
+            metric = METRICS[k % len(METRICS)]
+            weight = {"LOAD_REPS": value(100, 650), "POWER_TIME": value(300, 2400)}.get(metric, 10)
+            reps = value(5000, 150000) if metric == "PACE_DISTANCE" else 8
+            sets.append(schemas.WorkoutSetCreate(
+                exercise_name=f"Exercice {k}", set_order=k + 1, weight=weight, reps=reps,
+                rpe=value(rng.choice([0, 7, 8, None]), 12), rest_seconds=90, metric_type=metric,
+            ))
+        sessions.append(schemas.WorkoutUpload(
+            idempotency_key=f"k{i}", date=date(2026, 10, 1), duration=value(60, 300), rpe=value(7, 0),
+            energy_level=value(6, 11), sets=sets,
+        ))
+    return sessions
+
+def legacy_validate(workout) -> bool:
+    """Copie de l'ancienne validation de create_workout (False au lieu de HTTP 400)."""
+    if workout.duration < 10 or workout.duration > 240:
+        return False
+    if workout.rpe < 1 or workout.rpe > 10:
+        return False
+    if workout.energy_level < 1 or workout.energy_level > 10:
+        return False
+    for s in workout.sets:
+        if s.metric_type == 'POWER_TIME' and s.weight > 2000:
+            return False
+        if s.metric_type == 'LOAD_REPS' and s.weight > 500:
+            return False
+        if s.rpe and (s.rpe < 1 or s.rpe > 10):
+            return False
+    for s in workout.sets:
+        if s.rpe is not None and (s.rpe < 0 or s.rpe > 10):
+            s.rpe = max(0, min(10, s.rpe))
+        if s.metric_type == 'POWER_TIME':
+            if s.weight > 2000:
+                return False
+        elif s.metric_type == 'PACE_DISTANCE':
+            if s.reps > 100000:
+                return False
+    return True
+
+def _check_equivalence(rounds: int = 200) -> None:
+    from app.domain.set_validation import validate_sessions
+
+    rng = random.Random(7)
+    for _ in range(rounds):
+        sessions = _sessions(40, 8, rng, invalid_rate=0.03)
+        refused = {v.session for v in validate_sessions(sessions)}
+        for index, session in enumerate(sessions):
+            assert legacy_validate(session) == (index not in refused), f"Divergence sur la séance {index}"
+
+def _measure(validate, sessions, repeat: int) -> tuple:
+    validate(sessions)  # chauffe (compilation des tables, import numpy)
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validate(sessions)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], sum(samples) / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark validation physiologique des séries")
+    parser.add_argument("--sets", type=int, default=10000)
+    parser.add_argument("--per-session", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.domain.set_validation import validate_sessions
+
+    _check_equivalence()
+    print("Équivalence legacy / compiled vérifiée (200 lots aléatoires).")
+
+    rng = random.Random(42)
+    sessions = _sessions(args.sets, args.per_session, rng)
+    invalid = _sessions(args.sets, args.per_session, rng, invalid_rate=0.01)
+    candidates = [
+        ("legacy (lot valide)", lambda items: all(legacy_validate(s) for s in items), sessions),
+        ("compiled (lot valide)", validate_sessions, sessions),
+        ("compiled (1% invalides)", validate_sessions, invalid),
+    ]
+
+    print(f"\n{len(sessions)} séances x {args.per_session} séries = {len(sessions) * args.per_session} séries")
+    print(f"violations (1% invalides) : {len(validate_sessions(invalid))}")
+    header = f"{'validation':<28}{'p50 ms':>10}{'moy ms':>10}{'µs/série':>10}"
+    print(header)
+    print("-" * len(header))
+    for label, validate, items in candidates:
+        p50, mean = _measure(validate, items, args.repeat)
+        print(f"{label:<28}{p50:>10.2f}{mean:>10.2f}{p50 * 1000 / (len(items) * args.per_session):>10.2f}")
+
+if __name__ == "__main__":
+    main()
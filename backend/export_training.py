@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+EXPORT COLONNAIRE DE L'HISTORIQUE D'ENTRAÎNEMENT
+Une ligne par série (séance et exercice joints), en Parquet ou Arrow IPC, lue par lots :
+la mémoire reste bornée quel que soit le volume (voir app/services/exports/training.py).
+
+Usage (depuis backend/) :
+    python export_training.py training.parquet
+    python export_training.py training.arrows --format arrow --start 2026-01-01 --end 2026-06-30 --user 3 --user 7
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ajouter le backend au path
+sys.path.append(str(Path(__file__).parent))
+
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export colonnaire (Parquet / Arrow) des séances et séries")
+    parser.add_argument("output", help="fichier de sortie")
+    parser.add_argument("--format", choices=["parquet", "arrow"], help="défaut : déduit de l'extension, sinon parquet")
+    parser.add_argument("--start", type=date.fromisoformat, help="première date de séance incluse (AAAA-MM-JJ)")
+    parser.add_argument("--end", type=date.fromisoformat, help="dernière date de séance incluse (AAAA-MM-JJ)")
+    parser.add_argument("--user", type=int, action="append", dest="user_ids", help="utilisateur (répétable)")
+    parser.add_argument("--chunk-rows", type=int, help="séries par lot (défaut EXPORT_CHUNK_ROWS)")
+    args = parser.parse_args()
+
+    from app.core.database import engine
+    from app.services.exports.training import ExportStats, ExportUnavailable, stream_export
+
+    fmt = args.format or ("arrow" if Path(args.output).suffix in (".arrow", ".arrows") else "parquet")
+    print(f"📦 Export {fmt} -> {args.output}")
+    start = time.perf_counter()
+    stats = ExportStats()
+    try:
+        with open(args.output, "wb") as output:
+            for chunk in stream_export(engine, fmt, args.start, args.end, args.user_ids, args.chunk_rows, stats):
+                output.write(chunk)
+    except ExportUnavailable as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {stats.rows} série(s) en {stats.batches} lot(s), "
+          f"{stats.bytes / 1e6:.1f} Mo en {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
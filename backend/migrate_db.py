@@ -86,6 +86,218 @@ def run_migration():
             else:
                 print("   ✅ Table 'feed_items' déjà présente.")
 
+            # --- ÉTAPE 4 : VERSION DE LIGNE SUR USERS (VERROU OPTIMISTE) ---
+            print("\n4️⃣  Vérification de 'users.version'...")
+            if 'users' in existing_tables:
+                columns = [col['name'] for col in inspector.get_columns('users')]
+                if 'version' not in columns:
+                    print("   ➕ Ajout de la colonne 'version'...")
+                    conn.execute(text("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+                    print("   ✅ Colonne ajoutée avec succès.")
+                else:
+                    print("   ✅ Colonne 'version' déjà présente.")
+
+            # --- ÉTAPE 5 : PLANS DÉPLACÉS VERS USER_PLANS (TABLE ÉTROITE VERSIONNÉE) ---
+            print("\n5️⃣  Migration des plans vers 'user_plans'...")
+            from app.models.sql_models import UserPlan
+            UserPlan.__table__.create(conn, checkfirst=True)
+            if 'users' in existing_tables:
+                columns = [col['name'] for col in inspector.get_columns('users')]
+                legacy = {'strategy_data': 'STRATEGY', 'weekly_plan_data': 'WEEK', 'draft_workout_data': 'DRAFT_WORKOUT'}
+                for column, kind in legacy.items():
+                    if column not in columns:
+                        continue
+                    # INSERT ... SELECT : copie côté base, idempotente (plans déjà migrés ignorés)
+                    copied = conn.execute(text(f"""
+                        INSERT INTO user_plans (user_id, kind, data, version, updated_at)
+                        SELECT id, :kind, {column}, 1, CURRENT_TIMESTAMP FROM users
+                        WHERE {column} IS NOT NULL AND {column} <> ''
+                          AND NOT EXISTS (
+                              SELECT 1 FROM user_plans p WHERE p.user_id = users.id AND p.kind = :kind
+                          )
+                    """), {"kind": kind}).rowcount
+                    print(f"   ✅ {column} -> user_plans[{kind}] : {copied} plan(s) copié(s).")
+
+            # --- ÉTAPE 6 : ARTEFACTS IA COMPRESSÉS (ANALYSES, PLANS) ---
+            print("\n6️⃣  Migration des sorties IA vers 'ai_artifacts'...")
+            from app.models.sql_models import AIArtifact
+            from app.services.artifacts.store import put_artifact, summarize
+            AIArtifact.__table__.create(conn, checkfirst=True)
+            live = inspect(conn)  # voit les tables créées dans cette transaction
+            new_columns = {
+                'workout_sessions': [('ai_analysis_ref', 'VARCHAR(64)'), ('ai_summary', 'VARCHAR')],
+                'user_plans': [('digest', 'VARCHAR(64)')],
+            }
+            for table, wanted in new_columns.items():
+                if table not in live.get_table_names():
+                    continue
+                columns = [col['name'] for col in live.get_columns(table)]
+                for column, col_type in wanted:
+                    if column not in columns:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
+                        print(f"   ➕ {table}.{column} ajoutée.")
+
+            # Par lots (pas de chargement de toute la table) ; le texte déplacé libère la colonne legacy
+            BATCH = 500
+            moves = [
+                ("workout_sessions", "ai_analysis", "ai_analysis_ref", True),
+                ("user_plans", "data", "digest", False),
+            ]
+            for table, source, target, with_summary in moves:
+                if table not in live.get_table_names():
+                    continue
+                moved, last_id = 0, 0
+                while True:
+                    rows = conn.execute(text(
+                        f"SELECT id, {source} FROM {table} "
+                        f"WHERE id > :last AND {source} IS NOT NULL AND {target} IS NULL ORDER BY id LIMIT {BATCH}"
+                    ), {"last": last_id}).fetchall()
+                    if not rows:
+                        break
+                    for row_id, content in rows:
+                        values = {"id": row_id, "digest": put_artifact(conn, content)}
+                        summary_sql = ""
+                        if with_summary:
+                            values["summary"] = summarize(content)
+                            summary_sql = ", ai_summary = :summary"
+                        conn.execute(text(
+                            f"UPDATE {table} SET {target} = :digest{summary_sql}, {source} = NULL WHERE id = :id"
+                        ), values)
+                    moved += len(rows)
+                    last_id = rows[-1][0]
+                print(f"   ✅ {table}.{source} -> ai_artifacts : {moved} ligne(s) déplacée(s).")
+
+            # --- ÉTAPE 7 : JOURNAL DE SYNCHRONISATION (GET /sync) ---
+            print("\n7️⃣  Journal de synchronisation 'sync_changes' / 'user_sync_state'...")
+            from app.models.sql_models import SyncChange, UserSyncState
+            from app.services.sync.changes import PROFILE_SECTIONS
+            live = inspect(conn)
+            if 'users' in live.get_table_names():
+                SyncChange.__table__.create(conn, checkfirst=True)
+                UserSyncState.__table__.create(conn, checkfirst=True)
+                # Séquence sortie de la ligne users (ancienne colonne users.sync_seq, plus lue ni écrite)
+                if 'sync_seq' in [col['name'] for col in live.get_columns('users')]:
+                    moved = conn.execute(text(
+                        "INSERT INTO user_sync_state (user_id, seq) SELECT id, sync_seq FROM users u "
+                        "WHERE sync_seq > 0 AND NOT EXISTS (SELECT 1 FROM user_sync_state s WHERE s.user_id = u.id)"
+                    )).rowcount
+                    print(f"   ✅ users.sync_seq -> user_sync_state : {moved} séquence(s) reprise(s).")
+
+                # Données existantes journalisées une fois (utilisateurs sans journal) : le premier
+                # GET /sync?since=0 renvoie tout l'état, les suivants seulement les changements
+                tables = set(live.get_table_names())
+                sources = [
+                    ("WORKOUT", "SELECT id FROM workout_sessions WHERE user_id = :uid", "workout_sessions"),
+                    ("SET", "SELECT s.id FROM workout_sets s JOIN workout_sessions w ON w.id = s.session_id "
+                            "WHERE w.user_id = :uid", "workout_sets"),
+                    ("FEED_ITEM", "SELECT id FROM feed_items WHERE user_id = :uid", "feed_items"),
+                    ("ENGRAM", "SELECT e.id FROM coach_engrams e JOIN coach_memories m ON m.id = e.memory_id "
+                               "JOIN athlete_profiles p ON p.id = m.athlete_profile_id WHERE p.user_id = :uid", "coach_engrams"),
+                    ("PLAN", "SELECT kind FROM user_plans WHERE user_id = :uid AND (digest IS NOT NULL OR data IS NOT NULL)", "user_plans"),
+                ]
+                user_ids = [row[0] for row in conn.execute(text(
+                    "SELECT id FROM users u WHERE NOT EXISTS (SELECT 1 FROM sync_changes c WHERE c.user_id = u.id)"
+                ))]
+                journaled = 0
+                for user_id in user_ids:
+                    entries = []
+                    for entity, query, table in sources:
+                        if table in tables:
+                            entries += [(entity, str(row[0])) for row in conn.execute(text(query), {"uid": user_id})]
+                    if 'athlete_profiles' in tables and conn.execute(
+                        text("SELECT 1 FROM athlete_profiles WHERE user_id = :uid"), {"uid": user_id}
+                    ).first():
+                        entries += [("PROFILE_SECTION", name) for name in PROFILE_SECTIONS]
+                    if not entries:
+                        continue
+                    conn.execute(SyncChange.__table__.insert(), [
+                        {"user_id": user_id, "entity": entity, "entity_id": entity_id, "seq": seq, "deleted": False}
+                        for seq, (entity, entity_id) in enumerate(entries, start=1)
+                    ])
+                    conn.execute(UserSyncState.__table__.insert(), [{"user_id": user_id, "seq": len(entries)}])
+                    journaled += len(entries)
+                print(f"   ✅ {journaled} entité(s) existante(s) journalisée(s) pour {len(user_ids)} utilisateur(s).")
+
+            # --- ÉTAPE 8 : CLÉS D'IDEMPOTENCE DES SÉANCES (POST /workouts/batch) ---
+            print("\n8️⃣  Clés d'idempotence de 'workout_sessions'...")
+            live = inspect(conn)
+            if 'workout_sessions' in live.get_table_names():
+                if 'idempotency_key' not in [col['name'] for col in live.get_columns('workout_sessions')]:
+                    conn.execute(text("ALTER TABLE workout_sessions ADD COLUMN idempotency_key VARCHAR(64)"))
+                    print("   ➕ workout_sessions.idempotency_key ajoutée.")
+                # Les séances existantes (clé NULL) ne se gênent pas : NULL est distinct dans un index unique
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ix_workout_sessions_idempotency "
+                    "ON workout_sessions (user_id, idempotency_key)"
+                ))
+                print("   ✅ Index unique (user_id, idempotency_key) en place.")
+
+            # --- ÉTAPE 9 : CATALOGUE D'EXERCICES (exercise_id SUR LES SÉRIES) ---
+            print("\n9️⃣  Catalogue 'exercises' et rattachement des séries...")
+            from app.models.sql_models import Exercise, ExerciseAlias
+            from app.services.exercises.catalog import catalog, seed_catalog
+            Exercise.__table__.create(conn, checkfirst=True)
+            ExerciseAlias.__table__.create(conn, checkfirst=True)
+            print(f"   ✅ Catalogue initial : {seed_catalog(conn)} alias.")
+            live = inspect(conn)
+            if 'workout_sets' in live.get_table_names():
+                if 'exercise_id' not in [col['name'] for col in live.get_columns('workout_sets')]:
+                    conn.execute(text("ALTER TABLE workout_sets ADD COLUMN exercise_id INTEGER REFERENCES exercises(id)"))
+                    print("   ➕ workout_sets.exercise_id ajoutée.")
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_workout_sets_exercise_session ON workout_sets (exercise_id, session_id)"
+                ))
+
+                # Rattrapage en flux (lots par clé, jamais toute la table en mémoire) ; reprenable si interrompu
+                BATCH = 1000
+                linked, last_id = 0, 0
+                while True:
+                    rows = conn.execute(text(
+                        "SELECT id, exercise_name, metric_type FROM workout_sets "
+                        f"WHERE id > :last AND exercise_id IS NULL ORDER BY id LIMIT {BATCH}"
+                    ), {"last": last_id}).fetchall()
+                    if not rows:
+                        break
+                    metric_types = {row[1]: row[2] for row in rows}
+                    ids = catalog.resolve(conn, metric_types, metric_types)
+                    updates = [{"id": row[0], "eid": ids[row[1]]} for row in rows if ids.get(row[1]) is not None]
+                    if updates:
+                        conn.execute(text("UPDATE workout_sets SET exercise_id = :eid WHERE id = :id"), updates)
+                    linked += len(updates)
+                    last_id = rows[-1][0]
+                print(f"   ✅ {linked} série(s) rattachée(s) à un exercice.")
+
+            # --- ÉTAPE 10 : AGRÉGATS D'ENTRAÎNEMENT (GET /aggregates) ---
+            print("\n🔟 Agrégats journaliers et hebdomadaires...")
+            from app.models.sql_models import DailyRollup, WeeklyRollup
+            from app.services.rollups.training import rebuild_user, users_with_workouts
+            live = inspect(conn)
+            missing = 'training_rollups_daily' not in live.get_table_names()
+            DailyRollup.__table__.create(conn, checkfirst=True)
+            WeeklyRollup.__table__.create(conn, checkfirst=True)
+            if missing and 'workout_sessions' in live.get_table_names():
+                # Historique existant agrégé une fois, utilisateur par utilisateur ; ensuite tenu à jour au commit
+                user_ids = users_with_workouts(conn)
+                rows = sum(rebuild_user(conn, user_id) for user_id in user_ids)
+                print(f"   ✅ {rows} ligne(s) journalière(s) pour {len(user_ids)} utilisateur(s).")
+            else:
+                print("   ✅ Tables d'agrégats en place.")
+
+            # --- ÉTAPE 11 : BATTEMENT DES JOBS DE SQUAD (jobs orphelins) ---
+            print("\n1️⃣1️⃣ Battement des jobs de squad...")
+            live = inspect(conn)
+            if 'squad_plan_jobs' in live.get_table_names():
+                if 'updated_at' not in [col['name'] for col in live.get_columns('squad_plan_jobs')]:
+                    # SQLite refuse un défaut non constant en ALTER TABLE : colonne nue puis rattrapage
+                    col_type = "TIMESTAMP WITH TIME ZONE" if "postgresql" in str(engine.url) else "DATETIME"
+                    conn.execute(text(f"ALTER TABLE squad_plan_jobs ADD COLUMN updated_at {col_type}"))
+                    conn.execute(text(
+                        "UPDATE squad_plan_jobs SET updated_at = COALESCE(finished_at, created_at, CURRENT_TIMESTAMP)"
+                    ))
+                    print("   ➕ squad_plan_jobs.updated_at ajoutée.")
+                else:
+                    print("   ✅ Colonne 'updated_at' déjà présente.")
+
             trans.commit()
             print("\n🎉 MIGRATION TERMINÉE AVEC SUCCÈS !")
             print("   Votre base est prête pour le profil JSON sans perte de données.")
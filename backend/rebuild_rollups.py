@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+RECONSTRUCTION DES AGRÉGATS D'ENTRAÎNEMENT (training_rollups_daily / training_rollups_weekly)
+À lancer après un import hors API ou un changement des règles d'agrégation
+(voir app/services/rollups/training.py). Une transaction par utilisateur : reprenable, jamais toute la base en mémoire.
+
+Usage (depuis backend/) :
+    python rebuild_rollups.py
+    python rebuild_rollups.py --user 3 --user 7
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ajouter le backend au path
+sys.path.append(str(Path(__file__).parent))
+
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruction des agrégats journaliers et hebdomadaires")
+    parser.add_argument("--user", type=int, action="append", dest="user_ids", help="utilisateur (répétable)")
+    args = parser.parse_args()
+
+    from app.core.database import engine
+    from app.models.sql_models import DailyRollup, WeeklyRollup
+    from app.services.rollups.training import rebuild_user, users_with_workouts
+
+    DailyRollup.__table__.create(engine, checkfirst=True)
+    WeeklyRollup.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        user_ids = users_with_workouts(conn, args.user_ids)
+    print(f"🔄 Reconstruction des agrégats : {len(user_ids)} utilisateur(s)...")
+    start = time.perf_counter()
+    rows = 0
+    for user_id in user_ids:
+        with engine.begin() as conn:
+            rows += rebuild_user(conn, user_id)
+    print(f"✅ {rows} ligne(s) journalière(s) en {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Base, LLM et cache propres aux tests : fixés avant tout import de l'application
+_TMP_DIR = tempfile.mkdtemp(prefix="titanflow-tests-")
+atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+os.environ["AI_CACHE_BACKEND"] = "memory"
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def signup(client):
+    """Crée un utilisateur et retourne ses en-têtes d'authentification."""
+    def _signup(username: str) -> dict:
+        response = client.post("/auth/signup", json={"username": username, "password": "secret"})
+        assert response.status_code == 201, response.text
+        token = client.post("/auth/token", data={"username": username, "password": "secret"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return _signup
@@ -0,0 +1,36 @@
+"""Artefacts IA (app/services/artifacts/store.py) : purge des orphelins après la période de grâce."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app.core.database import Base, SessionLocal, engine
+from app.models.sql_models import AIArtifact
+from app.services.artifacts.store import get_artifact, prune_orphans, put_artifact, put_artifacts
+
+def _age(db, digest: str, hours: float) -> None:
+    db.execute(update(AIArtifact).where(AIArtifact.digest == digest)
+               .values(created_at=datetime.utcnow() - timedelta(hours=hours)))
+
+def test_prune_spares_recent_and_rewritten_orphans():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        recent = put_artifact(db, '{"orphan": "recent"}')
+        old = put_artifact(db, '{"orphan": "old"}')
+        reused = put_artifact(db, '{"orphan": "reused"}')
+        db.commit()
+        _age(db, old, 48)
+        _age(db, reused, 48)
+        db.commit()
+
+        # Orphelin ancien réécrit (même contenu) : son âge repart de zéro
+        writer = SessionLocal()
+        assert put_artifacts(writer, ['{"orphan": "reused"}']) == [reused]
+        writer.commit()
+        writer.close()
+
+        assert prune_orphans(db) == 1
+        db.commit()
+        assert get_artifact(db, old) is None
+        assert get_artifact(db, recent) is not None and get_artifact(db, reused) is not None
+        assert db.execute(select(AIArtifact.created_at).where(AIArtifact.digest == reused)).scalar() \
+            > datetime.utcnow() - timedelta(hours=1)
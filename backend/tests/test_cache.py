@@ -0,0 +1,41 @@
+"""Cache IA à deux niveaux (app/core/cache.py) : emplacement explicite, lectures disque hors de la boucle."""
+import asyncio
+import threading
+
+from app.core import cache
+from app.core.cache import IntelligentCache, SQLiteCache, TieredCache
+
+def _tiered(path):
+    return TieredCache(IntelligentCache(max_entries=10), SQLiteCache(str(path)))
+
+def test_no_path_falls_back_to_memory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cache, "AI_CACHE_BACKEND", "tiered")
+    monkeypatch.setattr(cache, "AI_CACHE_PATH", None)
+    built = cache.build_ai_cache()
+    assert type(built) is IntelligentCache
+    built.set("k", "v")
+    assert list(tmp_path.iterdir()) == []  # aucun fichier créé dans le répertoire courant
+
+def test_async_disk_io_runs_off_the_event_loop(tmp_path):
+    tiered = _tiered(tmp_path / "ai_cache.db")
+    threads = []
+    for method in ("get_with_expiry", "set"):
+        original = getattr(tiered.disk, method)
+
+        def recording(*args, _original=original):
+            threads.append(threading.get_ident())
+            return _original(*args)
+        setattr(tiered.disk, method, recording)
+
+    async def scenario():
+        await tiered.aset("plan", {"weeks": 4}, 1)
+        tiered.memory = IntelligentCache(max_entries=10)  # autre worker : mémoire vide
+        first = await tiered.aget("plan")
+        second = await tiered.aget("plan")  # promu en mémoire : pas de lecture disque
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(scenario())
+    assert first == second == {"weeks": 4}
+    assert len(threads) == 2 and loop_thread not in threads
+    assert asyncio.run(tiered.aget("absent")) is None
@@ -0,0 +1,70 @@
+"""Clés de cache sémantiques (app/services/llm/cache_keys.py) et tolérance des entrées de séance."""
+import asyncio
+
+import pytest
+
+from app.core.cache import IntelligentCache
+from app.services.llm import backend as llm_backend
+from app.services.llm.cache_keys import semantic_cache_key, workout_tolerance
+from app.services.llm.fake import FakeLLMBackend
+
+PROFILE = {"sport": "Musculation", "level": "Intermédiaire", "goal": "Force", "injuries": "Aucune"}
+
+class _CountingBackend(FakeLLMBackend):
+    def __init__(self):
+        super().__init__(latency_ms=0)
+        self.prompts = []
+
+    async def _generate(self, prompt, kind):
+        self.prompts.append(prompt)
+        return await super()._generate(prompt, kind)
+
+def test_noise_does_not_change_key():
+    noisy = {"level": "  intermédiaire ", "goal": "FORCE", "sport": "musculation", "injuries": "aucune",
+             "updated_at": "2026-01-01T00:00:00"}
+    assert semantic_cache_key("workout", PROFILE, {"focus": "Full  Body"}) \
+        == semantic_cache_key("workout", noisy, {"focus": "full body"})
+
+def test_inputs_change_key():
+    base = semantic_cache_key("workout", PROFILE, {"duration": 45})
+    assert base != semantic_cache_key("workout", {**PROFILE, "level": "Débutant"}, {"duration": 45})
+    assert base != semantic_cache_key("workout", PROFILE, {"duration": 60})
+    assert base != semantic_cache_key("workout", PROFILE, {"duration": 45, "focus": "Jambes"})
+
+def test_duration_bucket_shares_key():
+    assert semantic_cache_key("workout", PROFILE, {"duration": 45}) \
+        == semantic_cache_key("workout", PROFILE, {"duration": 59})
+
+def test_tolerance_never_serves_longer_session():
+    cached = workout_tolerance({"duration": 50, "energy": 6}).values
+    assert workout_tolerance({"duration": 50, "energy": 6}).accepts(cached)
+    assert workout_tolerance({"duration": 55, "energy": 7}).accepts(cached)
+    assert not workout_tolerance({"duration": 45, "energy": 6}).accepts(cached)  # même palier, plus court
+    assert not workout_tolerance({"duration": 65, "energy": 6}).accepts(cached)  # trop d'écart
+    assert not workout_tolerance({"duration": 50, "energy": 9}).accepts(cached)
+    assert not workout_tolerance({"duration": 50}).accepts(None)
+
+def test_generate_keeps_real_values_and_checks_tolerance(monkeypatch):
+    monkeypatch.setattr(llm_backend, "ai_cache", IntelligentCache())
+    monkeypatch.setattr(llm_backend, "LLM_CACHE_TTL_HOURS", 6.0)
+    llm = _CountingBackend()
+
+    def generate(duration):
+        context = {"duration": duration}
+        return asyncio.run(llm.generate(
+            f"séance de {duration} min", "workout",
+            cache_key=semantic_cache_key("workout", PROFILE, context), tolerance=workout_tolerance(context),
+        ))
+
+    first = generate(50)
+    assert generate(55) == first and len(llm.prompts) == 1  # même palier, dans la tolérance
+    generate(46)  # même palier mais plus court que la séance en cache : nouvelle génération
+    assert llm.prompts == ["séance de 50 min", "séance de 46 min"]
+
+@pytest.mark.parametrize("duration", [46, 59])
+def test_prompt_receives_real_duration(duration):
+    from app.routers.coach import get_workout_generation_prompt
+    from app.services.llm.cache_keys import clean_workout_context
+
+    prompt = get_workout_generation_prompt(PROFILE, clean_workout_context({"duration": duration}))
+    assert str(duration) in prompt
@@ -0,0 +1,34 @@
+"""Rattachement des saisies libres au catalogue d'exercices (app/services/exercises/catalog.py)."""
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.models import sql_models
+from app.services.exercises.catalog import catalog, normalize
+
+def _resolve(names, metric_type="LOAD_REPS"):
+    with SessionLocal() as db:
+        ids = catalog.resolve(db, names, {name: metric_type for name in names})
+        db.commit()
+    return ids
+
+def _exercise(name):
+    with SessionLocal() as db:
+        return db.execute(
+            select(sql_models.ExerciseAlias.exercise_id).where(sql_models.ExerciseAlias.alias == normalize(name))
+        ).scalar()
+
+def test_typo_resolves_without_persisting_alias(client):
+    squat = _exercise("Squat")
+    assert _resolve(["Sqaut", "Squats"]) == {"Sqaut": squat, "Squats": squat}
+    assert _exercise("Sqaut") is None  # rapprochement approché : non enregistré sans validation
+    assert _resolve(["Sqaut"]) == {"Sqaut": squat}
+
+def test_different_exercise_is_not_merged(client):
+    ids = _resolve(["Hack squat"])
+    assert ids["Hack squat"] not in (None, _exercise("Squat"))
+    assert _exercise("Hack squat") == ids["Hack squat"]  # nouvel exercice du catalogue
+
+def test_fuzzy_match_requires_same_metric_type(client):
+    # "Planches" ressemble à l'alias "planche" (Gainage, ISOMETRIC_TIME) : pas en charge
+    assert _resolve(["Planches"], "ISOMETRIC_TIME")["Planches"] == _exercise("Gainage")
+    assert _resolve(["Planchez"])["Planchez"] != _exercise("Gainage")
@@ -0,0 +1,90 @@
+"""Plans versionnés (app/services/plans/store.py) : écritures compare-and-swap et 409 côté API."""
+import pytest
+
+from app.core.database import SessionLocal
+from app.models import sql_models
+from app.models.enums import PlanKind
+from app.services.plans.store import PlanVersionConflict, clear_plan, plan_version, read_plan, save_plan
+
+def _user_id(username: str) -> int:
+    with SessionLocal() as db:
+        return db.query(sql_models.User.id).filter(sql_models.User.username == username).scalar()
+
+def test_save_plan_compare_and_swap(client, signup):
+    signup("plans-cas")
+    user_id = _user_id("plans-cas")
+    with SessionLocal() as db:
+        assert plan_version(db, user_id, PlanKind.WEEK) == 0
+        assert save_plan(db, user_id, PlanKind.WEEK, {"schedule": [1]}, 0) == 1
+        db.commit()
+
+        # Deux écritures lancées depuis la même version : la seconde est refusée
+        with pytest.raises(PlanVersionConflict):
+            save_plan(db, user_id, PlanKind.WEEK, {"schedule": [2]}, 0)
+        assert save_plan(db, user_id, PlanKind.WEEK, {"schedule": [2]}, 1) == 2
+        db.commit()
+        with pytest.raises(PlanVersionConflict):
+            save_plan(db, user_id, PlanKind.WEEK, {"schedule": [3]}, 1)
+        assert read_plan(db, user_id, PlanKind.WEEK) == ({"schedule": [2]}, 2)
+
+        # Les natures de plans ne se contendent pas ; l'abandon explicite avance la version
+        assert save_plan(db, user_id, PlanKind.STRATEGY, {"phases": []}, 0) == 1
+        assert clear_plan(db, user_id, PlanKind.WEEK)
+        db.commit()
+        assert read_plan(db, user_id, PlanKind.WEEK) == (None, 3)
+
+def test_plan_changed_during_generation_returns_409(client, signup, monkeypatch):
+    headers = signup("plans-409")
+    user_id = _user_id("plans-409")
+    from app.routers import coach
+
+    generate = coach.get_weekly_planning_prompt
+
+    def concurrent_write(*args, **kwargs):
+        # Un autre appareil réécrit la semaine pendant la génération
+        with SessionLocal() as db:
+            save_plan(db, user_id, PlanKind.WEEK, {"schedule": []}, plan_version(db, user_id, PlanKind.WEEK))
+            db.commit()
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(coach, "get_weekly_planning_prompt", concurrent_write)
+    profile = {"sport": "Rugby", "level": "Avancé", "goal": "Force", "availability": []}
+    response = client.post("/coach/week", json={"profile_data": profile}, headers=headers)
+    assert response.status_code == 409
+    monkeypatch.setattr(coach, "get_weekly_planning_prompt", generate)
+    assert client.post("/coach/week", json={"profile_data": profile}, headers=headers).status_code == 200
+
+def test_account_changes_during_audit_do_not_conflict(client, signup, monkeypatch):
+    headers = signup("plans-audit")
+    user_id = _user_id("plans-audit")
+    from app.models.enums import SyncEntity
+    from app.routers import coach
+    from app.services.sync.changes import record_change
+
+    prompt = coach.get_profile_analysis_prompt_v2
+    profile = {"sport": "Rugby", "level": "Avancé", "goal": "Force"}
+
+    def account_edit(*args, **kwargs):
+        # Email modifié (verrou optimiste : version + 1) et journal de synchronisation avancé pendant l'appel
+        with SessionLocal() as db:
+            db.get(sql_models.User, user_id).email = f"audit-{plan_version(db, user_id, PlanKind.AUDIT_REPORT)}@titan.fr"
+            db.commit()
+            record_change(db, user_id, SyncEntity.PROFILE_SECTION, ["basic_info"])
+            db.commit()
+        return prompt(*args, **kwargs)
+
+    monkeypatch.setattr(coach, "get_profile_analysis_prompt_v2", account_edit)
+    response = client.post("/coach/audit", json={"profile_data": profile}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    def concurrent_audit(*args, **kwargs):
+        with SessionLocal() as db:
+            version = plan_version(db, user_id, PlanKind.AUDIT_REPORT)
+            save_plan(db, user_id, PlanKind.AUDIT_REPORT, {"markdown_report": "autre"}, version)
+            db.commit()
+        return prompt(*args, **kwargs)
+
+    monkeypatch.setattr(coach, "get_profile_analysis_prompt_v2", concurrent_audit)
+    assert client.post("/coach/audit", json={"profile_data": profile}, headers=headers).status_code == 409
+    with SessionLocal() as db:
+        assert read_plan(db, user_id, PlanKind.AUDIT_REPORT)[0] == {"markdown_report": "autre"}
@@ -0,0 +1,26 @@
+"""Mise au budget du contexte des prompts (app/services/llm/context.py)."""
+from app.routers.coach import get_weekly_planning_prompt
+from app.services.llm.context import PromptContextBuilder
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+
+def _profile():
+    availability = [
+        {"day": day, "moment": moment, "duration": 60, "type": "PPG", "isActive": True}
+        for day in DAYS for moment in ("Matin", "Soir")
+    ]
+    return {"sport": "Rugby", "level": "Avancé", "goal": "Reprise", "availability": availability}
+
+def test_weekly_prompt_keeps_every_slot_over_budget():
+    builder = PromptContextBuilder(
+        include=("sport", "level", "goal", "availability"),
+        required=("sport", "level", "goal", "availability"),
+        max_tokens=50,
+    )
+    prompt = get_weekly_planning_prompt(_profile(), builder)
+    for day in DAYS:
+        assert prompt.count(f'"Jour":"{day}"') == 2  # aucun créneau transformé en REPOS
+
+def test_fit_still_trims_lists_by_default():
+    builder = PromptContextBuilder(max_tokens=20)
+    assert len(builder.fit(list(range(100)))) < len(builder.fit(list(range(100)), keep_items=True))
@@ -0,0 +1,104 @@
+"""Budgets SQL (@query_budget) : chaque route budgétée est appelée en mode strict (QueryBudgetExceeded sinon)."""
+from app.core import query_budget
+from app.main import app
+
+PROFILE = {
+    "sport": "Rugby", "level": "Débutant", "goal": "Force",
+    "availability": [{"day": "Lundi", "moment": "Soir", "duration": 60, "isActive": True}],
+}
+
+def _workout(day: str, **extra) -> dict:
+    sets = [
+        {"exercise_name": "Squat", "set_order": i, "weight": 100, "reps": 5, "metric_type": "LOAD_REPS"}
+        for i in range(4)
+    ]
+    return {"date": day, "duration": 60, "rpe": 7, "energy_level": 6, "sets": sets, **extra}
+
+def _budgeted_endpoints(routes):
+    for route in routes:
+        if hasattr(route, "original_router"):  # routeur inclus
+            yield from _budgeted_endpoints(route.original_router.routes)
+        elif query_budget.get_budget(getattr(route, "endpoint", None)) is not None:
+            yield route.endpoint
+
+def test_every_budgeted_route_in_strict_mode(client, signup, monkeypatch):
+    called = set()
+    check = query_budget.check
+
+    def recording_check(endpoint, stats, mode=None):
+        called.add(endpoint)
+        return check(endpoint, stats, mode)
+
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "strict")
+    monkeypatch.setattr(query_budget, "check", recording_check)
+
+    coach = signup("budget-coach")
+    athlete = signup("budget-athlete")
+
+    def call(method, path, headers=coach, **kwargs):
+        response = getattr(client, method)(path, headers=headers, **kwargs)
+        # Un refus (4xx) sortirait avant les requêtes du cas nominal : budget non vérifié
+        assert response.status_code < 400, f"{method.upper()} {path} : {response.status_code} {response.text}"
+        return response
+
+    # Profil athlète et mémoire du coach (créée explicitement avant que les routes suivantes ne la créent)
+    call("get", "/api/v1/profiles/me")
+    profile_id = call("put", "/api/v1/profiles/me", json={"basic_info": {"pseudo": "coach"}}).json()["id"]
+    memory = call("post", "/api/v1/coach-memories/", json={"type": "LIFE_CONSTRAINT", "content": "déplacement"}).json()
+    call("post", "/api/v1/profiles/complete", headers=athlete,
+         json={"basic_info": {"pseudo": "athlete"}, "sport_context": {"primary_sport": "Rugby"}})
+    call("get", f"/api/v1/profiles/{profile_id}")
+    call("put", f"/api/v1/profiles/{profile_id}", json={"basic_info": {"pseudo": "coach 2"}})
+    call("patch", f"/api/v1/profiles/{profile_id}/section/basic_info", json={"section_data": {"pseudo": "coach 3"}})
+    call("get", f"/api/v1/profiles/{profile_id}/completion")
+    call("get", "/api/v1/coach-memories/me")
+    call("get", "/api/v1/coach-memories/")
+    engram = call("post", "/api/v1/coach-memories/engrams", json={"type": "INJURY_REPORT", "content": "genou"}).json()
+    call("put", f"/api/v1/coach-memories/engrams/{engram['id']}",
+         json={"type": "INJURY_REPORT", "content": "genou gauche", "status": "RESOLVED"})
+    call("delete", f"/api/v1/coach-memories/engrams/{engram['id']}")
+    call("delete", f"/api/v1/coach-memories/{memory['id']}")
+
+    # Générations IA (backend fake) et plans
+    body = {"profile_data": PROFILE}
+    call("post", "/coach/audit", json=body)
+    call("post", "/coach/audit/stream", json=body)
+    call("get", "/coach/audit/report")
+    call("post", "/coach/strategy", json=body)
+    call("post", "/coach/strategy/stream", json=body)
+    call("get", "/coach/strategy")
+    call("post", "/coach/week", json=body)
+    call("post", "/coach/week/stream", json=body)
+    call("get", "/coach/week")
+    call("post", "/coach/workout", json={**body, "context": {"duration": 60, "energy": 5}})
+    call("get", "/coach/workout/draft")
+    call("delete", "/coach/workout/draft")
+
+    # Séances, catalogue, agrégats, export, synchronisation
+    workout_id = call("post", "/workouts/", json=_workout("2026-01-05")).json()["id"]
+    call("post", "/workouts/batch", json={"sessions": [
+        _workout(f"2026-01-{day:02d}", idempotency_key=f"budget-{day}") for day in (6, 7, 8)
+    ]})
+    call("get", "/workouts/")
+    call("get", f"/workouts/{workout_id}")
+    exercise_id = call("get", "/exercises/", params={"q": "squat"}).json()[0]["id"]
+    call("get", f"/exercises/{exercise_id}/summary")
+    call("get", "/aggregates/weekly")
+    call("get", "/exports/training", params={"format": "arrow"})
+    call("get", "/sync/")
+    feed_id = call("get", "/feed/").json()[0]["id"]
+    call("patch", f"/feed/{feed_id}/read")
+    call("patch", f"/feed/{feed_id}/complete")
+    call("post", "/performance/1rm", json={"weight": 100, "reps": 5})
+    call("post", "/safety/acwr", json={"history": []})
+
+    # Squads
+    squad = call("post", "/squads/", json={"name": "XV"}).json()
+    call("post", "/squads/join", headers=athlete, json={"invite_code": squad["invite_code"]})
+    call("get", f"/squads/{squad['id']}")
+    job = call("post", f"/squads/{squad['id']}/week").json()
+    call("get", f"/squads/jobs/{job['id']}")
+    call("delete", f"/squads/{squad['id']}/membership", headers=athlete)
+
+    missing = set(_budgeted_endpoints(app.router.routes)) - called
+    assert not missing, f"Routes budgétées non couvertes : {sorted(f'{e.__module__}.{e.__qualname__}' for e in missing)}"
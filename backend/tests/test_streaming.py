@@ -0,0 +1,92 @@
+"""Parser JSON incrémental (app/services/llm/streaming.py) : découpage arbitraire des chunks."""
+import json
+import random
+
+from app.services.llm.streaming import IncrementalJSONParser
+
+DOCUMENT = json.dumps({
+    "markdown_report": "## Bilan\nCharge \"élevée\" été — récupération {ok}, [à suivre].",
+    "detected_engrams": [
+        {"type": "INJURY_REPORT", "content": "Genou } gauche"},
+        {"type": "LIFE_CONSTRAINT", "content": "Déplacements [mardi]"},
+    ],
+    "summary": "Semaine « charnière »",
+    "score": 7,
+}, ensure_ascii=False)
+
+def _parser():
+    return IncrementalJSONParser(text_fields=("markdown_report", "summary"), item_fields=("detected_engrams",))
+
+def _run(chunks):
+    parser = _parser()
+    events = [event for chunk in chunks for event in parser.feed(chunk)]
+    return parser, events
+
+def _texts(events):
+    texts = {}
+    for kind, field, value in events:
+        if kind == "text":
+            texts[field] = texts.get(field, "") + value
+    return texts
+
+def _check(events):
+    expected = json.loads(DOCUMENT)
+    assert _texts(events) == {"markdown_report": expected["markdown_report"], "summary": expected["summary"]}
+    assert [value for kind, _, value in events if kind == "item"] == expected["detected_engrams"]
+    assert {field for kind, field, _ in events if kind == "item"} == {"detected_engrams"}
+    # Ordre du flux : rapport, puis engrammes, puis résumé
+    fields = [field for _, field, _ in events]
+    assert fields.index("detected_engrams") > max(i for i, f in enumerate(fields) if f == "markdown_report")
+    assert fields.index("summary") > max(i for i, f in enumerate(fields) if f == "detected_engrams")
+
+def test_single_chunk():
+    parser, events = _run([DOCUMENT])
+    _check(events)
+    assert parser.result() == json.loads(DOCUMENT)
+
+def test_every_two_chunk_split():
+    for cut in range(len(DOCUMENT) + 1):
+        _, events = _run([DOCUMENT[:cut], DOCUMENT[cut:]])
+        _check(events)
+
+def test_chunk_spanning_key_boundary():
+    # Fin du rapport, clé suivante et premier engramme dans le même chunk
+    cut = DOCUMENT.index("suivre") + 2
+    end = DOCUMENT.index("}", DOCUMENT.index("Genou")) + 1
+    _, events = _run([DOCUMENT[:cut], DOCUMENT[cut:end + 30], DOCUMENT[end + 30:]])
+    second = _parser()
+    second.feed(DOCUMENT[:cut])
+    kinds = [(kind, field) for kind, field, _ in second.feed(DOCUMENT[cut:end + 30])]
+    assert kinds[0] == ("text", "markdown_report")
+    assert ("item", "detected_engrams") in kinds
+    _check(events)
+
+def test_random_chunks_with_code_fence():
+    rng = random.Random(3)
+    wrapped = "```json\n" + DOCUMENT + "\n```"
+    for _ in range(200):
+        chunks, pos = [], 0
+        while pos < len(wrapped):
+            size = rng.randint(1, 12)
+            chunks.append(wrapped[pos:pos + size])
+            pos += size
+        parser, events = _run(chunks)
+        _check(events)
+        assert parser.result() == json.loads(DOCUMENT)
+
+def test_escaped_surrogate_pairs():
+    # json.dumps (ensure_ascii) échappe les emojis en paires de substitution (\ud83d\udcaa), comme Gemini
+    document = json.dumps({"markdown_report": "Force 💪 et 🏉 !", "summary": "x"})
+    assert "\\ud83d\\udcaa" in document
+    for cut in range(len(document) + 1):
+        parser, events = IncrementalJSONParser(text_fields=("markdown_report",)), []
+        events += parser.feed(document[:cut])
+        events += parser.feed(document[cut:])
+        text = _texts(events)["markdown_report"]
+        assert text == "Force 💪 et 🏉 !"
+        text.encode("utf-8")  # SSE ensure_ascii=False : aucune moitié isolée
+
+def test_lone_surrogates_are_replaced():
+    parser = IncrementalJSONParser(text_fields=("markdown_report",))
+    events = parser.feed('{"markdown_report": "a\\ud83db \\udcaa c\\ud83d"}')
+    assert _texts(events)["markdown_report"] == "a\ufffdb \ufffd c\ufffd"
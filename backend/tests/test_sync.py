@@ -0,0 +1,70 @@
+"""Synchronisation incrémentale (GET /sync) : pagination du journal, tombstones, jeton inconnu."""
+from app.core.database import SessionLocal
+from app.models import sql_models
+from app.services.sync.changes import current_seq
+
+def _workout(key, day, names):
+    return {
+        "idempotency_key": key, "date": day, "duration": 45, "rpe": 6,
+        "sets": [{"exercise_name": name, "set_order": i, "weight": 60, "reps": 8} for i, name in enumerate(names)],
+    }
+
+def _user_id(username: str) -> int:
+    with SessionLocal() as db:
+        return db.query(sql_models.User.id).filter(sql_models.User.username == username).scalar()
+
+def _sync(client, headers, since, limit=500):
+    response = client.get("/sync/", params={"since": since, "limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_delta_pages_follow_the_sequence(client, signup):
+    headers = signup("sync-pages")
+    workout = client.post("/workouts/", json=_workout("p1", "2026-04-06", ["Squat", "Fentes", "Pompes"]),
+                          headers=headers).json()
+
+    # Pages de 2 entités jusqu'à has_more = false : tout l'état, chaque numéro une seule fois
+    since, workouts, sets, pages = 0, [], [], 0
+    while True:
+        page = _sync(client, headers, since, limit=2)
+        assert page["since"] == since and not page["reset"]
+        workouts += [item["id"] for item in page["upserts"]["workouts"]]
+        sets += [item["id"] for item in page["upserts"]["sets"]]
+        pages += 1
+        assert page["cursor"] > since or not page["has_more"]
+        since = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert pages > 1
+    assert workouts == [workout["id"]]
+    assert sorted(sets) == sorted(item["id"] for item in workout["sets"])
+    with SessionLocal() as db:
+        assert current_seq(db, _user_id("sync-pages")) == since
+
+    # Client à jour : rien à renvoyer ; un nouveau changement seulement
+    assert _sync(client, headers, since)["cursor"] == since
+    client.post("/workouts/", json=_workout("p2", "2026-04-07", ["Squat"]), headers=headers)
+    delta = _sync(client, headers, since)
+    assert len(delta["upserts"]["workouts"]) == 1 and len(delta["upserts"]["sets"]) == 1
+
+def test_deleted_entity_is_a_tombstone(client, signup):
+    headers = signup("sync-tombstone")
+    assert client.get("/api/v1/profiles/me", headers=headers).status_code == 200  # profil créé à la première lecture
+    engram = client.post("/api/v1/coach-memories/engrams", json={"type": "INJURY_REPORT", "content": "épaule"},
+                         headers=headers).json()
+    cursor = _sync(client, headers, 0)["cursor"]
+    assert client.delete(f"/api/v1/coach-memories/engrams/{engram['id']}", headers=headers).status_code == 204
+
+    delta = _sync(client, headers, cursor)
+    assert delta["deletes"]["engrams"] == [engram["id"]]
+    assert delta["upserts"]["engrams"] == []
+
+def test_unknown_token_resets(client, signup):
+    headers = signup("sync-reset")
+    client.post("/workouts/", json=_workout("r1", "2026-04-08", ["Squat"]), headers=headers)
+    cursor = _sync(client, headers, 0)["cursor"]
+
+    # Jeton au-delà de la séquence (base restaurée) : resynchronisation complète depuis 0
+    delta = _sync(client, headers, cursor + 100)
+    assert delta["reset"] and delta["since"] == 0 and delta["cursor"] == cursor
+    assert len(delta["upserts"]["workouts"]) == 1
@@ -0,0 +1,121 @@
+"""Import groupé idempotent (POST /workouts/batch) et agrégats d'entraînement tenus à jour au commit."""
+from datetime import date
+
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.models import sql_models
+from app.services.rollups.training import rebuild_user
+
+SQUAT = ("Squat", 100, 5, "LOAD_REPS")
+PULL_UP = ("Tractions", 0, 8, "BODYWEIGHT_REPS")
+RUN = ("Course", 5, 3000, "PACE_DISTANCE")
+
+def _workout(key, day, sets, duration=60, rpe=7):
+    return {
+        "idempotency_key": key, "date": day, "duration": duration, "rpe": rpe,
+        "sets": [
+            {"exercise_name": name, "set_order": i, "weight": weight, "reps": reps, "metric_type": metric_type}
+            for i, (name, weight, reps, metric_type) in enumerate(sets)
+        ],
+    }
+
+def _user_id(username: str) -> int:
+    with SessionLocal() as db:
+        return db.query(sql_models.User.id).filter(sql_models.User.username == username).scalar()
+
+def test_batch_replay_is_idempotent(client, signup):
+    headers = signup("batch-replay")
+    batch = {"sessions": [_workout("a", "2026-03-02", [SQUAT]), _workout("b", "2026-03-03", [RUN])]}
+
+    first = client.post("/workouts/batch", json=batch, headers=headers)
+    assert first.status_code == 200, first.text
+    assert (first.json()["created"], first.json()["duplicates"]) == (2, 0)
+
+    # Renvoi après timeout, avec une séance de plus : seules les nouvelles sont créées, mêmes identifiants
+    batch["sessions"].append(_workout("c", "2026-03-04", [SQUAT, SQUAT]))
+    replay = client.post("/workouts/batch", json=batch, headers=headers).json()
+    assert (replay["created"], replay["duplicates"]) == (1, 2)
+    ids = {item["idempotency_key"]: item["id"] for item in first.json()["items"]}
+    assert {item["idempotency_key"]: item["id"] for item in replay["items"] if item["status"] == "duplicate"} == ids
+    assert len(client.get("/workouts/", headers=headers).json()) == 3
+
+    # La même clé sur POST /workouts/ renvoie la séance existante
+    single = client.post("/workouts/", json=_workout("a", "2026-03-02", [SQUAT]), headers=headers)
+    assert single.json()["id"] == ids["a"]
+
+def test_invalid_batch_writes_nothing(client, signup):
+    headers = signup("batch-invalid")
+    bad = _workout("bad", "2026-03-05", [SQUAT], rpe=14)
+    response = client.post("/workouts/batch", json={"sessions": [_workout("ok", "2026-03-05", [SQUAT]), bad]},
+                           headers=headers)
+    assert response.status_code == 400
+    assert client.get("/workouts/", headers=headers).json() == []
+
+def _snapshot(db, user_id):
+    return {
+        model.__tablename__: sorted(
+            tuple(row)[1:] for row in db.execute(select(model.__table__).where(model.user_id == user_id))
+        )
+        for model in (sql_models.DailyRollup, sql_models.WeeklyRollup)
+    }
+
+def _assert_matches_rebuild(db, user_id):
+    incremental = _snapshot(db, user_id)
+    rebuild_user(db, user_id)
+    db.flush()
+    assert _snapshot(db, user_id) == incremental
+    db.rollback()
+
+def test_rollups_follow_writes(client, signup):
+    headers = signup("rollups")
+    user_id = _user_id("rollups")
+    client.post("/workouts/", json=_workout("r1", "2026-10-12", [SQUAT, SQUAT, PULL_UP]), headers=headers)
+    client.post("/workouts/batch", json={"sessions": [
+        _workout("r2", "2026-10-12", [RUN], duration=30, rpe=5),
+        _workout("r3", "2026-10-14", [SQUAT, RUN]),
+        _workout("r4", "2026-10-20", []),
+    ]}, headers=headers)
+
+    weekly = client.get("/aggregates/weekly", headers=headers).json()
+    assert [(row["period_start"], row["sessions"], row["sets"]) for row in weekly] == [
+        ("2026-10-12", 3, 6), ("2026-10-19", 1, 0),
+    ]
+    assert weekly[0]["volume"] == 1500
+    assert weekly[0]["duration"] == 150
+    by_type = client.get("/aggregates/daily", params={"group_by": "metric_type", "end": "2026-10-12"},
+                         headers=headers).json()
+    assert {row["metric_type"]: (row["sessions"], row["reps"]) for row in by_type} == {
+        "LOAD_REPS": (1, 10), "BODYWEIGHT_REPS": (1, 8), "PACE_DISTANCE": (1, 3000),
+    }
+
+    with SessionLocal() as db:
+        _assert_matches_rebuild(db, user_id)
+        # Modification d'une série, séance déplacée d'une semaine à l'autre, suppression en cascade
+        sessions = {s.idempotency_key: s for s in db.query(sql_models.WorkoutSession).filter_by(user_id=user_id)}
+        sessions["r1"].sets[0].weight = 120
+        sessions["r3"].date = date(2026, 10, 5)
+        db.delete(sessions["r2"])
+        db.commit()
+        _assert_matches_rebuild(db, user_id)
+
+    weekly = client.get("/aggregates/weekly", headers=headers).json()
+    assert [(row["period_start"], row["sessions"]) for row in weekly] == [
+        ("2026-10-05", 1), ("2026-10-12", 1), ("2026-10-19", 1),
+    ]
+
+def test_rollup_duration_split_by_metric_type(client, signup):
+    headers = signup("rollups-time")
+    client.post("/workouts/batch", json={"sessions": [
+        _workout("t1", "2026-11-02", [RUN], duration=60, rpe=5),  # mono-type : toute la durée
+        _workout("t2", "2026-11-03", [SQUAT, SQUAT, SQUAT, RUN], duration=40, rpe=8),  # 30 + 10 min
+    ]}, headers=headers)
+
+    by_type = client.get("/aggregates/weekly", params={"group_by": "metric_type"}, headers=headers).json()
+    assert {row["metric_type"]: (row["duration"], row["rpe_load"]) for row in by_type} == {
+        "PACE_DISTANCE": (70, 60 * 5 + 10 * 8), "LOAD_REPS": (30, 30 * 8),
+    }
+    by_exercise = client.get("/aggregates/weekly", params={"group_by": "exercise"}, headers=headers).json()
+    assert {row["exercise"]: row["duration"] for row in by_exercise} == {"Course": 70, "Squat": 30}
+    total = client.get("/aggregates/weekly", headers=headers).json()[0]
+    assert (total["duration"], total["rpe_load"]) == (100, 60 * 5 + 40 * 8)